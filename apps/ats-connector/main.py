@@ -1,11 +1,46 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-import os, uuid, time
+from fastapi import FastAPI, Header
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+from collections import OrderedDict
+import os, threading, uuid, time
 
 MODE = os.getenv("MODE", "demo")
 
 app = FastAPI(title="ATS Connector")
 
+class IdempotencyCache:
+    # Idempotency-Key -> first response; least recently used keys beyond max_items and keys older than ttl_s are dropped
+    def __init__(self, max_items: int, ttl_s: float):
+        self.max_items = max(1, max_items)
+        self.ttl_s = ttl_s
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored at, response)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is None:
+                return None
+            if now - hit[0] >= self.ttl_s:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return hit[1]
+
+    def put(self, key: str, out: dict) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._items[key] = (now, out)
+            self._items.move_to_end(key)
+            while self._items and (len(self._items) > self.max_items or now - next(iter(self._items.values()))[0] >= self.ttl_s):
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+IDEMPOTENCY = IdempotencyCache(int(os.getenv("IDEMPOTENCY_MAX", "100000")), float(os.getenv("IDEMPOTENCY_TTL_S", "86400")))
+
 class Candidate(BaseModel):
     id: str
     name: str
@@ -16,13 +51,31 @@ class Application(BaseModel):
     job_id: str
     slot: str
 
+class ApplicationBatch(BaseModel):
+    items: List[dict]
+
 @app.post("/candidate")
 def upsert_candidate(body: Candidate):
     return {"ok": True, "mode": MODE, "candidate_id": body.id}
 
 @app.post("/application")
-def create_application(body: Application):
+def create_application(body: Application, idempotency_key: Optional[str] = Header(None)):
+    hit = IDEMPOTENCY.get(idempotency_key) if idempotency_key else None
+    if hit is not None:
+        return hit
     app_id = str(uuid.uuid4())
-    return {"ok": True, "application_id": app_id, "ts": time.time()}
-
+    out = {"ok": True, "application_id": app_id, "ts": time.time()}
+    if idempotency_key:
+        IDEMPOTENCY.put(idempotency_key, out)
+    return out
 
+@app.post("/application/batch")
+def create_applications_batch(body: ApplicationBatch):
+    # per-item results, in request order
+    results = []
+    for item in body.items:
+        try:
+            results.append(create_application(Application.model_validate(item), item.get("idempotency_key")))
+        except ValidationError as e:
+            results.append({"ok": False, "error": str(e.errors()[0].get("msg", "invalid"))})
+    return {"ok": True, "results": results}
@@ -1,26 +1,82 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import time, uuid
+from fastapi import FastAPI, HTTPException, Header
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+from collections import OrderedDict
+import os, threading, time, uuid
 
 app = FastAPI(title="ATS Mock")
 
 APPLICATIONS = {}
 EVENTS = []
 
+class IdempotencyCache:
+    # Idempotency-Key -> first response; least recently used keys beyond max_items and keys older than ttl_s are dropped
+    def __init__(self, max_items: int, ttl_s: float):
+        self.max_items = max(1, max_items)
+        self.ttl_s = ttl_s
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored at, response)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is None:
+                return None
+            if now - hit[0] >= self.ttl_s:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return hit[1]
+
+    def put(self, key: str, out: dict) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._items[key] = (now, out)
+            self._items.move_to_end(key)
+            while self._items and (len(self._items) > self.max_items or now - next(iter(self._items.values()))[0] >= self.ttl_s):
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+IDEMPOTENCY = IdempotencyCache(int(os.getenv("IDEMPOTENCY_MAX", "100000")), float(os.getenv("IDEMPOTENCY_TTL_S", "86400")))
+
 class AppIn(BaseModel):
     candidate_id: str
     job_id: str
     slot: str
 
-@app.post("/applications")
-def create_app(body: AppIn):
+class AppBatchIn(BaseModel):
+    items: List[dict]
+
+def _create(body: AppIn, key: Optional[str] = None) -> dict:
+    hit = IDEMPOTENCY.get(key) if key else None
+    if hit is not None:
+        return hit
     app_id = str(uuid.uuid4())
     APPLICATIONS[app_id] = body.model_dump()
     EVENTS.append({"id": str(uuid.uuid4()), "ts": time.time(), "type": "application.created", "payload": {"app_id": app_id, **APPLICATIONS[app_id]}})
-    return {"app_id": app_id, **APPLICATIONS[app_id]}
+    out = {"app_id": app_id, **APPLICATIONS[app_id]}
+    if key:
+        IDEMPOTENCY.put(key, out)
+    return out
+
+@app.post("/applications")
+def create_app(body: AppIn, idempotency_key: Optional[str] = Header(None)):
+    return _create(body, idempotency_key)
+
+@app.post("/applications/batch")
+def create_apps_batch(body: AppBatchIn):
+    # per-item results, in request order; one bad item does not fail the batch
+    results = []
+    for item in body.items:
+        try:
+            results.append({"ok": True, **_create(AppIn.model_validate(item), item.get("idempotency_key"))})
+        except ValidationError as e:
+            results.append({"ok": False, "error": str(e.errors()[0].get("msg", "invalid"))})
+    return {"results": results}
 
 @app.get("/events")
 def get_events(limit: int = 100):
     return {"events": EVENTS[-limit:]}
-
-
@@ -1,8 +1,16 @@
-from fastapi import FastAPI, HTTPException, Body
-from pydantic import BaseModel
-import os, time, uuid
+from fastapi import FastAPI, HTTPException, Body, Request
+from pydantic import BaseModel, ValidationError
+from typing import Dict, List, Optional
+import asyncio, json, logging, os, random, threading, time, uuid, weakref
+import httpx
 
 MODE = os.getenv("MODE", "demo")
+# twilio-like provider endpoint; unset in demo mode -> in-process mock provider
+PROVIDER_BASE = os.getenv("PROVIDER_BASE")
+PROVIDER_FROM = os.getenv("PROVIDER_FROM", "+10000000000")
+MOCK_LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "0"))
+MOCK_FAIL_RATE = float(os.getenv("MOCK_FAIL_RATE", "0"))
+SEND_BATCH_MAX = int(os.getenv("SEND_BATCH_MAX", "1000"))
 
 app = FastAPI(title="Channel Connector")
 
@@ -11,17 +19,213 @@ class Outbound(BaseModel):
     body: str
     locale: str = "en"
     channel: str = "sms"
+    ref: Optional[str] = None  # caller's id for this message, echoed in results
+
+class OutboundBatch(BaseModel):
+    messages: List[dict]
+
+# ---- async provider dispatcher ----
+# Pooled keep-alive client to the provider plus a semaphore per channel, so a
+# whatsapp backlog cannot starve sms sends. Clients are per event loop.
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    return {k.strip(): int(v) for k, v in (p.split("=", 1) for p in spec.split(",") if "=" in p)}
+
+class ProviderDispatcher:
+    def __init__(self, base: Optional[str], channel_limits: Dict[str, int], default_limit: int = 20,
+                 max_connections: int = 200, max_keepalive: int = 50, timeout_s: float = 10.0):
+        self.base = base.rstrip("/") if base else None
+        self.provider = "twilio_like" if self.base else "mock"
+        self.channel_limits = channel_limits
+        self.default_limit = default_limit
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.timeout = httpx.Timeout(timeout_s)
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+    def _state(self):
+        loop = asyncio.get_running_loop()
+        st = self._loops.get(loop)
+        if st is None:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout) if self.base else None
+            st = self._loops[loop] = (client, {})
+        return st
+
+    def _sem(self, sems: dict, channel: str) -> asyncio.Semaphore:
+        sem = sems.get(channel)
+        if sem is None:
+            sem = sems[channel] = asyncio.Semaphore(self.channel_limits.get(channel, self.default_limit))
+        return sem
+
+    async def _mock_send(self, msg: Outbound) -> str:
+        if MOCK_LATENCY_MS:
+            await asyncio.sleep(MOCK_LATENCY_MS / 1000.0)
+        if MOCK_FAIL_RATE and random.random() < MOCK_FAIL_RATE:
+            raise RuntimeError("mock provider rejected message")
+        return f"mock-{uuid.uuid4()}"
+
+    async def send(self, msg: Outbound) -> dict:
+        client, sems = self._state()
+        try:
+            async with self._sem(sems, msg.channel):
+                if client is None:
+                    pid = await self._mock_send(msg)
+                else:
+                    resp = await client.post(f"{self.base}/messages", json={
+                        "to": msg.to, "from": PROVIDER_FROM, "body": msg.body, "channel": msg.channel})
+                    resp.raise_for_status()
+                    data = resp.json()
+                    pid = data.get("sid") or data.get("id")
+        except Exception as e:
+            return {"ok": False, "provider": self.provider, "ref": msg.ref, "error": str(e) or e.__class__.__name__}
+        return {"ok": True, "provider": self.provider, "id": pid, "ref": msg.ref}
+
+DISPATCHER = ProviderDispatcher(
+    PROVIDER_BASE,
+    _parse_limits(os.getenv("CHANNEL_CONCURRENCY", "sms=50,whatsapp=20,email=20")),
+    max_connections=int(os.getenv("PROVIDER_MAX_CONNECTIONS", "200")),
+    max_keepalive=int(os.getenv("PROVIDER_MAX_KEEPALIVE", "50")),
+    timeout_s=float(os.getenv("PROVIDER_TIMEOUT_S", "10")),
+)
 
 @app.post("/send")
-def send_message(payload: Outbound):
-    if MODE == "demo":
-        return {"ok": True, "provider": "mock", "id": str(uuid.uuid4())}
-    # placeholder for real provider (twilio-like)
-    return {"ok": True, "provider": "twilio_like", "id": str(uuid.uuid4())}
+async def send_message(payload: Outbound):
+    res = await DISPATCHER.send(payload)
+    if not res["ok"]:
+        raise HTTPException(502, res["error"])
+    return res
 
-@app.post("/inbound")
-def inbound_webhook(data: dict = Body(...)):
-    # forward to orchestrator later; for now echo
-    return {"ok": True, "received": True, "ts": time.time()}
+@app.post("/send/batch")
+async def send_batch(body: OutboundBatch):
+    # per-message results in request order, plus ref (or index) -> provider id for delivered messages
+    if len(body.messages) > SEND_BATCH_MAX:
+        raise HTTPException(413, f"at most {SEND_BATCH_MAX} messages per batch")
+    async def one(raw: dict) -> dict:
+        try:
+            msg = Outbound.model_validate(raw)
+        except ValidationError as e:
+            return {"ok": False, "ref": raw.get("ref") if isinstance(raw, dict) else None,
+                    "error": str(e.errors()[0].get("msg", "invalid"))}
+        return await DISPATCHER.send(msg)
+    results = await asyncio.gather(*(one(m) for m in body.messages))
+    provider_ids = {(r.get("ref") or str(i)): r["id"] for i, r in enumerate(results) if r["ok"]}
+    return {"ok": True, "sent": len(provider_ids), "failed": len(results) - len(provider_ids),
+            "results": results, "provider_ids": provider_ids}
 
+@app.on_event("shutdown")
+async def _close_dispatcher() -> None:
+    client, _ = DISPATCHER._loops.pop(asyncio.get_running_loop(), (None, None))
+    if client is not None:
+        await client.aclose()
 
+# ---- local twilio-like provider for benchmarks: PROVIDER_BASE=http://<connector>/mock-provider ----
+@app.post("/mock-provider/messages")
+async def mock_provider_messages(data: dict = Body(...)):
+    if MOCK_LATENCY_MS:
+        await asyncio.sleep(MOCK_LATENCY_MS / 1000.0)
+    if MOCK_FAIL_RATE and random.random() < MOCK_FAIL_RATE:
+        raise HTTPException(503, "mock provider unavailable")
+    return {"sid": f"SM{uuid.uuid4().hex}", "status": "queued", "to": data.get("to")}
+
+# ---- inbound: ack the provider webhook at once, forward to the orchestrator in batches ----
+ORCHESTRATOR_BASE = os.getenv("ORCHESTRATOR_BASE")
+
+class InboundForwarder:
+    def __init__(self, base: str, batch_max: int = 200, flush_s: float = 0.05, max_buffer: int = 50_000,
+                 max_backoff_s: float = 10.0, transport: Optional[httpx.BaseTransport] = None):
+        self.base = base.rstrip("/")
+        self.transport = transport
+        self.batch_max = max(1, batch_max)
+        self.flush_s = flush_s
+        self.max_buffer = max_buffer
+        self.max_backoff_s = max_backoff_s
+        self.forwarded = 0
+        self._buf: List[dict] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def offer(self, msg: dict) -> bool:
+        # False when the buffer is full: the webhook then fails and the provider retries later
+        with self._cond:
+            if len(self._buf) >= self.max_buffer:
+                return False
+            self._buf.append(msg)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="inbound-forwarder", daemon=True)
+                self._thread.start()
+            if len(self._buf) >= self.batch_max:
+                self._cond.notify()
+            return True
+
+    def _take(self) -> List[dict]:
+        with self._cond:
+            while not self._buf and not self._closed:
+                self._cond.wait()
+            deadline = time.monotonic() + self.flush_s
+            while len(self._buf) < self.batch_max and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._buf[:self.batch_max]
+            del self._buf[:len(batch)]
+            return batch
+
+    def _run(self) -> None:
+        with httpx.Client(timeout=httpx.Timeout(10.0), limits=httpx.Limits(max_keepalive_connections=4),
+                          transport=self.transport) as client:
+            while True:
+                batch = self._take()
+                if not batch:
+                    return
+                delay = 0.1
+                while True:  # retry the same batch; the orchestrator dedupes by message id
+                    try:
+                        resp = client.post(f"{self.base}/channels/inbound/batch", json={"messages": batch})
+                        resp.raise_for_status()
+                        self.forwarded += len(batch)
+                        break
+                    except Exception as e:
+                        logging.error(json.dumps({"type": "inbound_forward_error", "error": str(e), "messages": len(batch)}))
+                        if self._closed:
+                            return
+                        time.sleep(delay)
+                        delay = min(self.max_backoff_s, delay * 2)
+
+    def close(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+FORWARDER = InboundForwarder(
+    ORCHESTRATOR_BASE,
+    batch_max=int(os.getenv("INBOUND_BATCH_MAX", "200")),
+    flush_s=float(os.getenv("INBOUND_FLUSH_MS", "50")) / 1000.0,
+    max_buffer=int(os.getenv("INBOUND_MAX_BUFFER", "50000")),
+) if ORCHESTRATOR_BASE else None
+
+@app.on_event("shutdown")
+def _close_forwarder() -> None:
+    if FORWARDER:
+        FORWARDER.close()
+
+@app.post("/inbound")
+async def inbound_webhook(request: Request):
+    # Twilio-style form post or JSON; acknowledged as soon as the message is buffered
+    if request.headers.get("content-type", "").startswith("application/json"):
+        data = await request.json()
+    else:
+        data = dict(await request.form())
+    if not isinstance(data, dict):
+        raise HTTPException(400, "expected an object")
+    From = data.get("From") or data.get("from")
+    Body = data.get("Body") or data.get("body")
+    if not From or not Body:
+        raise HTTPException(400, "missing From/Body")
+    mid = data.get("MessageSid") or data.get("SmsMessageSid") or data.get("message_id") or data.get("id")
+    msg = {"id": str(mid) if mid else str(uuid.uuid4()), "from": From, "body": Body}
+    if FORWARDER and not FORWARDER.offer(msg):
+        raise HTTPException(503, "inbound buffer full")
+    return {"ok": True, "received": True, "id": msg["id"], "ts": time.time()}
@@ -0,0 +1,310 @@
+import re, threading, time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .columnar import Interner
+
+# ---- columnar funnel analytics ----
+# Every committed audit event becomes one row in fixed-size NumPy column chunks:
+# timestamp (s), action, funnel stage, job and locale codes. A row carries a
+# stage only when it is the candidate's first entry into that stage, so stage
+# counts are distinct candidates. Rows are kept in time order, so a window is
+# a suffix of the chunks and a day is a slice; a query is one bincount per
+# chunk over an integer group key. Results for full chunks are cached on the
+# chunk, so repeated queries only recount the newest rows.
+# Stage counts are distinct over all time, so the per-candidate state has no
+# horizon: one interned id plus one byte of stage bits per candidate that ever
+# entered a stage, the same order of growth as the candidate table itself.
+
+STAGES = ("contacted", "replied", "consented", "qualified", "scheduled", "showed")
+_STAGE = {s: i for i, s in enumerate(STAGES)}
+STAGE_ACTIONS = {
+    "outreach.sent": "contacted",
+    "message.sent": "contacted",
+    "channel.inbound": "replied",
+    "consent.captured": "consented",
+    "schedule.confirmed": "scheduled",
+    "ats.write": "scheduled",
+    "interview.attended": "showed",
+}
+DIMS = ("job", "locale", "day")
+CHUNK_ROWS = 1 << 20
+_BINCOUNT_MAX = 1 << 24  # above this many (stage, group) bins, count with np.unique instead
+_CACHE_PER_CHUNK = 16
+_INGEST_BATCH = 65536
+_INF = float("inf")
+DAY_S = 86400
+
+
+def stage_of(action: str, payload: dict) -> int:
+    # -1 for events that are not a funnel step
+    if action == "qualification.done":
+        return _STAGE["qualified"] if payload.get("qualified") else -1
+    s = STAGE_ACTIONS.get(action)
+    return -1 if s is None else _STAGE[s]
+
+
+def parse_window(spec: Optional[str]) -> Optional[float]:
+    # "7d", "24h", "90m", "3600s", "2w" or plain seconds -> seconds; None/"" for all time
+    if not spec:
+        return None
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*", spec)
+    if not m:
+        raise ValueError(f"bad window: {spec!r}")
+    return float(m.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600, "d": DAY_S, "w": 7 * DAY_S}[m.group(2)]
+
+
+def parse_group_by(spec: Optional[str]) -> Tuple[str, ...]:
+    dims = tuple(d.strip() for d in (spec or "").split(",") if d.strip())
+    bad = [d for d in dims if d not in DIMS]
+    if bad:
+        raise ValueError(f"unknown group_by dimension(s): {', '.join(bad)}; expected {', '.join(DIMS)}")
+    return tuple(d for d in DIMS if d in dims)  # canonical order, no repeats
+
+
+def _rates(counts: Sequence[int]) -> Dict[str, Optional[float]]:
+    # step conversion: each stage over the one before it
+    return {STAGES[i]: (round(counts[i] / counts[i - 1], 4) if counts[i - 1] else None) for i in range(1, len(STAGES))}
+
+
+class _Chunk:
+    __slots__ = ("ts", "action", "stage", "job", "locale", "n", "lo", "hi", "cache")
+
+    def __init__(self, size: int):
+        self.ts = np.zeros(size, np.uint32)
+        self.action = np.zeros(size, np.uint16)
+        self.stage = np.zeros(size, np.int8)
+        self.job = np.zeros(size, np.uint32)
+        self.locale = np.zeros(size, np.uint16)
+        self.n = 0
+        self.lo = 0xFFFFFFFF  # first / last ts in the chunk
+        self.hi = 0
+        self.cache: Dict[tuple, tuple] = {}  # query shape -> _count() result, once the chunk is full
+
+    def cached(self, key: tuple, compute: Callable[[], tuple]) -> tuple:
+        hit = self.cache.get(key)
+        if hit is None:
+            hit = compute()
+            if len(self.cache) >= _CACHE_PER_CHUNK:
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[key] = hit
+        return hit
+
+
+class FunnelAnalytics:
+    def __init__(self, lookup: Optional[Callable[[str], Optional[dict]]] = None, chunk_rows: int = CHUNK_ROWS):
+        # lookup(candidate_id) -> candidate row, for events whose payload lacks job_id/locale
+        self.lookup = lookup
+        self.chunk_rows = chunk_rows
+        self.actions = Interner()
+        self.jobs = Interner()
+        self.locales = Interner()
+        self._candidates = Interner()
+        self._reached = bytearray()  # candidate code -> bitmask of stages entered
+        self._chunks: List[_Chunk] = []
+        self._lock = threading.Lock()
+
+    # -- ingest --
+    def on_audit(self, events: Iterable[dict]) -> None:
+        # AuditWriter listener; also used to load an existing log
+        ts, act, stage, job, loc = [], [], [], [], []
+        with self._lock:
+            for e in events:
+                action = e.get("action") or ""
+                p = e.get("payload") or {}
+                cid = p.get("candidate_id")
+                j, l = p.get("job_id"), p.get("locale")
+                if cid and (j is None or l is None) and self.lookup:
+                    row = self.lookup(cid)
+                    if row:
+                        j = row.get("job_id") if j is None else j
+                        l = row.get("locale") if l is None else l
+                s = stage_of(action, p)
+                if s >= 0 and cid:
+                    c = self._candidates.code(cid)
+                    if c >= len(self._reached):
+                        self._reached.extend(bytes(max(1024, len(self._reached))))
+                    bit = 1 << s
+                    if self._reached[c] & bit:
+                        s = -1  # candidate already entered this stage
+                    else:
+                        self._reached[c] |= bit
+                ts.append(e.get("ts") or 0)
+                act.append(self.actions.code(action))
+                stage.append(s)
+                job.append(self.jobs.code(j))
+                loc.append(self.locales.code(l))
+                if len(ts) >= _INGEST_BATCH:  # bounded staging lists when loading a whole log
+                    self._append_lists(ts, act, stage, job, loc)
+                    ts, act, stage, job, loc = [], [], [], [], []
+            if ts:
+                self._append_lists(ts, act, stage, job, loc)
+
+    def _append_lists(self, ts, act, stage, job, loc) -> None:
+        self._append(np.asarray(ts, np.float64).astype(np.uint32), np.asarray(act, np.uint16),
+                     np.asarray(stage, np.int8), np.asarray(job, np.uint32), np.asarray(loc, np.uint16))
+
+    def append_columns(self, ts, action, stage, job, locale) -> None:
+        # bulk load of pre-coded columns (codes from self.actions/jobs/locales); stages are taken as given
+        with self._lock:
+            self._append(np.asarray(ts, np.uint32), np.asarray(action, np.uint16), np.asarray(stage, np.int8),
+                         np.asarray(job, np.uint32), np.asarray(locale, np.uint16))
+
+    def _append(self, ts, action, stage, job, locale) -> None:
+        # keep ts non-decreasing (batches from concurrent submitters can interleave by a few
+        # microseconds) so windows and day buckets are searchsorted slices instead of masks
+        prev = self._chunks[-1].hi if self._chunks and self._chunks[-1].n else 0
+        ts = np.maximum.accumulate(np.maximum(ts, np.uint32(prev)))
+        i, total = 0, len(ts)
+        while i < total:
+            ch = self._chunks[-1] if self._chunks else None
+            if ch is None or ch.n == self.chunk_rows:
+                ch = _Chunk(self.chunk_rows)
+                self._chunks.append(ch)
+            k = min(total - i, self.chunk_rows - ch.n)
+            a, b = ch.n, ch.n + k
+            ch.ts[a:b] = ts[i:i + k]
+            ch.action[a:b] = action[i:i + k]
+            ch.stage[a:b] = stage[i:i + k]
+            ch.job[a:b] = job[i:i + k]
+            ch.locale[a:b] = locale[i:i + k]
+            if a == 0:
+                ch.lo = int(ts[i])
+            ch.hi = int(ts[i + k - 1])
+            ch.n = b  # publish the rows only once they are written
+            i += k
+
+    def __len__(self) -> int:
+        return sum(ch.n for ch in self._chunks)
+
+    # -- queries --
+    def _scan(self, cutoff: Optional[float]):
+        # -> (sizes, [(chunk, start, stop)]) for the rows at or after cutoff
+        with self._lock:
+            chunks = [(ch, ch.n) for ch in self._chunks]
+            sizes = (len(self.actions.values), len(self.jobs.values), len(self.locales.values))
+        sel = []
+        for ch, n in chunks:
+            if not n or (cutoff is not None and ch.hi < cutoff):
+                continue
+            start = int(np.searchsorted(ch.ts[:n], cutoff)) if cutoff is not None and ch.lo < cutoff else 0
+            sel.append((ch, start, n))
+        return sizes, sel
+
+    def _count(self, ch: _Chunk, a: int, b: int, dims, J: int, L: int, jc, lc):
+        # sparse (key, count) pairs for rows [a, b) of a chunk, with
+        # key = ((day * J + job) * L + locale) * S1 + stage + 1 and day relative to the chunk's first day;
+        # rows without a stage, or filtered out, land in stage slot 0 and are dropped
+        S1 = len(STAGES) + 1
+        day_lo = int(ch.ts[a]) // DAY_S
+        D = int(ch.ts[b - 1]) // DAY_S - day_lo + 1 if "day" in dims else 1
+        nbins = D * J * L * S1
+        dt = np.int32 if nbins < _BINCOUNT_MAX else np.int64
+        k = ch.stage[a:b].astype(dt)
+        k += 1
+        if "locale" in dims:
+            k += ch.locale[a:b].astype(dt) * S1
+        if "job" in dims:
+            k += ch.job[a:b].astype(dt) * (L * S1)
+        if jc is not None:
+            k *= ch.job[a:b] == jc
+        if lc is not None:
+            k *= ch.locale[a:b] == lc
+        if D > 1:
+            bounds = np.searchsorted(ch.ts[a:b], (day_lo + np.arange(1, D)) * DAY_S)
+            for start in bounds.tolist():
+                k[start:] += J * L * S1  # rows after each midnight move up one day
+        if nbins < _BINCOUNT_MAX:
+            counts = np.bincount(k, minlength=nbins)
+            keys = np.flatnonzero(counts)
+            counts = counts[keys]
+        else:
+            keys, counts = np.unique(k, return_counts=True)
+        keep = keys % S1 != 0
+        return day_lo, keys[keep].astype(np.int64), counts[keep]
+
+    def funnel(self, group_by: Sequence[str] = (), window_s: Optional[float] = None, job_id: Optional[str] = None,
+               locale: Optional[str] = None, now: Optional[float] = None) -> dict:
+        t0 = time.perf_counter()
+        now = time.time() if now is None else now
+        cutoff = None if window_s is None else now - window_s
+        dims = tuple(d for d in DIMS if d in group_by)
+        (_, n_jobs, n_locales), sel = self._scan(cutoff)
+        jc = lc = None
+        if job_id is not None:
+            jc = self.jobs.lookup(job_id)
+        if locale is not None:
+            lc = self.locales.lookup(locale)
+        if (job_id is not None and jc is None) or (locale is not None and lc is None):
+            sel = []  # filter value never occurred
+        S1 = len(STAGES) + 1
+        J = max(1, n_jobs) if "job" in dims else 1
+        L = max(1, n_locales) if "locale" in dims else 1
+        stride = J * L * S1  # one day
+        parts_k, parts_c = [], []
+        scanned = 0
+        for ch, a, b in sel:
+            scanned += b - a
+            compute = lambda: self._count(ch, a, b, dims, J, L, jc, lc)
+            if a == 0 and b == self.chunk_rows:  # full chunks never change
+                day_lo, keys, counts = ch.cached((dims, jc, lc, J, L), compute)
+            else:
+                day_lo, keys, counts = compute()
+            parts_k.append(keys + day_lo * stride if "day" in dims else keys)
+            parts_c.append(counts)
+        if parts_k:
+            keys, inv = np.unique(np.concatenate(parts_k), return_inverse=True)
+            counts = np.bincount(inv, weights=np.concatenate(parts_c)).astype(np.int64)
+        else:
+            keys = counts = np.zeros(0, np.int64)
+        group, stage = np.divmod(keys, S1)
+        totals = np.bincount(stage - 1, weights=counts, minlength=len(STAGES)).astype(np.int64).tolist()
+        rows = []
+        if dims and len(keys):
+            groups, gi = np.unique(group, return_inverse=True)
+            grid = np.zeros((len(groups), len(STAGES)), np.int64)
+            np.add.at(grid, (gi, stage - 1), counts)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rates = np.round(grid[:, 1:] / grid[:, :-1], 4)
+            day, rest = np.divmod(groups, J * L)
+            labels = []
+            if "job" in dims:
+                labels.append(("job_id", [self.jobs.values[j] for j in (rest // L).tolist()]))
+            if "locale" in dims:
+                labels.append(("locale", [self.locales.values[l] for l in (rest % L).tolist()]))
+            if "day" in dims:
+                names = {d: time.strftime("%Y-%m-%d", time.gmtime(d * DAY_S)) for d in np.unique(day).tolist()}
+                labels.append(("day", [names[d] for d in day.tolist()]))
+            label_names = [name for name, _ in labels]
+            for lab, counts_g, rates_g in zip(zip(*(v for _, v in labels)), grid.tolist(), rates.tolist()):
+                row = dict(zip(label_names, lab))
+                row.update(zip(STAGES, counts_g))
+                row["rates"] = {s: (None if r != r or r == _INF else r) for s, r in zip(STAGES[1:], rates_g)}
+                rows.append(row)
+        return {
+            "stages": list(STAGES), "group_by": list(dims), "window_s": window_s,
+            "totals": {**dict(zip(STAGES, totals)), "rates": _rates(totals)},
+            "groups": rows,
+            "events_scanned": scanned,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+        }
+
+    def action_counts(self, actions: Sequence[str], window_s: Optional[float] = None, job_id: Optional[str] = None,
+                      now: Optional[float] = None) -> Dict[str, int]:
+        # raw event counts per action (not distinct candidates)
+        now = time.time() if now is None else now
+        out = {a: 0 for a in actions}
+        codes = {a: self.actions.lookup(a) for a in actions}
+        jc = None if job_id is None else self.jobs.lookup(job_id)
+        if all(c is None for c in codes.values()) or (job_id is not None and jc is None):
+            return out
+        (n_actions, _, _), sel = self._scan(None if window_s is None else now - window_s)
+        acc = np.zeros(n_actions, np.int64)
+        for ch, a, b in sel:
+            act = ch.action[a:b] if jc is None else ch.action[a:b][ch.job[a:b] == jc]
+            acc += np.bincount(act, minlength=n_actions)[:n_actions]
+        for name, c in codes.items():
+            if c is not None:
+                out[name] = int(acc[c])
+        return out
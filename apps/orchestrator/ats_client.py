@@ -0,0 +1,161 @@
+import asyncio, time, weakref
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# ---- shared async ATS client ----
+# One pooled httpx.AsyncClient (keep-alive, connection limits, timeouts) plus a
+# semaphore capping in-flight ATS writes. Pools are per event loop (the server
+# loop, the outbox and outreach loop threads, TestClient, scripts); aclose()
+# closes the calling loop's pool, so each loop closes its own at shutdown.
+
+class AtsClient:
+    def __init__(self, ats_base: str, connector_base: Optional[str] = None, max_concurrency: int = 64,
+                 max_connections: int = 100, max_keepalive: int = 20, timeout_s: float = 5.0,
+                 connect_timeout_s: float = 2.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.ats_base = ats_base.rstrip("/")
+        self.connector_base = connector_base.rstrip("/") if connector_base else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.timeout = httpx.Timeout(timeout_s, connect=connect_timeout_s)
+        self.transport = transport
+        self.on_response: Optional[Callable[[str, int, float], None]] = None  # (url, status or 0, seconds)
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+    def _state(self):
+        loop = asyncio.get_running_loop()
+        st = self._loops.get(loop)
+        if st is None:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, transport=self.transport)
+            st = (client, asyncio.Semaphore(self.max_concurrency))
+            self._loops[loop] = st
+        return st
+
+    def application_url(self, prefer_connector: bool = True) -> str:
+        if prefer_connector and self.connector_base:
+            return f"{self.connector_base}/application"
+        return f"{self.ats_base}/applications"
+
+    def batch_url(self, prefer_connector: bool = True) -> str:
+        if prefer_connector and self.connector_base:
+            return f"{self.connector_base}/application/batch"
+        return f"{self.ats_base}/applications/batch"
+
+    async def post(self, url: str, body: dict, headers: Optional[dict] = None) -> dict:
+        client, sem = self._state()
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                resp = await client.post(url, json=body, headers=headers)
+            except httpx.HTTPError:
+                if self.on_response:
+                    self.on_response(url, 0, time.perf_counter() - t0)
+                raise
+        if self.on_response:
+            self.on_response(url, resp.status_code, time.perf_counter() - t0)
+        resp.raise_for_status()
+        try:
+            return resp.json()
+        except ValueError:
+            return {}
+
+    async def create_application(self, candidate_id: str, job_id: str, slot: str,
+                                 prefer_connector: bool = True, idempotency_key: Optional[str] = None) -> dict:
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        return await self.post(self.application_url(prefer_connector),
+                               {"candidate_id": candidate_id, "job_id": job_id, "slot": slot}, headers=headers)
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        st = self._loops.pop(loop, None)
+        if st is not None:
+            await st[0].aclose()
+
+
+class AtsItemError(RuntimeError):
+    pass
+
+
+class AtsBatcher:
+    # Coalesces application writes issued within `window_s` into one POST to the
+    # batch endpoint; each caller still awaits its own per-item result.
+    def __init__(self, client: AtsClient, window_s: float = 0.005, max_batch: int = 200):
+        self.client = client
+        self.window_s = max(0.0, window_s)
+        self.max_batch = max(1, max_batch)
+        self.batches_sent = 0
+        self._tasks: set = set()
+        # per loop: key -> open bucket, and key -> the window timer of that bucket
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+    def _pending(self) -> Tuple[Dict[Tuple[str, str], list], Dict[Tuple[str, str], asyncio.TimerHandle]]:
+        loop = asyncio.get_running_loop()
+        st = self._loops.get(loop)
+        if st is None:
+            st = self._loops[loop] = ({}, {})
+        return st
+
+    async def create_application(self, candidate_id: str, job_id: str, slot: str,
+                                 prefer_connector: bool = True, idempotency_key: Optional[str] = None) -> dict:
+        loop = asyncio.get_running_loop()
+        key = (self.client.batch_url(prefer_connector), self.client.application_url(prefer_connector))
+        pending, timers = self._pending()
+        bucket = pending.setdefault(key, [])
+        fut = loop.create_future()
+        item = {"candidate_id": candidate_id, "job_id": job_id, "slot": slot}
+        if idempotency_key:
+            item["idempotency_key"] = idempotency_key
+        bucket.append((item, fut))
+        if len(bucket) >= self.max_batch:
+            self._flush(key)
+        elif len(bucket) == 1:
+            timers[key] = loop.call_later(self.window_s, self._flush, key)
+        return await fut
+
+    def _flush(self, key: Tuple[str, str]) -> None:
+        pending, timers = self._pending()
+        timer = timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()  # flushed early (full): the window belongs to this bucket, not the next one
+        batch = pending.pop(key, None)
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._send(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _post_single(self, url: str, item: dict) -> dict:
+        body = dict(item)
+        key = body.pop("idempotency_key", None)
+        return await self.client.post(url, body, headers={"Idempotency-Key": key} if key else None)
+
+    async def _send(self, key: Tuple[str, str], batch: List[tuple]) -> None:
+        batch_url, single_url = key
+        try:
+            if len(batch) == 1:
+                results = [{"ok": True, **(await self._post_single(single_url, batch[0][0]))}]
+            else:
+                try:
+                    body = await self.client.post(batch_url, {"items": [item for item, _ in batch]})
+                    results = body.get("results") or []
+                    self.batches_sent += 1
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code not in (404, 405):
+                        raise
+                    # ATS without a batch endpoint: fall back to concurrent single writes
+                    results = await asyncio.gather(
+                        *(self._post_single(single_url, item) for item, _ in batch), return_exceptions=True)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for i, (_, fut) in enumerate(batch):
+            if fut.done():
+                continue
+            res = results[i] if i < len(results) else AtsItemError("missing result in ATS batch response")
+            if isinstance(res, BaseException):
+                fut.set_exception(res)
+            elif res.get("ok", True) is False:
+                fut.set_exception(AtsItemError(res.get("error") or "ATS rejected item"))
+            else:
+                fut.set_result(res)
@@ -0,0 +1,263 @@
+import os, json, mmap, struct, threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
+
+# ---- audit storage engines ----
+# Both engines expose the same list-like surface used by main.py:
+# append(event), len(), store[i], store[a:b], iteration.
+
+class MemoryAuditStore(list):
+    kind = "memory"
+
+    def append(self, event: dict) -> int:
+        super().append(event)
+        return len(self) - 1
+
+    def iter_from(self, start: int) -> Iterator[dict]:
+        for i in range(start, len(self)):
+            yield self[i]
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+_LEN = struct.Struct("<I")   # record length prefix
+_OFF = struct.Struct("<Q")   # index entry: byte offset of record in segment
+
+
+class _Segment:
+    # One fixed-size data file plus its offset index.
+    def __init__(self, path: str, base: int, size: int, writable: bool):
+        self.base = base
+        self.data_path = path + ".seg"
+        self.idx_path = path + ".idx"
+        self.writable = writable
+        if writable and not os.path.exists(self.data_path):
+            with open(self.data_path, "wb") as f:
+                f.truncate(size)
+        self._data_f = open(self.data_path, "r+b" if writable else "rb")
+        self.size = os.fstat(self._data_f.fileno()).st_size
+        self.data = mmap.mmap(self._data_f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        self.offsets: List[int] = []
+        self._idx_f = open(self.idx_path, "a+b" if writable else "rb")
+        self._load_index()
+
+    def _load_index(self) -> None:
+        self._idx_f.seek(0)
+        raw = self._idx_f.read()
+        usable = len(raw) - (len(raw) % _OFF.size)
+        offsets = [o for (o,) in _OFF.iter_unpack(raw[:usable])]
+        # drop any tail entries that point past what was actually written
+        while offsets:
+            end = self._record_end(offsets[-1])
+            if end is not None:
+                break
+            offsets.pop()
+        self.offsets = offsets
+        if self.writable and usable != len(offsets) * _OFF.size:
+            self._idx_f.truncate(len(offsets) * _OFF.size)
+
+    def _record_end(self, off: int) -> Optional[int]:
+        if off + _LEN.size > self.size:
+            return None
+        (n,) = _LEN.unpack_from(self.data, off)
+        if n == 0 or off + _LEN.size + n > self.size:
+            return None
+        return off + _LEN.size + n
+
+    @property
+    def count(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def write_pos(self) -> int:
+        if not self.offsets:
+            return 0
+        return self._record_end(self.offsets[-1]) or 0
+
+    def fits(self, n: int) -> bool:
+        return self.write_pos + _LEN.size + n <= self.size
+
+    def append(self, blob: bytes) -> None:
+        off = self.write_pos
+        _LEN.pack_into(self.data, off, len(blob))
+        self.data[off + _LEN.size: off + _LEN.size + len(blob)] = blob
+        self._idx_f.write(_OFF.pack(off))
+        self.offsets.append(off)
+
+    def read(self, i: int) -> dict:
+        off = self.offsets[i]
+        (n,) = _LEN.unpack_from(self.data, off)
+        return json.loads(self.data[off + _LEN.size: off + _LEN.size + n])
+
+    def flush(self, fsync: bool = False) -> None:
+        if not self.writable:
+            return
+        self.data.flush()
+        self._idx_f.flush()
+        if fsync:
+            os.fsync(self._idx_f.fileno())
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self.data.close()
+            self._data_f.close()
+            self._idx_f.close()
+
+
+class SegmentedAuditStore:
+    # Append-only log over fixed-size, memory-mapped segment files.
+    # Segments are named by the global index of their first record, so
+    # locating record n is a bisect over segment bases plus one index read.
+    kind = "segmented"
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 max_open_segments: int = 8, fsync: bool = False, readonly: bool = False):
+        self.directory = directory
+        self.readonly = readonly
+        self.segment_bytes = segment_bytes
+        self.max_open_segments = max(1, max_open_segments)
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._open: "OrderedDict[int, _Segment]" = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+        self._bases: List[int] = sorted(
+            int(name[:-4]) for name in os.listdir(directory) if name.endswith(".seg") and name[:-4].isdigit()
+        )
+        self._active: Optional[_Segment] = None
+        self._len = 0
+        if not self._bases:
+            if readonly:
+                return  # nothing written yet: an empty log, no segment to map
+            self._bases = [0]
+        self._active = _Segment(self._path(self._bases[-1]), self._bases[-1], segment_bytes, writable=not readonly)
+        self._len = self._active.base + self._active.count
+
+    def _path(self, base: int) -> str:
+        return os.path.join(self.directory, f"{base:020d}")
+
+    def _segment(self, seg_no: int) -> _Segment:
+        base = self._bases[seg_no]
+        if base == self._active.base:
+            return self._active
+        seg = self._open.get(base)
+        if seg is not None:
+            self._open.move_to_end(base)
+            return seg
+        seg = _Segment(self._path(base), base, self.segment_bytes, writable=False)
+        self._open[base] = seg
+        while len(self._open) > self.max_open_segments:
+            _, old = self._open.popitem(last=False)
+            old.close()
+        return seg
+
+    def _roll(self, need: int) -> None:
+        self._active.flush(self.fsync)
+        sealed = self._active
+        sealed.close()
+        # oversized records get a segment of their own
+        size = max(self.segment_bytes, _LEN.size + need)
+        base = self._len
+        if sealed.count == 0:
+            # the active segment is still empty (fresh directory, or the record is bigger than a
+            # segment): enlarge it in place, a second segment cannot share its base
+            with open(sealed.data_path, "r+b") as f:
+                f.truncate(size)
+            self._active = _Segment(self._path(base), base, size, writable=True)
+            return
+        self._active = _Segment(self._path(base), base, size, writable=True)
+        self._bases.append(base)
+
+    def append(self, event: dict) -> int:
+        if self.readonly:
+            raise PermissionError("audit store opened read-only")
+        blob = json.dumps(event, separators=(",", ":")).encode()
+        with self._lock:
+            if not self._active.fits(len(blob)):
+                self._roll(len(blob))
+            self._active.append(blob)
+            idx = self._len
+            self._len += 1
+            return idx
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _get(self, n: int) -> dict:
+        seg_no = bisect_right(self._bases, n) - 1
+        seg = self._segment(seg_no)
+        return seg.read(n - seg.base)
+
+    def read(self, start: int, stop: int) -> List[dict]:
+        with self._lock:
+            start, stop = max(0, start), min(stop, self._len)
+            out: List[dict] = []
+            n = start
+            while n < stop:
+                seg_no = bisect_right(self._bases, n) - 1
+                seg = self._segment(seg_no)
+                end = min(stop, seg.base + seg.count)
+                out.extend(seg.read(i - seg.base) for i in range(n, end))
+                n = end
+            return out
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._len)
+            if step != 1:
+                return self.read(start, stop)[::step]
+            return self.read(start, stop)
+        n = key + self._len if key < 0 else key
+        if n < 0 or n >= self._len:
+            raise IndexError("audit index out of range")
+        with self._lock:
+            return self._get(n)
+
+    def __iter__(self) -> Iterator[dict]:
+        return self.iter_from(0)
+
+    def iter_from(self, start: int, chunk: int = 1024) -> Iterator[dict]:
+        n = start
+        while n < self._len:
+            page = self.read(n, n + chunk)
+            yield from page
+            n += len(page)
+
+    def segments(self) -> List[Tuple[int, int]]:
+        # (first index, record count) per segment, oldest first
+        with self._lock:
+            bounds = self._bases + [self._len]
+            return [(bounds[i], bounds[i + 1] - bounds[i]) for i in range(len(self._bases))]
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._active is not None:
+                self._active.flush(self.fsync)
+
+    def close(self) -> None:
+        with self._lock:
+            for seg in self._open.values():
+                seg.close()
+            self._open.clear()
+            if self._active is not None:
+                self._active.close()
+
+
+def open_audit_store(kind: Optional[str] = None, directory: Optional[str] = None,
+                     segment_bytes: Optional[int] = None):
+    kind = (kind or os.getenv("AUDIT_STORE", "memory")).lower()
+    if kind == "memory":
+        return MemoryAuditStore()
+    if kind == "segmented":
+        return SegmentedAuditStore(
+            directory or os.getenv("AUDIT_DIR", "./data/audit"),
+            segment_bytes=segment_bytes or int(os.getenv("AUDIT_SEGMENT_BYTES", str(64 * 1024 * 1024))),
+            fsync=os.getenv("AUDIT_FSYNC", "false").lower() == "true",
+        )
+    raise ValueError(f"unknown audit store: {kind}")
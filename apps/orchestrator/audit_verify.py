@@ -0,0 +1,167 @@
+import os, json, hmac, hashlib, threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Iterable, List, Optional
+
+from .audit_store import SegmentedAuditStore
+
+# ---- audit chain hashing, checkpoints and verification ----
+
+def chain_hash(ts: float, payload: dict, prev: Optional[str], secret: str) -> str:
+    # sha256(ts + payload_sorted + prev_hash + secret); must match packages/testing/test_audit_hash.py
+    body = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256((str(ts) + body + (prev or "") + secret).encode()).hexdigest()
+
+
+def verify_events(events: Iterable[dict], prev: Optional[str], secret: str, start: int = 0) -> dict:
+    # Re-hash a contiguous run of events whose predecessor hash is `prev`.
+    idx = start
+    for e in events:
+        expected = chain_hash(e["ts"], e["payload"], prev, secret)
+        if e.get("hash") != expected or e.get("prev_hash") != prev:
+            return {"ok": False, "broken_at": idx, "last_hash": prev}
+        prev = e["hash"]
+        idx += 1
+    return {"ok": True, "checked": idx - start, "last_hash": prev}
+
+
+class Checkpoints:
+    # Signed (index, hash) pairs taken every `every` events. A checkpoint
+    # asserts that AUDIT[index]["hash"] == hash at the time it was written.
+    def __init__(self, secret: str, every: int = 10000, path: Optional[str] = None):
+        self.secret = secret
+        self.every = max(1, every)
+        self.path = path
+        self.items: List[dict] = []
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            self.items.append(json.loads(line))
+                        except ValueError:
+                            break  # torn tail write
+
+    def sign(self, index: int, h: str) -> str:
+        return hmac.new(self.secret.encode(), f"{index}:{h}".encode(), hashlib.sha256).hexdigest()
+
+    def valid(self, cp: dict) -> bool:
+        return hmac.compare_digest(cp.get("sig", ""), self.sign(cp["index"], cp["hash"]))
+
+    def maybe_record(self, index: int, h: str) -> Optional[dict]:
+        if (index + 1) % self.every:
+            return None
+        return self.record(index, h)
+
+    def record(self, index: int, h: str) -> dict:
+        cp = {"index": index, "hash": h, "sig": self.sign(index, h)}
+        with self._lock:
+            self.items.append(cp)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(cp) + "\n")
+        return cp
+
+    def latest_valid(self, below: int) -> Optional[dict]:
+        for cp in reversed(self.items):
+            if cp["index"] < below and self.valid(cp):
+                return cp
+        return None
+
+
+def verify_incremental(store, checkpoints: Checkpoints, secret: str) -> dict:
+    # Trust the newest valid checkpoint and only re-hash what came after it.
+    total = len(store)
+    cp = checkpoints.latest_valid(total)
+    start, prev = 0, None
+    if cp:
+        if store[cp["index"]].get("hash") != cp["hash"]:
+            return {"ok": False, "broken_at": cp["index"], "count": total, "from_checkpoint": cp["index"]}
+        start, prev = cp["index"] + 1, cp["hash"]
+    res = verify_events(store.iter_from(start), prev, secret, start=start)
+    out = {"ok": res["ok"], "count": total, "from_checkpoint": cp["index"] if cp else None}
+    if res["ok"]:
+        out["checked"] = res["checked"]
+    else:
+        out["broken_at"] = res["broken_at"]
+    return out
+
+
+def _verify_span(job: dict) -> dict:
+    # Process-pool worker: verify [start, stop) given the expected predecessor
+    # hash and, if the span ends on a checkpoint, the expected final hash.
+    start, stop = job["start"], job["stop"]
+    if job.get("events") is not None:
+        events = job["events"]
+    else:
+        store = SegmentedAuditStore(job["store_dir"], readonly=True)
+        try:
+            events = store.read(start, stop)
+        finally:
+            store.close()
+    res = verify_events(events, job["prev"], job["secret"], start=start)
+    out = {"start": start, "end": stop - 1, "ok": res["ok"]}
+    if not res["ok"]:
+        out["broken_at"] = res["broken_at"]
+    elif job.get("end_hash") and res["last_hash"] != job["end_hash"]:
+        out["ok"] = False
+        out["broken_at"] = stop - 1
+    return out
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn: the orchestrator is multi-threaded, forking it is unsafe
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+        return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+
+def verify_full(store, checkpoints: Checkpoints, secret: str, workers: Optional[int] = None,
+                parallel_min_events: int = 50000) -> dict:
+    # Split the chain at valid checkpoints and verify every span independently.
+    total = len(store)
+    cps = [cp for cp in checkpoints.items if cp["index"] < total]
+    invalid = [cp["index"] for cp in cps if not checkpoints.valid(cp)]
+    cps = [cp for cp in cps if checkpoints.valid(cp)]
+    jobs, start, prev = [], 0, None
+    for cp in cps + [None]:
+        stop = cp["index"] + 1 if cp else total
+        if stop <= start:
+            continue
+        job = {"start": start, "stop": stop, "prev": prev, "secret": secret, "end_hash": cp["hash"] if cp else None}
+        if getattr(store, "kind", "") == "segmented":
+            job["events"] = None
+            job["store_dir"] = store.directory
+        else:
+            job["events"] = store[start:stop]
+        jobs.append(job)
+        start, prev = stop, cp["hash"] if cp else prev
+    if getattr(store, "kind", "") == "segmented":
+        store.flush()  # workers read the segment files directly
+    workers = workers or int(os.getenv("AUDIT_VERIFY_WORKERS", "0")) or (os.cpu_count() or 2)
+    if len(jobs) > 1 and total >= parallel_min_events and workers > 1:
+        segments = list(_pool(workers).map(_verify_span, jobs))
+    else:
+        segments = [_verify_span(j) for j in jobs]
+    broken = [s["broken_at"] for s in segments if not s["ok"]]
+    out = {"ok": not broken and not invalid, "count": total, "mode": "full", "segments": segments}
+    if broken:
+        out["broken_at"] = min(broken)
+    if invalid:
+        out["invalid_checkpoints"] = invalid
+    return out
@@ -0,0 +1,173 @@
+import json, logging, threading, time, uuid
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+from .audit_verify import Checkpoints, chain_hash
+
+# ---- single-writer audit append with group commit ----
+# Request threads only enqueue (actor, action, payload); one writer thread
+# stamps, chains, appends and flushes whole batches, so LAST_HASH never forks
+# and ts order always matches chain order.
+
+class AuditWriteError(RuntimeError):
+    pass
+
+
+class AuditWriter:
+    def __init__(self, store, secret: str, checkpoints: Optional[Checkpoints] = None,
+                 max_batch: int = 1024, max_delay_s: float = 0.0,
+                 on_commit: Optional[Callable[[int, float, float], None]] = None):
+        self.store = store
+        self.secret = secret
+        self.checkpoints = checkpoints
+        self.max_batch = max(1, max_batch)
+        self.max_delay_s = max(0.0, max_delay_s)
+        self.on_commit = on_commit  # (events, commit_s, oldest event's submit-to-commit s)
+        self.last_hash: Optional[str] = store[-1]["hash"] if len(store) else None
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[float, dict]] = []  # (submitted at, event without ts/hash)
+        self._submitted = 0
+        self._committed = 0
+        self._failed: Deque[Tuple[int, int, str]] = deque(maxlen=64)  # (first_seq, last_seq, error)
+        self._listeners: List[Callable[[List[dict]], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.batches = 0
+
+    def add_listener(self, fn: Callable[[List[dict]], None]) -> None:
+        # called on the writer thread with each committed batch, in chain order
+        self._listeners.append(fn)
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, actor: str, action: str, payload: dict, wait: bool = False,
+               timeout: Optional[float] = None) -> int:
+        # payload must not be mutated by the caller after submit
+        item = {"id": str(uuid.uuid4()), "actor": actor, "action": action, "payload": payload}
+        with self._cond:
+            if self._closed:
+                raise AuditWriteError("audit writer is closed")
+            self._ensure_started()
+            self._pending.append((time.time(), item))
+            self._submitted += 1
+            seq = self._submitted
+            self._cond.notify_all()
+        if wait:
+            self.wait_for(seq, timeout)
+        return seq
+
+    def submit_many(self, actor: str, action: str, payloads: List[dict]) -> int:
+        # one lock round-trip for a whole chunk of events; returns the last seq
+        return self.submit_events([(actor, action, p) for p in payloads])
+
+    def submit_events(self, events: List[Tuple[str, str, dict]]) -> int:
+        # (actor, action, payload) triples, appended in order
+        now = time.time()
+        items = [(now, {"id": str(uuid.uuid4()), "actor": a, "action": act, "payload": p}) for a, act, p in events]
+        with self._cond:
+            if self._closed:
+                raise AuditWriteError("audit writer is closed")
+            self._ensure_started()
+            self._pending.extend(items)
+            self._submitted += len(items)
+            seq = self._submitted
+            self._cond.notify_all()
+        return seq
+
+    def wait_for(self, seq: int, timeout: Optional[float] = None) -> None:
+        # block until event `seq` (and everything before it) is appended and flushed
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._committed < seq:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("audit commit timed out")
+                self._cond.wait(remaining)
+            for first, last, err in self._failed:
+                if first <= seq <= last:
+                    raise AuditWriteError(err)
+
+    def drain(self, timeout: Optional[float] = None) -> None:
+        # read barrier: everything submitted before this call is visible in the store
+        with self._cond:
+            seq = self._submitted
+        if seq:
+            self.wait_for(seq, timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._submitted - self._committed
+
+    def _take_batch(self) -> List[Tuple[float, dict]]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self.max_delay_s and len(self._pending) < self.max_batch and not self._closed:
+                # linger briefly so more appends share the flush
+                self._cond.wait(self.max_delay_s)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:len(batch)]
+            return batch
+
+    def _commit(self, items: List[dict]) -> Tuple[int, int, Optional[str]]:
+        # -> (events appended to the chain, events also flushed, error that stopped the rest)
+        appended, error = 0, None
+        try:
+            for item in items:
+                prev = self.last_hash
+                item["ts"] = time.time()
+                h = chain_hash(item["ts"], item["payload"], prev, self.secret)
+                item["hash"] = h
+                item["prev_hash"] = prev
+                idx = self.store.append(item)
+                # advance per event so a failure mid-batch cannot fork the chain
+                self.last_hash = h
+                appended += 1
+                if self.checkpoints:
+                    self.checkpoints.maybe_record(idx, h)
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+        try:
+            self.store.flush()
+        except Exception as e:
+            return appended, 0, str(e) or e.__class__.__name__
+        return appended, appended, error
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return  # closed and drained
+            items = [item for _, item in batch]
+            t0 = time.perf_counter()
+            appended, durable, error = self._commit(items)
+            if error is not None:
+                logging.error(json.dumps({"type": "audit_write_error", "error": error, "dropped": len(items) - appended}))
+            if appended:
+                # the appended prefix is in the chain: listeners see it even if the rest failed
+                self.batches += 1
+                if self.on_commit:
+                    try:
+                        self.on_commit(appended, time.perf_counter() - t0, time.time() - batch[0][0])
+                    except Exception as e:
+                        logging.error(json.dumps({"type": "audit_listener_error", "error": str(e)}))
+                for fn in self._listeners:
+                    try:
+                        fn(items[:appended])
+                    except Exception as e:
+                        logging.error(json.dumps({"type": "audit_listener_error", "error": str(e)}))
+            with self._cond:
+                if durable < len(items):
+                    self._failed.append((self._committed + durable + 1, self._committed + len(items), error))
+                self._committed += len(items)
+                self._cond.notify_all()
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,191 @@
+import csv, io, json, logging, os, threading, time, uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+# ---- streaming bulk candidate import ----
+# Uploads are parsed row by row (CSV or NDJSON) from a spooled file, so memory
+# stays bounded by the chunk size. Each chunk is validated in one pass, deduped
+# on the normalized phone and handed to `apply` as a list of clean rows.
+
+CSV, NDJSON = "csv", "ndjson"
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str], explicit: Optional[str] = None) -> str:
+    fmt = (explicit or "").lower()
+    if fmt in (CSV, NDJSON):
+        return fmt
+    if fmt in ("jsonl", "json"):
+        return NDJSON
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (content_type or "") or "jsonl" in (content_type or ""):
+        return NDJSON
+    return CSV
+
+
+def iter_records(text: io.TextIOBase, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    # yields (line, record, parse_error); blank CSV cells are omitted so model defaults apply
+    if fmt == NDJSON:
+        for line_no, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"invalid JSON: {e}"
+                continue
+            if isinstance(rec, dict):
+                yield line_no, rec, None
+            else:
+                yield line_no, None, "expected a JSON object"
+        return
+    reader = csv.DictReader(text)
+    for rec in reader:
+        rec = {k.strip(): v.strip() for k, v in rec.items() if k and v is not None and v.strip() != ""}
+        yield reader.line_num, rec, None
+
+
+class ImportJob:
+    def __init__(self, filename: str, fmt: str, total_bytes: int):
+        self.id = str(uuid.uuid4())
+        self.filename = filename
+        self.format = fmt
+        self.total_bytes = total_bytes
+        self.status = "queued"
+        self.bytes_read = 0
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors: List[dict] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        progress = 1.0 if self.status == "done" else (self.bytes_read / self.total_bytes if self.total_bytes else 0.0)
+        return {
+            "job_id": self.id, "status": self.status, "filename": self.filename, "format": self.format,
+            "rows": self.rows, "imported": self.imported, "duplicates": self.duplicates, "invalid": self.invalid,
+            "progress": round(min(progress, 1.0), 4), "rows_per_s": round(self.rows / elapsed, 1) if elapsed else 0.0,
+            "elapsed_s": round(elapsed, 3), "errors": self.errors, "error": self.error,
+        }
+
+
+class CandidateImporter:
+    def __init__(self, model: type, apply: Callable[[List[dict]], None], exists: Callable[[str], bool],
+                 key: Callable[[Optional[str]], str], chunk_size: int = 1000, workers: int = 1,
+                 max_errors: int = 50, keep_jobs: int = 100):
+        self.model = model
+        self.adapter = TypeAdapter(List[model])
+        self.apply = apply
+        self.exists = exists
+        self.key = key
+        self.chunk_size = max(1, chunk_size)
+        self.max_errors = max_errors
+        self.keep_jobs = keep_jobs
+        self.jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._apply_lock = threading.Lock()  # dedupe + apply are atomic per chunk
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="candidate-import")
+
+    def start(self, path: str, filename: str, fmt: str) -> ImportJob:
+        # takes ownership of `path` and deletes it when the import finishes
+        job = ImportJob(filename, fmt, os.path.getsize(path))
+        with self._jobs_lock:
+            self.jobs[job.id] = job
+            self._evict()
+        self._pool.submit(self._run, job, path)
+        return job
+
+    def _evict(self) -> None:
+        # oldest finished jobs beyond keep_jobs; queued and running imports stay pollable
+        over = len(self.jobs) - self.keep_jobs
+        if over > 0:
+            for job_id in [j.id for j in self.jobs.values() if j.finished_at is not None][:over]:
+                del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        return self.jobs.get(job_id)
+
+    def _error(self, job: ImportJob, line: int, msg: str) -> None:
+        job.invalid += 1
+        if len(job.errors) < self.max_errors:
+            job.errors.append({"line": line, "error": msg})
+
+    def _run(self, job: ImportJob, path: str) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            with open(path, "rb") as raw:
+                text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+                chunk: List[Tuple[int, dict]] = []
+                for line, rec, err in iter_records(text, job.format):
+                    job.rows += 1
+                    if err:
+                        self._error(job, line, err)
+                        continue
+                    chunk.append((line, rec))
+                    if len(chunk) >= self.chunk_size:
+                        self._process(job, chunk)
+                        chunk = []
+                        job.bytes_read = raw.tell()
+                self._process(job, chunk)
+                job.bytes_read = job.total_bytes
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logging.error(json.dumps({"type": "candidate_import_error", "job_id": job.id, "error": str(e)}))
+        finally:
+            job.finished_at = time.time()
+            with self._jobs_lock:
+                self._evict()  # jobs kept while running may have gone over keep_jobs
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _validate(self, job: ImportJob, chunk: List[Tuple[int, dict]]) -> List[Tuple[int, dict]]:
+        try:
+            models = self.adapter.validate_python([rec for _, rec in chunk])
+            return [(line, m.model_dump()) for (line, _), m in zip(chunk, models)]
+        except ValidationError:
+            pass
+        # at least one bad row: validate individually to report it and keep the rest
+        out = []
+        for line, rec in chunk:
+            try:
+                out.append((line, self.model.model_validate(rec).model_dump()))
+            except ValidationError as e:
+                first = e.errors()[0]
+                self._error(job, line, f"{'.'.join(str(p) for p in first['loc'])}: {first['msg']}")
+        return out
+
+    def _process(self, job: ImportJob, chunk: List[Tuple[int, dict]]) -> None:
+        if not chunk:
+            return
+        rows = self._validate(job, chunk)
+        with self._apply_lock:
+            seen, fresh = set(), []
+            for line, row in rows:
+                k = self.key(row.get("phone"))
+                if not k:
+                    self._error(job, line, "phone: no digits")
+                    continue
+                if k in seen or self.exists(k):
+                    job.duplicates += 1
+                    continue
+                seen.add(k)
+                fresh.append(row)
+            if fresh:
+                self.apply(fresh)
+        job.imported += len(fresh)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
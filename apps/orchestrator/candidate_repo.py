@@ -0,0 +1,217 @@
+import bisect
+from array import array
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+from .columnar import ColumnarTable
+
+# ---- candidate repository with secondary hash indexes ----
+# Dict-compatible (CANDIDATES[cid], .items(), in, len) so existing handlers keep
+# working. Rows live in a ColumnarTable and reads return read-only snapshots
+# (a stale CANDIDATES[cid]["k"] = v raises instead of being lost), so records
+# must be changed through update()/__setitem__, which also keeps the
+# phone/status/locale/job indexes in sync. Indexes hold row numbers, not ids.
+
+INDEXED = ("status", "locale", "job_id")
+FIELDS = ("name", "phone", "locale", "consent", "status", "job_id")
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    # "whatsapp:+1 (555) 010-0000" and "+15550100000" share a key
+    if not phone:
+        return ""
+    return "".join(ch for ch in str(phone) if ch.isdigit())
+
+
+def _phone_key(phone: Optional[str]) -> Optional[int]:
+    # normalized digits as an int (half the size of the string); the leading 1 keeps "0555" != "555"
+    digits = normalize_phone(phone)
+    return int("1" + digits) if digits else None
+
+
+class CandidateRepo:
+    def __init__(self):
+        self._t = ColumnarTable(FIELDS, categorical=("locale", "consent", "status", "job_id"))
+        # phone key -> row, or a list of rows (oldest first) when shared
+        self._by_phone: Dict[int, Union[int, List[int]]] = {}
+        # field -> interned code -> rows (may hold stale rows, see _link) and live row counts
+        self._idx: Dict[str, Dict[Optional[int], array]] = {f: {} for f in INDEXED}
+        self._counts: Dict[str, Dict[Optional[int], int]] = {f: {} for f in INDEXED}
+        self._listeners: List[Callable[[str, Optional[dict], Optional[dict]], None]] = []
+        self._lock = self._t._lock
+
+    def add_listener(self, fn: Callable[[str, Optional[dict], Optional[dict]], None]) -> None:
+        # fn(cid, before, after) under the repo lock; before/after are None on insert/remove
+        self._listeners.append(fn)
+
+    def _notify(self, cid: str, before: Optional[dict], after: Optional[dict]) -> None:
+        for fn in self._listeners:
+            fn(cid, before, after)
+
+    def _phone_key_of(self, row: int) -> Optional[int]:
+        # only while the row holds a phone; the column slot of an absent field is not read
+        t = self._t
+        return _phone_key(t._cols["phone"][row]) if t._mask[row] & t._bit["phone"] else None
+
+    # -- index maintenance --
+    # Buckets are append-only arrays of row numbers: unlinking only drops the
+    # count and leaves a stale entry, which lookups skip by re-checking the
+    # row's current code. A bucket is compacted once most of it is stale.
+    def _link(self, row: int) -> None:
+        key = self._phone_key_of(row)
+        if key is not None:
+            cur = self._by_phone.get(key)
+            if cur is None:
+                self._by_phone[key] = row
+            elif isinstance(cur, list):
+                bisect.insort(cur, row)
+            else:
+                self._by_phone[key] = sorted((cur, row))
+        for f in INDEXED:
+            code = self._t.code_of(row, f)
+            bucket = self._idx[f].get(code)
+            if bucket is None:
+                bucket = self._idx[f][code] = array("I")
+            bucket.append(row)
+            counts = self._counts[f]
+            counts[code] = counts.get(code, 0) + 1
+
+    def _unlink(self, row: int) -> None:
+        key = self._phone_key_of(row)
+        cur = self._by_phone.get(key)
+        if cur == row:
+            del self._by_phone[key]
+        elif isinstance(cur, list):
+            cur.remove(row)
+            if len(cur) == 1:
+                self._by_phone[key] = cur[0]
+        for f in INDEXED:
+            code = self._t.code_of(row, f)
+            counts = self._counts[f]
+            n = counts[code] - 1
+            if n:
+                counts[code] = n
+                if len(self._idx[f][code]) > 2 * n + 64:
+                    self._compact(f, code)
+            else:
+                del counts[code]
+                del self._idx[f][code]
+
+    def _live(self, f: str, code: Optional[int], bucket: array) -> List[int]:
+        # rows in the bucket that still hold code, once each, in insertion order
+        code_of, keys = self._t.code_of, self._t._keys
+        rows = [r for r in bucket if keys[r] is not None and code_of(r, f) == code]
+        if len(rows) != self._counts[f].get(code, 0):
+            rows = sorted(set(rows))
+        elif any(rows[i] > rows[i + 1] for i in range(len(rows) - 1)):
+            rows.sort()
+        return rows
+
+    def _compact(self, f: str, code: Optional[int]) -> None:
+        self._idx[f][code] = array("I", self._live(f, code, self._idx[f][code]))
+
+    # -- mutations --
+    def add(self, cid: str, row: dict) -> Mapping:
+        with self._lock:
+            r = self._t.row_of(cid)
+            old = None
+            if r is not None:
+                old = self._t._read(r) if self._listeners else None
+                self._unlink(r)
+            after = self._t.add(cid, row)
+            self._link(self._t.row_of(cid))
+            self._notify(cid, old, after)
+            return MappingProxyType(after)
+
+    __setitem__ = add
+
+    def update(self, cid: str, **fields) -> Mapping:
+        with self._lock:
+            r = self._t.row_of(cid)
+            if r is None:
+                raise KeyError(cid)
+            before = self._t._read(r) if self._listeners else None
+            if "phone" in fields or any(f in fields for f in INDEXED):
+                self._unlink(r)
+                after = self._t.update(cid, **fields)
+                self._link(r)
+            else:
+                after = self._t.update(cid, **fields)
+            if self._listeners:
+                self._notify(cid, before, after)
+            return MappingProxyType(after)
+
+    def remove(self, cid: str) -> Optional[Mapping]:
+        with self._lock:
+            r = self._t.row_of(cid)
+            if r is None:
+                return None
+            self._unlink(r)
+            row = self._t.remove(cid)
+            self._notify(cid, row, None)
+            return MappingProxyType(row)
+
+    __delitem__ = remove
+
+    # -- lookups --
+    def by_phone(self, phone: str) -> Tuple[Optional[str], Optional[Mapping]]:
+        cur = self._by_phone.get(_phone_key(phone))
+        if cur is None:
+            return None, None
+        row = cur[0] if isinstance(cur, list) else cur  # oldest match, as the former linear scan returned
+        cid = self._t.key_of(row)
+        return cid, MappingProxyType(self._t._read(row))
+
+    def _code(self, field: str, value) -> Tuple[bool, Optional[int]]:
+        if field not in self._idx:
+            raise KeyError(f"not an indexed field: {field}")
+        code = self._t.interners[field].lookup(value)
+        return code is not None and code in self._counts[field], code
+
+    def ids_where(self, **criteria) -> List[str]:
+        # AND of indexed equality filters, driven by the smallest bucket; insertion order
+        codes = {}
+        for f, v in criteria.items():
+            if v is None:
+                continue
+            found, codes[f] = self._code(f, v)
+            if not found:
+                return []
+        with self._lock:
+            if not codes:
+                return list(self._t.keys())
+            f = min(codes, key=lambda k: self._counts[k][codes[k]])
+            rows = self._live(f, codes[f], self._idx[f][codes[f]])
+            code_of, key_of = self._t.code_of, self._t.key_of
+            rest = [(k, c) for k, c in codes.items() if k != f]
+            return [key_of(r) for r in rows if all(code_of(r, k) == c for k, c in rest)]
+
+    def count_where(self, field: str, value) -> int:
+        found, code = self._code(field, value)
+        return self._counts[field][code] if found else 0
+
+    # -- dict protocol --
+    def __getitem__(self, cid: str) -> Mapping:
+        return MappingProxyType(self._t[cid])
+
+    def get(self, cid: str, default=None):
+        row = self._t.get(cid)
+        return default if row is None else MappingProxyType(row)
+
+    def __contains__(self, cid: object) -> bool:
+        return cid in self._t
+
+    def __len__(self) -> int:
+        return len(self._t)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._t)
+
+    def keys(self):
+        return self._t.keys()
+
+    def values(self) -> Iterator[Mapping]:
+        return map(MappingProxyType, self._t.values())
+
+    def items(self) -> Iterator[Tuple[str, Mapping]]:
+        return ((cid, MappingProxyType(row)) for cid, row in self._t.items())
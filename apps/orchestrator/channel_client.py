@@ -0,0 +1,50 @@
+import asyncio, time, weakref
+from typing import Callable, List, Optional
+
+import httpx
+
+# ---- shared async channel-connector client ----
+# Pooled keep-alive httpx.AsyncClient per event loop, like AtsClient; aclose()
+# closes the calling loop's client only.
+
+class ChannelClient:
+    def __init__(self, base: Optional[str], max_connections: int = 100, max_keepalive: int = 20,
+                 timeout_s: float = 5.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base = base.rstrip("/") if base else None
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.timeout = httpx.Timeout(timeout_s)
+        self.transport = transport
+        self.on_response: Optional[Callable[[str, int, float], None]] = None  # (url, status or 0, seconds)
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._loops.get(loop)
+        if client is None:
+            client = self._loops[loop] = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, transport=self.transport)
+        return client
+
+    async def _post(self, url: str, body: dict) -> dict:
+        t0 = time.perf_counter()
+        try:
+            resp = await self._client().post(url, json=body)
+        except httpx.HTTPError:
+            if self.on_response:
+                self.on_response(url, 0, time.perf_counter() - t0)
+            raise
+        if self.on_response:
+            self.on_response(url, resp.status_code, time.perf_counter() - t0)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def send(self, message: dict) -> dict:
+        return await self._post(f"{self.base}/send", message)
+
+    async def send_batch(self, messages: List[dict]) -> dict:
+        # -> {results: [...in order...], provider_ids: {ref: id}}
+        return await self._post(f"{self.base}/send/batch", {"messages": messages})
+
+    async def aclose(self) -> None:
+        client = self._loops.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
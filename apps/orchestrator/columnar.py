@@ -0,0 +1,172 @@
+import threading
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# ---- compact column store for records keyed by id ----
+# Each record is a row number; every field lives in its own column instead of
+# a per-record dict. Low-cardinality fields (status, locale, job_id, ...) are
+# interned and stored as 4-byte codes in an array; a per-row bitmask records
+# which fields are present so records round-trip exactly. Fields outside the
+# schema go to a sparse per-row dict. Reads materialize a fresh dict, so the
+# returned record is a snapshot: change records through add()/update().
+
+
+class Interner:
+    def __init__(self):
+        self.values: List[object] = []
+        self.codes: Dict[object, int] = {}
+
+    def code(self, value) -> int:
+        c = self.codes.get(value)
+        if c is None:
+            c = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+    def lookup(self, value) -> Optional[int]:
+        # None if the value was never stored, so no row can hold it
+        try:
+            return self.codes.get(value)
+        except TypeError:  # unhashable
+            return None
+
+
+class ColumnarTable:
+    def __init__(self, fields: Iterable[str], categorical: Iterable[str] = ()):
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self._bit = {f: 1 << i for i, f in enumerate(self.fields)}
+        self.categorical = frozenset(categorical)
+        self.interners: Dict[str, Interner] = {f: Interner() for f in self.fields if f in self.categorical}
+        self._cols: Dict[str, object] = {f: array("I") if f in self.categorical else [] for f in self.fields}
+        self._mask = array("B" if len(self.fields) <= 8 else "H" if len(self.fields) <= 16 else "L")
+        self._extra: Dict[int, dict] = {}
+        self._rows: Dict[str, int] = {}       # key -> row, in insertion order
+        self._keys: List[Optional[str]] = []  # row -> key (None once removed)
+        self._lock = threading.RLock()
+
+    # -- row encoding --
+    def _alloc(self, key: str) -> int:
+        # rows are append-only so row order is insertion order; removed rows are not reused
+        row = len(self._keys)
+        self._keys.append(key)
+        self._mask.append(0)
+        for f in self.fields:
+            self._cols[f].append(0 if f in self.categorical else None)
+        return row
+
+    def _write(self, row: int, record: dict, replace: bool) -> None:
+        if replace and self._mask[row]:
+            self._clear(row, self._mask[row] & ~self._mask_of(record))
+        mask = 0 if replace else self._mask[row]
+        extra = None if replace else self._extra.get(row)
+        for name, value in record.items():
+            bit = self._bit.get(name)
+            if bit is None:
+                if extra is None:
+                    extra = {}
+                extra[name] = value
+                continue
+            mask |= bit
+            if name in self.categorical:
+                self._cols[name][row] = self.interners[name].code(value)
+            else:
+                self._cols[name][row] = value
+        self._mask[row] = mask
+        if extra:
+            self._extra[row] = extra
+        else:
+            self._extra.pop(row, None)
+
+    def _mask_of(self, record: dict) -> int:
+        bit = self._bit
+        return sum(bit[name] for name in record if name in bit)
+
+    def _clear(self, row: int, bits: int) -> None:
+        # a replaced record drops these fields: reset their column values too, so
+        # nothing reading the columns directly sees the previous record's value
+        for f in self.fields:
+            if bits & self._bit[f]:
+                self._cols[f][row] = 0 if f in self.categorical else None
+
+    def _read(self, row: int) -> dict:
+        mask = self._mask[row]
+        out = {}
+        for f in self.fields:
+            if mask & self._bit[f]:
+                v = self._cols[f][row]
+                out[f] = self.interners[f].values[v] if f in self.categorical else v
+        extra = self._extra.get(row)
+        if extra:
+            out.update(extra)
+        return out
+
+    def code_of(self, row: int, field: str) -> Optional[int]:
+        # interned code of a categorical field, None when the field is absent
+        if not self._mask[row] & self._bit[field]:
+            return None
+        return self._cols[field][row]
+
+    # -- mutations --
+    def add(self, key: str, record: dict) -> dict:
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = self._alloc(key)
+            self._write(row, record, replace=True)
+            return self._read(row)
+
+    __setitem__ = add
+
+    def update(self, key: str, **fields) -> dict:
+        with self._lock:
+            row = self._rows[key]
+            self._write(row, fields, replace=False)
+            return self._read(row)
+
+    def remove(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is None:
+                return None
+            out = self._read(row)
+            self._keys[row] = None
+            self._clear(row, self._mask[row])  # release the objects
+            self._mask[row] = 0
+            self._extra.pop(row, None)
+            return out
+
+    __delitem__ = remove
+
+    # -- dict protocol --
+    def row_of(self, key: str) -> Optional[int]:
+        return self._rows.get(key)
+
+    def key_of(self, row: int) -> Optional[str]:
+        return self._keys[row]
+
+    def __getitem__(self, key: str) -> dict:
+        return self._read(self._rows[key])
+
+    def get(self, key: str, default=None):
+        row = self._rows.get(key)
+        return default if row is None else self._read(row)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def keys(self):
+        return self._rows.keys()
+
+    def values(self) -> Iterator[dict]:
+        for row in list(self._rows.values()):
+            yield self._read(row)
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        for key, row in list(self._rows.items()):
+            yield key, self._read(row)
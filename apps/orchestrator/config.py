@@ -0,0 +1,19 @@
+from typing import Dict, Optional
+
+# ---- environment config helpers ----
+# Small parsers for "key=value,key=value" settings (rates, channel/provider
+# maps, sites). Malformed parts without "=" are ignored.
+
+
+def parse_rates(spec: Optional[str]) -> Dict[str, float]:
+    # "sms=50,whatsapp=20" -> {"sms": 50.0, "whatsapp": 20.0}
+    out: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            out[k.strip()] = float(v)
+    return out
+
+
+def parse_map(spec: Optional[str]) -> Dict[str, str]:
+    return {k.strip(): v.strip() for k, v in (p.split("=", 1) for p in (spec or "").split(",") if "=" in p)}
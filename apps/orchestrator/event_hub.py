@@ -0,0 +1,164 @@
+import asyncio, json, threading
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+# ---- push-based audit event broadcast ----
+# The audit writer publishes each committed batch once: events are serialized
+# a single time and handed to every subscriber's event loop with one
+# call_soon_threadsafe per loop. Subscribers keep a bounded queue; a slow
+# consumer either loses its oldest events (reported as a gap) or is cut off.
+
+DROP, DISCONNECT = "drop", "disconnect"
+REPLAY_PAGE = 1024  # events read from the store per executor hop during a resume
+
+Item = Tuple[int, dict, str]  # (audit index, event, serialized event)
+
+
+class SlowConsumer(Exception):
+    pass
+
+
+def _action_filter(spec: Optional[str]):
+    # "ats.write,outreach.sent" or "ats.*"
+    if not spec:
+        return None
+    exact, prefixes = set(), []
+    for part in (p.strip() for p in spec.split(",")):
+        if part.endswith("*"):
+            prefixes.append(part[:-1])
+        elif part:
+            exact.add(part)
+    return lambda action: action in exact or any(action.startswith(p) for p in prefixes)
+
+
+class Subscription:
+    def __init__(self, hub: "EventHub", loop: asyncio.AbstractEventLoop, actions: Optional[str],
+                 candidate_id: Optional[str], max_queue: int, policy: str):
+        self.hub = hub
+        self.loop = loop
+        self.candidate_id = candidate_id
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self._match_action = _action_filter(actions)
+        self._queue: Deque[Item] = deque()
+        self._wake = asyncio.Event()
+        self._dropped = 0
+        self.skipped = 0  # events before the replay cap that a resume asked for but will not get
+        self.closed = False
+        self.slow = False
+
+    def matches(self, event: dict) -> bool:
+        if self._match_action and not self._match_action(event.get("action") or ""):
+            return False
+        if self.candidate_id and (event.get("payload") or {}).get("candidate_id") != self.candidate_id:
+            return False
+        return True
+
+    def _deliver(self, items: List[Item]) -> None:
+        # runs on the subscriber's loop
+        if self.closed:
+            return
+        for item in items:
+            if not self.matches(item[1]):
+                continue
+            if len(self._queue) >= self.max_queue:
+                if self.policy == DISCONNECT:
+                    self.slow = True
+                    self.close()
+                    return
+                self._queue.popleft()
+                self._dropped += 1
+            self._queue.append(item)
+        self._wake.set()
+
+    async def get(self) -> Tuple[List[Item], int]:
+        # next queued events plus how many were dropped before them
+        while not self._queue and not self.closed:
+            self._wake.clear()
+            await self._wake.wait()
+        if self.slow:
+            raise SlowConsumer()
+        items, self._queue = list(self._queue), deque()
+        dropped, self._dropped = self._dropped, 0
+        return items, dropped
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake.set()
+        self.hub._remove(self)
+
+
+class EventHub:
+    def __init__(self, store, max_queue: int = 1000, policy: str = DROP, max_replay: int = 10_000):
+        self.store = store
+        self.max_queue = max_queue
+        self.max_replay = max(0, max_replay)
+        self.policy = policy if policy in (DROP, DISCONNECT) else DROP
+        self._lock = threading.Lock()
+        self._subs: Dict[asyncio.AbstractEventLoop, List[Subscription]] = {}
+        self._published = len(store)  # events below this index were handed to subscribers
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subs.values())
+
+    def publish(self, batch: List[dict]) -> None:
+        # audit writer listener: the batch was just appended at the tail of the store
+        with self._lock:
+            end = len(self.store)
+            self._published = end
+            targets = [(loop, list(subs)) for loop, subs in self._subs.items() if subs]
+        if not targets:
+            return
+        start = end - len(batch)
+        items = [(start + i, e, json.dumps(e)) for i, e in enumerate(batch)]
+        for loop, subs in targets:
+            try:
+                loop.call_soon_threadsafe(_fan_out, subs, items)
+            except RuntimeError:  # loop closed under us
+                with self._lock:
+                    self._subs.pop(loop, None)
+
+    def subscribe(self, actions: Optional[str] = None, candidate_id: Optional[str] = None,
+                  last_event_id: Optional[int] = None, backlog: int = 0) -> Tuple[Subscription, AsyncIterator[Item]]:
+        # returns the live subscription and the events to replay before it: those
+        # after last_event_id, or else the newest `backlog` ones, that were
+        # published before subscribing; at most max_replay events back
+        loop = asyncio.get_running_loop()
+        sub = Subscription(self, loop, actions, candidate_id, self.max_queue, self.policy)
+        with self._lock:
+            self._subs.setdefault(loop, []).append(sub)
+            boundary = self._published
+        start = last_event_id + 1 if last_event_id is not None else max(0, boundary - backlog)
+        if boundary - start > self.max_replay:
+            sub.skipped = boundary - self.max_replay - start
+            start = boundary - self.max_replay
+        return sub, self._replay(sub, start, boundary)
+
+    async def _replay(self, sub: Subscription, start: int, stop: int) -> AsyncIterator[Item]:
+        # pages are read and filtered on the default executor, so a resume that
+        # matches little of a long stretch never holds the event loop
+        loop = asyncio.get_running_loop()
+        for a in range(start, stop, REPLAY_PAGE):
+            page = await loop.run_in_executor(None, self._page, sub, a, min(stop, a + REPLAY_PAGE))
+            for item in page:
+                yield item
+
+    def _page(self, sub: Subscription, start: int, stop: int) -> List[Item]:
+        events = islice(self.store.iter_from(start), stop - start)
+        return [(i, e, json.dumps(e)) for i, e in enumerate(events, start) if sub.matches(e)]
+
+    def _remove(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.loop)
+            if subs and sub in subs:
+                subs.remove(sub)
+                if not subs:
+                    del self._subs[sub.loop]
+
+
+def _fan_out(subs: List[Subscription], items: List[Item]) -> None:
+    for sub in subs:
+        sub._deliver(items)
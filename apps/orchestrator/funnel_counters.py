@@ -0,0 +1,140 @@
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+# ---- materialized KPI / funnel counters ----
+# Candidate-state metrics follow CandidateRepo changes; action metrics follow
+# committed audit batches. Every count is kept globally ("*") and per job_id.
+# After a restart the repo is empty, so rebuild() derives the state of every
+# candidate it does not hold from the events that change it live (created,
+# outreach, consent, qualification, confirmed); a candidate that is loaded
+# again replaces its derived state instead of being counted twice.
+
+ALL = "*"
+CONTACTED_STATUSES = frozenset(["contacted", "qualified", "disqualified", "scheduled"])
+
+
+def _candidate_metrics(row: Optional[dict]) -> List[str]:
+    if not row:
+        return []
+    out = []
+    if row.get("status") in CONTACTED_STATUSES:
+        out.append("contacted")
+    if row.get("consent"):
+        out.append("consented")
+    if row.get("status") == "qualified":
+        out.append("qualified")
+    return out
+
+
+_DERIVED_FROM = frozenset(["candidate.created", "outreach.sent", "consent.captured", "qualification.done",
+                           "schedule.confirmed"])
+
+
+def _derive(derived: Dict[str, dict], e: dict) -> None:
+    # candidate row implied by its events, only the fields _candidate_metrics reads (plus job_id);
+    # each action sets what the matching CANDIDATES write does on the live path
+    action = e.get("action")
+    if action not in _DERIVED_FROM:
+        return
+    payload = e.get("payload") or {}
+    cid = payload.get("candidate_id")
+    if not cid:
+        return
+    row = derived.setdefault(cid, {})
+    if payload.get("job_id") and not row.get("job_id"):
+        row["job_id"] = payload["job_id"]
+    if action == "candidate.created":
+        row["status"] = payload.get("status")
+        row["consent"] = bool(payload.get("consent"))
+    elif action == "outreach.sent":
+        row["status"] = "contacted"
+    elif action == "consent.captured":
+        row["consent"] = True
+    elif action == "qualification.done":
+        row["status"] = "qualified" if payload.get("qualified") else "disqualified"
+    elif action == "schedule.confirmed":
+        row["status"] = "scheduled"
+
+
+class FunnelCounters:
+    def __init__(self):
+        self._state: Counter = Counter()    # (metric, job) -> n
+        self._actions: Counter = Counter()  # (action, job) -> n
+        self._cost: Counter = Counter()     # job -> outreach cost_usd
+        self._candidates: Counter = Counter()  # job -> n
+        self._replayed: Dict[str, dict] = {}  # cid -> state derived from the log, until the repo has it
+        self._lock = threading.Lock()
+
+    def on_candidate(self, cid: str, before: Optional[dict], after: Optional[dict]) -> None:
+        with self._lock:
+            if before is None and self._replayed:
+                before = self._replayed.pop(cid, None)
+            for row, sign in ((before, -1), (after, 1)):
+                if not row:
+                    continue
+                job = row.get("job_id")
+                for key in (ALL, job) if job else (ALL,):
+                    self._candidates[key] += sign
+                    for m in _candidate_metrics(row):
+                        self._state[(m, key)] += sign
+
+    def on_audit(self, events: Iterable[dict]) -> None:
+        with self._lock:
+            for e in events:
+                action = e.get("action")
+                payload = e.get("payload") or {}
+                job = payload.get("job_id")
+                for key in (ALL, job) if job else (ALL,):
+                    self._actions[(action, key)] += 1
+                    if action == "outreach.sent":
+                        self._cost[key] += float(payload.get("cost_usd") or 0.0)
+
+    def rebuild(self, candidates, events: Iterable[dict]) -> None:
+        # one pass over current candidates and the audit log, e.g. after restart
+        with self._lock:
+            self._state.clear()
+            self._actions.clear()
+            self._cost.clear()
+            self._candidates.clear()
+            self._replayed.clear()
+        for cid, row in list(candidates.items()):
+            self.on_candidate(cid, None, row)
+        derived: Dict[str, dict] = {}
+        batch: List[dict] = []
+        for e in events:
+            batch.append(e)
+            if len(batch) >= 4096:
+                self.on_audit(batch)
+                batch = []
+            _derive(derived, e)
+        self.on_audit(batch)
+        for cid in list(derived):
+            if cid in candidates:
+                del derived[cid]  # the repo row is current
+        for row in derived.values():
+            self.on_candidate("", None, row)
+        with self._lock:
+            self._replayed = derived
+
+    def action(self, action: str, job_id: Optional[str] = None) -> int:
+        return self._actions[(action, job_id or ALL)]
+
+    def snapshot(self, job_id: Optional[str] = None) -> dict:
+        key = job_id or ALL
+        with self._lock:
+            return {
+                "candidates": self._candidates[key],
+                "contacted": self._state[("contacted", key)],
+                "consented": self._state[("consented", key)],
+                "qualified": self._state[("qualified", key)],
+                "scheduled": self._actions[("ats.write", key)],
+                "ats_errors": self._actions[("ats.error", key)],
+                "outreach_sent": self._actions[("outreach.sent", key)],
+                "inbound": self._actions[("channel.inbound", key)],
+                "outreach_cost_usd": round(self._cost[key], 3),
+            }
+
+    def jobs(self) -> List[str]:
+        with self._lock:
+            return sorted({k for k in self._candidates if k != ALL} | {j for (_, j) in self._actions if j != ALL})
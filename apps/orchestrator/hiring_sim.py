@@ -0,0 +1,208 @@
+import os, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import get_context
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ---- Monte Carlo hiring simulator ----
+# Each working day contacts vol_per_day candidates: qualified ~ Binomial(vol,
+# reply * qual), interviews = min(qualified, capacity), hires ~
+# Binomial(interviews, show * OFFER_ACCEPT_RATE) (a binomial thinned by a
+# binomial is a binomial). That chain's daily hires distribution is computed
+# exactly once per scenario and convolved into a weekly one. Trials then draw
+# whole weeks from it with Vose's alias method (one integer, one uniform and
+# two gathers per draw, far cheaper than three binomial draws per day). The
+# draws are (trials x weeks) arrays in batches, and only trials still short
+# of the target draw further weeks.
+
+WORKDAYS = 5
+OFFER_ACCEPT_RATE = 0.6  # the point estimate's hires = shows * 0.6
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+_EPS = 1e-15  # probability mass below this is dropped from distribution tails
+
+
+def parse_grid(spec: Optional[str]) -> List[int]:
+    # "100,200,500" -> [100, 200, 500]; "100-500/100" -> [100, 200, 300, 400, 500]
+    out: List[int] = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            rng, _, step = part.partition("/")
+            a, b = (int(x) for x in rng.split("-", 1))
+            out.extend(range(a, b + 1, int(step or 1)))
+        else:
+            out.append(int(part))
+    if any(v < 0 for v in out):
+        raise ValueError("grid values must be >= 0")
+    return sorted(set(out))
+
+
+def _quantiles(x: np.ndarray, digits: int = 2) -> dict:
+    # inverted_cdf returns sample values, so censored trials (inf) show as None rather than skewing neighbours
+    q = np.quantile(x, np.array(PERCENTILES) / 100.0, method="inverted_cdf")
+    fmt = (lambda v: int(v)) if digits == 0 else (lambda v: round(float(v), digits))
+    return {f"p{p}": (fmt(v) if np.isfinite(v) else None) for p, v in zip(PERCENTILES, q)}
+
+
+def _xlogy(x: np.ndarray, y: float) -> np.ndarray:
+    # x * log(y), 0 where x == 0 (so p = 0 or 1 works)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(x == 0, 0.0, x * np.log(y))
+
+
+def _binom_pmf(n: np.ndarray, k: np.ndarray, p: float, lf: np.ndarray) -> np.ndarray:
+    # Binomial(n, p) pmf at k, broadcast; lf = log factorials
+    ok = (k >= 0) & (k <= n)
+    kk, nn = np.where(ok, k, 0), np.where(ok, n, 0)
+    logp = lf[nn] - lf[kk] - lf[nn - kk] + _xlogy(kk, p) + _xlogy(nn - kk, 1.0 - p)
+    return np.where(ok, np.exp(logp), 0.0)
+
+
+def _trim(pmf: np.ndarray, offset: int = 0) -> Tuple[np.ndarray, int]:
+    nz = np.flatnonzero(pmf > _EPS)
+    if not nz.size:
+        return np.ones(1), offset
+    return pmf[nz[0]:nz[-1] + 1] / pmf[nz[0]:nz[-1] + 1].sum(), offset + int(nz[0])
+
+
+def daily_distribution(vol: int, p_qual: float, p_hire: float, cap: int) -> dict:
+    # exact pmf of one day's interviews and hires; pmfs are (values from offset, offset)
+    lf = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, vol + 1, dtype=np.float64)))))
+    q = _binom_pmf(np.int64(vol), np.arange(vol + 1), p_qual, lf)
+    if cap < vol:
+        q = np.concatenate((q[:cap], [q[cap:].sum()]))
+    sched, s0 = _trim(q)
+    rows = s0 + np.arange(len(sched))
+    hires = np.zeros(rows[-1] + 1)
+    for lo in range(0, len(rows), 256):  # bounded memory: 256 interview counts at a time
+        n = rows[lo:lo + 256, None]
+        hires += (sched[lo:lo + 256, None] * _binom_pmf(n, np.arange(rows[-1] + 1)[None, :], p_hire, lf)).sum(axis=0)
+    return {"interviews": (sched, s0), "hires": _trim(hires)}
+
+
+def _convolve_power(pmf: np.ndarray, offset: int, k: int) -> Tuple[np.ndarray, int]:
+    out, off = pmf, offset
+    for _ in range(k - 1):
+        out, off = _trim(np.convolve(out, pmf), off + offset)
+    return out, off
+
+
+class _Alias:
+    # Vose's alias table: O(1) draws from a discrete distribution
+    def __init__(self, pmf: np.ndarray, offset: int):
+        n = len(pmf)
+        prob = pmf * n
+        alias = np.zeros(n, np.int64)
+        small = [i for i in range(n) if prob[i] < 1.0]
+        large = [i for i in range(n) if prob[i] >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            alias[s] = g
+            prob[g] -= 1.0 - prob[s]
+            (small if prob[g] < 1.0 else large).append(g)
+        for i in small + large:
+            prob[i] = 1.0
+        self.prob, self.alias, self.offset, self.n = prob, alias, offset, n
+
+    def draw(self, rng: np.random.Generator, size) -> np.ndarray:
+        i = rng.integers(0, self.n, size=size)
+        keep = rng.random(size=size) < self.prob[i]
+        return np.where(keep, i, self.alias[i]) + self.offset
+
+
+def simulate(vol_per_day: int, reply_rate: float, qual_rate: float, show_rate: float, interviewer_capacity: int,
+             target_openings: int, trials: int = 100_000, seed: Optional[int] = None, horizon_weeks: int = 52,
+             target_weeks: Optional[float] = None, batch: int = 100_000) -> dict:
+    t0 = time.perf_counter()
+    horizon_weeks = max(1, horizon_weeks)
+    rng = np.random.default_rng(seed)
+    day = daily_distribution(vol_per_day, reply_rate * qual_rate, show_rate * OFFER_ACCEPT_RATE,
+                             interviewer_capacity)
+    week = _Alias(*_convolve_power(*day["hires"], WORKDAYS))
+    week1, weeks = [], []
+    for lo in range(0, trials, batch):
+        n = min(batch, trials - lo)
+        first = week.draw(rng, n)
+        filled = np.full(n, np.inf)
+        if target_openings <= 0:
+            filled[:] = 0.0
+        else:
+            filled[first >= target_openings] = 1.0
+        total, active, done = first.astype(np.int64), np.flatnonzero(np.isinf(filled)), 1
+        while active.size and done < horizon_weeks:
+            # four more weeks at a time, only for trials not yet filled
+            span = min(4, horizon_weeks - done)
+            running = total[active, None] + week.draw(rng, (active.size, span)).cumsum(axis=1)
+            reached = running >= target_openings
+            hit = reached.any(axis=1)
+            filled[active[hit]] = done + reached[hit].argmax(axis=1) + 1
+            total[active] = running[:, -1]
+            active = active[~hit]
+            done += span
+        week1.append(first)
+        weeks.append(filled)
+    week1, weeks = np.concatenate(week1), np.concatenate(weeks)
+    sched, s0 = day["interviews"]
+    interviews = float((sched * (s0 + np.arange(len(sched)))).sum())
+    out = {
+        "trials": trials,
+        "seed": seed,
+        "hires_per_week": {"mean": round(float(week1.mean()), 2), **_quantiles(week1, 0)},
+        "time_to_fill_weeks": _quantiles(weeks, 0),
+        "p_unfilled_within_horizon": round(float(np.mean(np.isinf(weeks))), 4),
+        "horizon_weeks": horizon_weeks,
+        "interviews_per_day": round(interviews, 2),
+        "utilization": round(interviews / interviewer_capacity, 4) if interviewer_capacity else 0.0,
+    }
+    if target_weeks is not None:
+        out["target_weeks"] = target_weeks
+        out["p_fill_by_target"] = round(float(np.mean(weeks <= target_weeks)), 4)
+    out["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return out
+
+
+def _run(job: dict) -> dict:
+    # process-pool worker: one sweep scenario
+    res = simulate(**job)
+    return {"vol_per_day": job["vol_per_day"], "interviewer_capacity": job["interviewer_capacity"], **res}
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn: the orchestrator is multi-threaded, forking it is unsafe
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+        return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+
+def sweep(vols: Sequence[int], capacities: Sequence[int], workers: Optional[int] = None,
+          parallel_min_draws: int = 2_000_000, **kw) -> dict:
+    # every vol_per_day x interviewer_capacity pair; scenario i uses seed + i, so results do
+    # not depend on which worker ran it. Small grids run in-process (pool start-up costs more).
+    t0 = time.perf_counter()
+    seed = kw.pop("seed", None)
+    jobs = [dict(kw, vol_per_day=v, interviewer_capacity=c, seed=None if seed is None else seed + i)
+            for i, (v, c) in enumerate(product(vols, capacities))]
+    workers = workers or int(os.getenv("SIM_WORKERS", "0")) or (os.cpu_count() or 2)
+    draws = len(jobs) * kw.get("trials", 100_000) * WORKDAYS
+    parallel = len(jobs) > 1 and workers > 1 and draws >= parallel_min_draws
+    scenarios = list(_pool(workers).map(_run, jobs)) if parallel else [_run(j) for j in jobs]
+    return {"scenarios": scenarios, "workers": workers if parallel else 1,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2)}
@@ -0,0 +1,152 @@
+import asyncio, json, logging, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+# ---- inbound message pipeline ----
+# Provider retries are dropped by message id through a bounded TTL cache; fresh
+# messages are queued on a dedicated loop thread and handed in batches to a pool
+# of `workers` handler threads (the handler is synchronous), so the webhook
+# returns as soon as the batch is queued. A batch whose handler fails has its
+# ids forgotten, so the provider's retry is processed instead of dropped.
+
+
+class TTLCache:
+    def __init__(self, max_items: int = 100_000, ttl_s: float = 3600.0):
+        self.max_items = max(1, max_items)
+        self.ttl_s = ttl_s
+        self._items: "OrderedDict[str, float]" = OrderedDict()  # key -> first seen (monotonic), oldest first
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self._items:
+            key, seen = next(iter(self._items.items()))
+            if now - seen < self.ttl_s and len(self._items) <= self.max_items:
+                return
+            self._items.popitem(last=False)
+
+    def add(self, key: str) -> bool:
+        # True if key is new (and now remembered), False if seen within the TTL
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if key in self._items:
+                return False
+            self._items[key] = now
+            self._expire(now)
+            return True
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class InboundPipeline:
+    def __init__(self, handle: Callable[[List[dict]], None], workers: int = 4, max_queue: int = 10_000,
+                 dedupe: Optional[TTLCache] = None):
+        # handle(messages) runs on one of `workers` threads for each queued batch; it must be thread-safe
+        self.handle = handle
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.dedupe = dedupe or TTLCache()
+        self.processed = 0
+        self.duplicates = 0
+        self._queued = 0  # messages queued or being processed
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._started = threading.Event()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="inbound-pipeline", daemon=True)
+                self._thread.start()
+        self._started.wait()
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="inbound-handler")
+        workers = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._started.set()
+        try:
+            loop.run_forever()
+        finally:
+            for w in workers:
+                w.cancel()
+            loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+            self._executor.shutdown(wait=True)
+            loop.close()
+
+    def fresh(self, messages: List[dict]) -> List[dict]:
+        # drop messages whose id was already seen (provider retries), including repeats within the batch
+        out = []
+        for m in messages:
+            if self.dedupe.add(m["id"]):
+                out.append(m)
+        with self._lock:
+            self.duplicates += len(messages) - len(out)
+        return out
+
+    def forget(self, messages: List[dict]) -> None:
+        # not processed: let the provider's retry of these messages through
+        for m in messages:
+            self.dedupe.discard(m["id"])
+
+    def submit(self, messages: List[dict]) -> dict:
+        fresh = self.fresh(messages)
+        if fresh:
+            with self._lock:
+                full = self._queued + len(fresh) > self.max_queue
+                if not full:
+                    self._queued += len(fresh)
+            if full:
+                self.forget(fresh)
+                raise QueueFull("inbound queue is full")
+            self._ensure_started()
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, fresh)
+        return {"accepted": len(fresh), "duplicates": len(messages) - len(fresh)}
+
+    @property
+    def depth(self) -> int:
+        return self._queued
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._queue.get()
+            try:
+                await loop.run_in_executor(self._executor, self.handle, batch)
+            except Exception as e:
+                logging.error(json.dumps({"type": "inbound_error", "error": str(e), "messages": len(batch)}))
+                self.forget(batch)
+            with self._lock:
+                self._queued -= len(batch)
+                self.processed += len(batch)
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._queued == 0:
+                return True
+            time.sleep(0.005)
+        return False
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._loop is None:
+            return
+        self.drain(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
@@ -0,0 +1,90 @@
+import json, logging, queue, random, sys, threading, time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional, TextIO
+
+# ---- non-blocking structured logging ----
+# Callers only sample, serialize and enqueue. One listener thread writes, so a
+# slow stdout or log shipper fills a bounded queue (overflow is dropped and
+# counted) instead of stalling the event loop. Lines are JSON strings built
+# once on the caller's side; the listener writes them unchanged. The logger
+# does not propagate to root, so other handlers never see (or block on) them.
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def __init__(self, q: queue.Queue, on_full: Callable[[logging.LogRecord], None]):
+        super().__init__(q)
+        self.on_full = on_full
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # same process and the message is final: no format + copy on the caller's thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.on_full(record)
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)  # the queue may be full at stop(): wait for room, do not raise
+
+
+class JsonLog:
+    def __init__(self, name: str = "orchestrator", sample_rates: Optional[Dict[str, float]] = None,
+                 max_queue: int = 10000, level: int = logging.INFO, stream: Optional[TextIO] = None,
+                 on_drop: Optional[Callable[[str, str], None]] = None):
+        self.sample_rates = dict(sample_rates or {})  # type -> fraction kept; unlisted types keep all
+        self.on_drop = on_drop  # (reason, type); reason is "sampled" or "queue_full"
+        self.dropped: Dict[str, int] = {}  # "reason:type" -> n
+        self.queue: queue.Queue = queue.Queue(max(1, max_queue))
+        self._lock = threading.Lock()
+        self._out = logging.StreamHandler(stream or sys.stderr)
+        self._out.setFormatter(logging.Formatter("%(message)s"))
+        self._queued = _DroppingQueueHandler(self.queue, lambda r: self._drop("queue_full", getattr(r, "log_type", "other")))
+        self._listener: Optional[_Listener] = None
+        self.logger = logging.getLogger(name)
+        self.logger.propagate = False
+        self.logger.setLevel(level)
+        self.logger.addHandler(self._out)  # synchronous until start()
+
+    def _drop(self, reason: str, log_type: str) -> None:
+        key = f"{reason}:{log_type}"
+        with self._lock:
+            self.dropped[key] = self.dropped.get(key, 0) + 1
+        if self.on_drop:
+            self.on_drop(reason, log_type)
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def start(self) -> None:
+        if self._listener:
+            return
+        self._listener = _Listener(self.queue, self._out)
+        self._listener.start()
+        self.logger.removeHandler(self._out)
+        self.logger.addHandler(self._queued)
+
+    def stop(self) -> None:
+        # writes what is queued, then logs synchronously again
+        if not self._listener:
+            return
+        self.logger.removeHandler(self._queued)
+        self.logger.addHandler(self._out)
+        self._listener.stop()
+        self._listener = None
+
+    def event(self, log_type: str, level: int = logging.INFO, keep: bool = False, **fields) -> None:
+        # errors (and keep=True) are never sampled out
+        if not self.logger.isEnabledFor(level):
+            return
+        rate = self.sample_rates.get(log_type, 1.0)
+        if rate < 1.0 and level < logging.ERROR and not keep and random.random() >= rate:
+            self._drop("sampled", log_type)
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "level": logging.getLevelName(level), "type": log_type,
+                           **fields})
+        self.logger.log(level, line, extra={"log_type": log_type})
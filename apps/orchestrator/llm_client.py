@@ -0,0 +1,126 @@
+import asyncio, json, time, weakref
+from typing import AsyncIterator, Callable, List, Optional
+
+import aiohttp
+
+# ---- shared streaming LLM client ----
+# One pooled aiohttp session per event loop for the app's lifetime (DNS cache,
+# keep-alive), so a chat does not pay DNS/TCP/TLS set-up before its first
+# token. A semaphore caps upstream streams; callers over the cap wait in FIFO
+# order up to max_queue / queue_timeout_s, then get LlmBusy. Tokens are read
+# from upstream only as fast as the caller consumes them, so a slow SSE client
+# backs up to the provider instead of buffering here.
+
+
+class LlmBusy(RuntimeError):
+    pass
+
+
+class LlmClient:
+    def __init__(self, base_url: str, api_key: Optional[str], model: str, max_tokens: int = 512,
+                 timeout_s: float = 25.0, connect_timeout_s: float = 5.0, max_concurrency: int = 32,
+                 max_queue: int = 256, queue_timeout_s: float = 10.0, max_connections: int = 100,
+                 on_admit: Optional[Callable[[float], None]] = None,
+                 on_done: Optional[Callable[[dict], None]] = None):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.api_key = api_key
+        self.model = model
+        self.max_tokens = max_tokens
+        self.timeout = aiohttp.ClientTimeout(total=timeout_s, sock_connect=connect_timeout_s)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_s = queue_timeout_s
+        self.max_connections = max_connections
+        self.on_admit = on_admit  # queue wait in seconds, per admitted request
+        self.on_done = on_done  # per-request stats, see stream()
+        self.in_flight = 0
+        self.waiting = 0
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+    def _state(self):
+        loop = asyncio.get_running_loop()
+        st = self._loops.get(loop)
+        if st is None or st[0].closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300, keepalive_timeout=60)
+            st = (aiohttp.ClientSession(connector=connector, timeout=self.timeout),
+                  asyncio.Semaphore(self.max_concurrency))
+            self._loops[loop] = st
+        return st
+
+    async def _admit(self, sem: asyncio.Semaphore) -> float:
+        t0 = time.perf_counter()
+        if sem.locked():
+            if self.waiting >= self.max_queue:
+                raise LlmBusy("LLM queue full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(sem.acquire(), self.queue_timeout_s)
+            except asyncio.TimeoutError:
+                raise LlmBusy("LLM queue wait timed out")
+            finally:
+                self.waiting -= 1
+        else:
+            await sem.acquire()
+        wait = time.perf_counter() - t0
+        if self.on_admit:
+            self.on_admit(wait)
+        return wait
+
+    async def stream(self, messages: List[dict], stats: Optional[dict] = None) -> AsyncIterator[str]:
+        # yields content deltas; `stats` (and on_done) get queue_wait_s, ttft_s, tokens, duration_s,
+        # tokens_per_s (after the first token) and outcome: ok | busy | error | cancelled
+        stats = {} if stats is None else stats
+        session, sem = self._state()
+        t0 = time.perf_counter()
+        stats.update(queue_wait_s=None, ttft_s=None, tokens=0, duration_s=None, tokens_per_s=None, outcome="error")
+        try:
+            try:
+                stats["queue_wait_s"] = await self._admit(sem)
+            except LlmBusy:
+                stats["outcome"] = "busy"
+                raise
+            self.in_flight += 1
+            try:
+                t_req = time.perf_counter()
+                headers = {"Content-Type": "application/json"}
+                if self.api_key:
+                    headers["Authorization"] = f"Bearer {self.api_key}"
+                body = {"model": self.model, "max_tokens": self.max_tokens, "stream": True, "messages": messages}
+                async with session.post(self.url, headers=headers, json=body) as resp:
+                    resp.raise_for_status()
+                    async for line in resp.content:
+                        chunk = line.decode("utf-8", errors="ignore").strip()
+                        if not chunk.startswith("data:"):
+                            continue
+                        data = chunk[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            delta = json.loads(data).get("choices", [{}])[0].get("delta", {}).get("content")
+                        except (ValueError, AttributeError, IndexError):
+                            continue
+                        if delta:
+                            if stats["ttft_s"] is None:
+                                stats["ttft_s"] = time.perf_counter() - t_req
+                            stats["tokens"] += 1  # one content delta per streamed token
+                            yield delta
+                stats["outcome"] = "ok"
+            finally:
+                self.in_flight -= 1
+                sem.release()
+        except (asyncio.CancelledError, GeneratorExit):
+            stats["outcome"] = "cancelled"
+            raise
+        finally:
+            stats["duration_s"] = time.perf_counter() - t0
+            if stats["ttft_s"] is not None and stats["tokens"] > 1:
+                gen_s = stats["duration_s"] - (stats["queue_wait_s"] or 0.0) - stats["ttft_s"]
+                if gen_s > 0:
+                    stats["tokens_per_s"] = (stats["tokens"] - 1) / gen_s
+            if self.on_done:
+                self.on_done(stats)
+
+    async def aclose(self) -> None:
+        st = self._loops.pop(asyncio.get_running_loop(), None)
+        if st is not None:
+            await st[0].close()
@@ -1,22 +1,54 @@
-from fastapi import FastAPI, HTTPException, UploadFile, Form, Request
+from fastapi import FastAPI, HTTPException, UploadFile, Form, Request, Response, Query
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import os, time, json, uuid, hashlib, asyncio
-import httpx
+import os, time, json, uuid, asyncio, atexit, shutil, tempfile, zlib
 from math import floor
+from urllib.parse import urlsplit
+from itertools import islice
 from sse_starlette.sse import EventSourceResponse
-from typing import Any, Optional, Tuple, Dict, List
+from typing import Any, Optional, Tuple, Dict, List, Mapping
 # add YAML import (optional)
 try:
     import yaml  # type: ignore
 except Exception:
     yaml = None
 import logging
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 import sentry_sdk
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
-import aiohttp
+if not __package__:
+    # started as `main` from this directory (uvicorn main:app, the Docker image): import the
+    # directory as a package so the sibling modules load through the same relative imports
+    import sys
+    _here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(_here))
+    __package__ = os.path.basename(_here)
+from .audit_store import open_audit_store
+from .audit_verify import Checkpoints, verify_incremental, verify_full, shutdown_pool
+from .audit_writer import AuditWriter
+from .candidate_repo import CandidateRepo, normalize_phone
+from .columnar import ColumnarTable
+from .funnel_counters import FunnelCounters
+from .ats_client import AtsClient, AtsBatcher
+from .outbox import Outbox
+from .persistence import WriteBehind
+from .event_hub import EventHub, SlowConsumer
+from .candidate_import import CandidateImporter, detect_format
+from .channel_client import ChannelClient
+from .config import parse_map, parse_rates
+from .outreach_engine import OutreachEngine
+from .inbound import InboundPipeline, QueueFull, TTLCache
+from .analytics import FunnelAnalytics, parse_group_by, parse_window
+from .sla_heatmap import SlaHeatmap
+from .scheduler import SlotAllocator, parse_days, parse_hours
+from .send_window import SendWindowPlanner, parse_hour_range
+from .request_metrics import RequestMetricsMiddleware
+from .json_log import JsonLog
+from .llm_client import LlmBusy, LlmClient
+from .hiring_sim import parse_grid, shutdown_pool as shutdown_sim_pool, simulate as simulate_hiring, \
+    sweep as sweep_hiring
 
 SENTRY_DSN = os.getenv("SENTRY_DSN")
 if SENTRY_DSN:
@@ -28,6 +60,22 @@ ATS_CONNECTOR_BASE = os.getenv("ATS_CONNECTOR_BASE")
 CHANNEL_CONNECTOR_BASE = os.getenv("CHANNEL_CONNECTOR_BASE")
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# shared, pooled ATS client (ats-mock or connector) with bounded in-flight writes
+ATS = AtsClient(
+    ATS_BASE, ATS_CONNECTOR_BASE,
+    max_concurrency=int(os.getenv("ATS_MAX_CONCURRENCY", "64")),
+    max_connections=int(os.getenv("ATS_MAX_CONNECTIONS", "100")),
+    max_keepalive=int(os.getenv("ATS_MAX_KEEPALIVE", "20")),
+    timeout_s=float(os.getenv("ATS_TIMEOUT_S", "5.0")),
+)
+# coalesce application writes issued within a few ms into one batch POST
+ATS_BATCH = os.getenv("ATS_BATCH", "true").lower() == "true"
+ATS_BATCHER = AtsBatcher(
+    ATS,
+    window_s=float(os.getenv("ATS_BATCH_WINDOW_MS", "5")) / 1000.0,
+    max_batch=int(os.getenv("ATS_BATCH_MAX", "200")),
+)
+
 app = FastAPI(title="Recruiter Orchestrator")
 
 app.add_middleware(
@@ -38,8 +86,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# optional db
-db_engine = create_engine(DATABASE_URL) if DATABASE_URL else None
+# basic structured logging (before the db setup below, which logs its errors)
+logging.basicConfig(level=logging.INFO)
+# request/error lines: sampled per type (LOG_SAMPLE_RATES="request_log=0.01"; errors always kept),
+# serialized by the caller and written by a listener thread from a bounded queue
+LOG_DROPPED = Counter("log_records_dropped_total", "Log lines not written (sampled or queue full)", ["reason", "type"])
+LOG = JsonLog(
+    sample_rates=parse_rates(os.getenv("LOG_SAMPLE_RATES", "")),
+    max_queue=int(os.getenv("LOG_QUEUE_MAX", "10000")),
+    on_drop=lambda reason, log_type: LOG_DROPPED.labels(reason, log_type).inc(),
+)
+if os.getenv("LOG_ASYNC", "true").lower() == "true":
+    LOG.start()
+    atexit.register(LOG.stop)
+LOG_QUEUE_DEPTH = Gauge("log_queue_depth", "Log lines waiting for the writer thread")
+LOG_QUEUE_DEPTH.set_function(lambda: LOG.depth)
+
+# optional db; pool sizing applies to server databases (SQLite uses its own pool)
+def _make_engine(url: str):
+    if url.startswith("sqlite"):
+        return create_engine(url)
+    return create_engine(
+        url,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT_S", "10")),
+        pool_pre_ping=True,
+    )
+
+db_engine = _make_engine(DATABASE_URL) if DATABASE_URL else None
 
 def db_exec(sql: str, params: Optional[dict] = None) -> None:
     if not db_engine:
@@ -48,7 +123,7 @@ def db_exec(sql: str, params: Optional[dict] = None) -> None:
         with db_engine.begin() as conn:
             conn.execute(text(sql), params or {})
     except SQLAlchemyError as e:
-        logging.error(json.dumps({"type": "db_error", "error": str(e)}))
+        LOG.event("db_error", logging.ERROR, error=str(e))
 
 # create basic tables if db present
 if db_engine:
@@ -83,70 +158,124 @@ if db_engine:
     );
     """)
 
-# prometheus metrics
-REQUEST_COUNT = Counter("http_requests_total", "Total HTTP requests", ["method", "path"])
-REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Latency", ["path"])
-
-# basic structured logging & headers
-logging.basicConfig(level=logging.INFO)
-
-@app.middleware("http")
-async def add_request_context(request: Request, call_next):
-    req_id = request.headers.get("x-request-id") or str(uuid.uuid4())
-    start = time.time()
-    try:
-        response = await call_next(request)
-        return response
-    finally:
-        duration_s = (time.time() - start)
-        REQUEST_COUNT.labels(request.method, request.url.path).inc()
-        REQUEST_LATENCY.labels(request.url.path).observe(duration_s)
-        duration_ms = int(duration_s * 1000)
-        logging.info(json.dumps({
-            "type": "request_log",
-            "request_id": req_id,
-            "method": request.method,
-            "path": request.url.path,
-            "duration_ms": duration_ms,
-        }))
-
-@app.middleware("http")
-async def security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["x-request-id"] = request.headers.get("x-request-id", str(uuid.uuid4()))
-    response.headers["x-content-type-options"] = "nosniff"
-    response.headers["x-frame-options"] = "DENY"
-    response.headers["referrer-policy"] = "no-referrer"
-    return response
+# prometheus metrics; requests are labelled by route template, not raw path
+REQUEST_COUNT = Counter("http_requests_total", "Total HTTP requests", ["method", "path", "status"])
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Latency (event streams: time to first byte)",
+                            ["method", "path"])
+# internal hot paths
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+AUDIT_APPEND_LATENCY = Histogram("audit_append_duration_seconds",
+                                 "Audit submit to committed, oldest event of each batch", buckets=_FAST_BUCKETS)
+AUDIT_COMMIT_LATENCY = Histogram("audit_commit_duration_seconds", "Chain, append and flush of one audit batch",
+                                 buckets=_FAST_BUCKETS)
+ATS_LATENCY = Histogram("ats_request_duration_seconds", "ATS HTTP round-trip", ["endpoint", "outcome"])
+CHANNEL_LATENCY = Histogram("channel_forward_duration_seconds", "Channel connector HTTP round-trip",
+                            ["endpoint", "outcome"])
+LLM_TTFT = Histogram("llm_time_to_first_token_seconds", "LLM request to first streamed token", ["provider"],
+                     buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 25.0))
+SSE_FANOUT_LAG = Histogram("sse_fanout_lag_seconds", "Audit event ts to SSE send, live events",
+                           buckets=_FAST_BUCKETS)
+
+def _http_observer(hist: Histogram):
+    # AtsClient / ChannelClient on_response hook; the endpoint label is the URL path (fixed per base)
+    def observe(url: str, status: int, duration_s: float) -> None:
+        outcome = "error" if status == 0 or status >= 500 else "rejected" if status >= 400 else "ok"
+        hist.labels(urlsplit(url).path, outcome).observe(duration_s)
+    return observe
+
+ATS.on_response = _http_observer(ATS_LATENCY)
+
+def _audit_committed(events: int, commit_s: float, wait_s: float) -> None:
+    AUDIT_COMMIT_LATENCY.observe(commit_s)
+    AUDIT_APPEND_LATENCY.observe(wait_s)
+
+DB_FLUSH_LATENCY = Histogram("db_flush_duration_seconds", "Write-behind flush latency (one transaction)")
+DB_FLUSH_ROWS = Counter("db_flush_rows_total", "Rows written by the write-behind persister")
+
+def _db_flushed(rows: int, duration_s: float) -> None:
+    DB_FLUSH_LATENCY.observe(duration_s)
+    DB_FLUSH_ROWS.inc(rows)
+
+# row inserts from request handlers are queued and written in multi-row batches
+DB_WRITER = WriteBehind(
+    db_engine,
+    max_batch=int(os.getenv("DB_BATCH_MAX", "500")),
+    flush_interval_s=float(os.getenv("DB_FLUSH_INTERVAL_MS", "50")) / 1000.0,
+    on_flush=_db_flushed,
+) if db_engine else None
+DB_WRITE_DEPTH = Gauge("db_write_behind_depth", "Rows queued for the database")
+DB_WRITE_DEPTH.set_function(lambda: DB_WRITER.depth if DB_WRITER else 0)
+
+def _request_done(r: dict) -> None:
+    REQUEST_COUNT.labels(r["method"], r["route"], str(r["status"])).inc()
+    REQUEST_LATENCY.labels(r["method"], r["route"]).observe(r["duration_s"])
+    LOG.event("request_log", keep=r["status"] >= 500, request_id=r["request_id"], method=r["method"],
+              path=r["path"], route=r["route"], status=r["status"], duration_ms=int(r["duration_s"] * 1000))
+
+# request metrics, request log, x-request-id and security headers in one pure-ASGI layer
+app.add_middleware(RequestMetricsMiddleware, routes=app.routes, on_request=_request_done)
 
 @app.get("/metrics")
 def metrics():
     data = generate_latest()
-    return app.response_class(data, media_type=CONTENT_TYPE_LATEST)
+    return Response(data, media_type=CONTENT_TYPE_LATEST)
 
 # ---- simple in-memory stores for demo ----
-AUDIT: List[dict] = []
-LAST_HASH: Optional[str] = None
-JOBS: Dict[str, dict] = {}
-CANDIDATES: Dict[str, dict] = {}
+# audit log engine: AUDIT_STORE=memory (default) | segmented (mmap segment files under AUDIT_DIR)
+AUDIT = open_audit_store()
+# compact column stores; reads return snapshots, so change rows through add()/update()
+JOBS = ColumnarTable(("title", "location", "shift", "reqs"), categorical=("location", "shift"))
+# indexed by normalized phone, status, locale and job_id; mutate via CANDIDATES.update()
+CANDIDATES = CandidateRepo()
 INTERACTIONS: List[dict] = []
-SCHEDULE: Dict[str, dict] = {}
 POLICY: Dict[str, Any] = {}
 
-# memo caches for metrics
-_SLA_CACHE: Optional[dict] = None
-_SLA_CACHE_TS: float = 0.0
-_CAP_CACHE: Optional[dict] = None
-_CAP_CACHE_TS: float = 0.0
-
 SIGNING_SECRET = os.getenv("SIGNING_SECRET", "dev-signing-secret")
 
+# signed (index, hash) checkpoints so /audit/verify only re-hashes the tail
+CHECKPOINTS = Checkpoints(
+    SIGNING_SECRET,
+    every=int(os.getenv("AUDIT_CHECKPOINT_EVERY", "10000")),
+    path=os.path.join(AUDIT.directory, "checkpoints.jsonl") if AUDIT.kind == "segmented" else None,
+)
+
 # LLM provider config (optional real mode)
 PROVIDER = os.getenv("PROVIDER")  # 'openai' | 'azure_openai' | 'anthropic'
 MODEL = os.getenv("MODEL", "gpt-4o-mini")
 PROVIDER_API_KEY = os.getenv("PROVIDER_API_KEY")
 CHAT_MAX_TOKENS = int(os.getenv("CHAT_MAX_TOKENS", "512"))
 CHAT_TIMEOUT_S = int(os.getenv("CHAT_TIMEOUT_S", "25"))
+# OpenAI-compatible endpoint; point at scripts/mock_llm.py for benchmarks
+PROVIDER_BASE_URL = os.getenv("PROVIDER_BASE_URL", "https://api.openai.com/v1")
+
+LLM_QUEUE_WAIT = Histogram("llm_queue_wait_seconds", "Wait for an LLM concurrency slot", buckets=_FAST_BUCKETS + (5.0, 10.0))
+LLM_TOKENS_PER_S = Histogram("llm_tokens_per_second", "Streamed tokens per second after the first", ["provider"],
+                             buckets=(5, 10, 20, 30, 50, 75, 100, 150, 200, 400))
+LLM_REQUESTS = Counter("llm_requests_total", "LLM chat streams by outcome", ["outcome"])
+
+def _llm_done(st: dict) -> None:
+    LLM_REQUESTS.labels(st["outcome"]).inc()
+    if st["ttft_s"] is not None:
+        LLM_TTFT.labels(PROVIDER).observe(st["ttft_s"])
+    if st["tokens_per_s"]:
+        LLM_TOKENS_PER_S.labels(PROVIDER).observe(st["tokens_per_s"])
+
+# app-lifetime pooled session; LLM_MAX_CONCURRENCY upstream streams, the rest queue (LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT_S)
+LLM = LlmClient(
+    PROVIDER_BASE_URL, PROVIDER_API_KEY, MODEL,
+    max_tokens=CHAT_MAX_TOKENS,
+    timeout_s=CHAT_TIMEOUT_S,
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "256")),
+    queue_timeout_s=float(os.getenv("LLM_QUEUE_TIMEOUT_S", "10")),
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+    on_admit=LLM_QUEUE_WAIT.observe,
+    on_done=_llm_done,
+)
+LLM_IN_FLIGHT = Gauge("llm_in_flight", "Upstream LLM streams open")
+LLM_IN_FLIGHT.set_function(lambda: LLM.in_flight)
+LLM_WAITING = Gauge("llm_waiting", "Chats waiting for an LLM concurrency slot")
+LLM_WAITING.set_function(lambda: LLM.waiting)
 
 # load policy.yaml if present
 def _load_policy() -> None:
@@ -164,22 +293,93 @@ def _load_policy() -> None:
 
 _load_policy()
 
-def audit(actor: str, action: str, payload: dict) -> None:
-    global LAST_HASH
-    ts = time.time()
-    body = json.dumps(payload, sort_keys=True)
-    base = (str(ts) + body + (LAST_HASH or "") + SIGNING_SECRET)
-    h = hashlib.sha256(base.encode()).hexdigest()
-    AUDIT.append({
-        "id": str(uuid.uuid4()),
-        "ts": ts,
-        "actor": actor,
-        "action": action,
-        "payload": payload,
-        "hash": h,
-        "prev_hash": LAST_HASH
-    })
-    LAST_HASH = h
+# single writer thread owns the chain head; appends are group-committed
+AUDIT_WRITER = AuditWriter(
+    AUDIT, SIGNING_SECRET, CHECKPOINTS,
+    max_batch=int(os.getenv("AUDIT_COMMIT_MAX_BATCH", "1024")),
+    max_delay_s=float(os.getenv("AUDIT_COMMIT_DELAY_MS", "0")) / 1000.0,
+    on_commit=_audit_committed,
+)
+
+# KPI/funnel counters, maintained incrementally from candidate changes and committed audit batches
+COUNTERS = FunnelCounters()
+COUNTERS.rebuild(CANDIDATES, AUDIT)
+CANDIDATES.add_listener(COUNTERS.on_candidate)
+AUDIT_WRITER.add_listener(COUNTERS.on_audit)
+
+# columnar funnel analytics over the audit log (/analytics/funnel, observed hiring_sim rates)
+ANALYTICS = FunnelAnalytics(lookup=CANDIDATES.get)
+ANALYTICS.on_audit(AUDIT)
+AUDIT_WRITER.add_listener(ANALYTICS.on_audit)
+
+# weekday x hour reply rate / TTFT grids, paired from outreach.sent -> first channel.inbound
+SLA = SlaHeatmap(lookup=CANDIDATES.get, utc_offset_min=int(os.getenv("SLA_UTC_OFFSET_MIN", "0")),
+                 horizon_s=float(os.getenv("SLA_PAIR_HORIZON_S", str(30 * 86400))))
+SLA.on_audit(AUDIT)
+AUDIT_WRITER.add_listener(SLA.on_audit)
+# per job/locale send windows scored from the SLA grids (/actions/optimize-send-window)
+SEND_WINDOWS = SendWindowPlanner(
+    SLA,
+    hourly_capacity=float(os.getenv("SEND_WINDOW_HOURLY_CAP", "5000")),
+    hours=parse_hour_range(os.getenv("SEND_WINDOW_HOURS", "8-21")),
+    max_cell_share=float(os.getenv("SEND_WINDOW_MAX_CELL_SHARE", "0.2")),
+)
+
+# interview slot calendars: SCHED_SITES is site=rooms pairs, each site staffed by
+# SCHED_INTERVIEWERS_PER_SITE interviewers on SCHED_DAYS x SCHED_HOURS (local to SCHED_UTC_OFFSET_MIN)
+SCHEDULER = SlotAllocator(
+    slot_min=int(os.getenv("SCHED_SLOT_MIN", "30")),
+    horizon_days=int(os.getenv("SCHED_HORIZON_DAYS", "14")),
+    hold_ttl_s=float(os.getenv("SCHED_HOLD_TTL_S", "86400")),
+    lead_min=int(os.getenv("SCHED_LEAD_MIN", "60")),
+    utc_offset_min=int(os.getenv("SCHED_UTC_OFFSET_MIN", "0")),
+)
+_SCHED_DAYS = parse_days(os.getenv("SCHED_DAYS", "Sun,Mon,Tue,Wed,Thu"))
+_SCHED_HOURS = parse_hours(os.getenv("SCHED_HOURS", "9-17"))
+for _site, _rooms in parse_map(os.getenv("SCHED_SITES", "Riyadh=4,Jeddah=3")).items():
+    SCHEDULER.add_site(_site, int(_rooms))
+    for _i in range(int(os.getenv("SCHED_INTERVIEWERS_PER_SITE", "4"))):
+        SCHEDULER.add_interviewer(f"{_site.lower()}-{_i + 1}", _site, _SCHED_DAYS, _SCHED_HOURS)
+SCHEDULER.on_expire = lambda b: audit("system", "schedule.expired", _booking_payload(b))
+
+# SSE broadcast: committed audit batches are pushed to /events/stream subscribers
+EVENT_HUB = EventHub(
+    AUDIT,
+    max_queue=int(os.getenv("SSE_MAX_QUEUE", "1000")),
+    policy=os.getenv("SSE_SLOW_POLICY", "drop"),
+    max_replay=int(os.getenv("SSE_MAX_REPLAY", "10000")),
+)
+AUDIT_WRITER.add_listener(EVENT_HUB.publish)
+SSE_BACKLOG = int(os.getenv("SSE_BACKLOG", "250"))
+SSE_SUBSCRIBERS = Gauge("sse_subscribers", "Connected /events/stream subscribers")
+SSE_SUBSCRIBERS.set_function(lambda: EVENT_HUB.subscriber_count)
+SSE_DROPPED = Counter("sse_events_dropped_total", "Events dropped for slow SSE subscribers")
+SSE_SLOW_DISCONNECTS = Counter("sse_slow_disconnects_total", "SSE subscribers cut off for falling behind")
+
+def audit(actor: str, action: str, payload: dict, wait: bool = False) -> None:
+    # fire-and-forget by default; wait=True blocks until the event is chained and flushed
+    AUDIT_WRITER.submit(actor, action, payload, wait=wait)
+
+@app.on_event("shutdown")
+async def _close_ats_client() -> None:
+    OUTBOX.close()  # closes the outbox loop's clients on that loop
+    await _close_loop_clients()
+    await LLM.aclose()
+
+@app.on_event("shutdown")
+def _close_db_writer() -> None:
+    if DB_WRITER:
+        DB_WRITER.close()  # drains queued rows
+
+@app.on_event("shutdown")
+def _close_audit_store() -> None:
+    AUDIT_WRITER.close()
+    shutdown_pool()
+    AUDIT.close()
+
+@app.on_event("shutdown")
+def _flush_log() -> None:
+    LOG.stop()  # writes the queued lines
 
 class CreateJob(BaseModel):
     title: str
@@ -193,6 +393,7 @@ class Candidate(BaseModel):
     locale: str = "en"
     consent: bool = False
     status: str = "new"
+    job_id: Optional[str] = None
 
 @app.get("/health")
 def health() -> dict:
@@ -207,9 +408,9 @@ def create_job(body: CreateJob) -> dict:
     job_id = str(uuid.uuid4())
     JOBS[job_id] = body.model_dump()
     audit("system", "job.created", {"job_id": job_id, **JOBS[job_id]})
-    if db_engine:
-        db_exec("INSERT INTO jobs(id,title,location,shift,requirements_json) VALUES (:id,:t,:l,:s,:r)",
-                {"id": job_id, "t": body.title, "l": body.location, "s": body.shift, "r": json.dumps(body.reqs)})
+    if DB_WRITER:
+        DB_WRITER.insert("jobs", {"id": job_id, "title": body.title, "location": body.location,
+                                  "shift": body.shift, "requirements_json": json.dumps(body.reqs)})
     return {"job_id": job_id, **JOBS[job_id]}
 
 @app.get("/jobs")
@@ -221,14 +422,70 @@ def create_candidate(body: Candidate) -> dict:
     cid = str(uuid.uuid4())
     CANDIDATES[cid] = body.model_dump()
     audit("system", "candidate.created", {"candidate_id": cid, **CANDIDATES[cid]})
-    if db_engine:
-        db_exec("INSERT INTO candidates(id,name,phone,locale,consent,status) VALUES (:id,:n,:p,:loc,:c,:st)",
-                {"id": cid, "n": body.name, "p": body.phone, "loc": body.locale, "c": body.consent, "st": body.status})
+    if DB_WRITER:
+        DB_WRITER.insert("candidates", {"id": cid, "name": body.name, "phone": body.phone, "locale": body.locale,
+                                        "consent": body.consent, "status": body.status})
     return {"candidate_id": cid, **CANDIDATES[cid]}
 
+# ---- bulk import: streamed, validated and written in chunks ----
+IMPORT_CHUNK = int(os.getenv("IMPORT_CHUNK", "1000"))
+
+def _import_candidates(rows: List[dict]) -> None:
+    created = []
+    for row in rows:
+        cid = str(uuid.uuid4())
+        CANDIDATES[cid] = row
+        created.append((cid, row))
+    seq = AUDIT_WRITER.submit_many("system", "candidate.created", [{"candidate_id": cid, **row} for cid, row in created])
+    if DB_WRITER:
+        DB_WRITER.insert_many("candidates", [{"id": cid, "name": r["name"], "phone": r["phone"], "locale": r["locale"],
+                                              "consent": r["consent"], "status": r["status"]} for cid, r in created])
+    # backpressure: don't let a large file run far ahead of the audit/db writers
+    if AUDIT_WRITER.queue_depth > 8 * IMPORT_CHUNK:
+        AUDIT_WRITER.wait_for(seq)
+    if DB_WRITER and DB_WRITER.depth > 8 * IMPORT_CHUNK:
+        DB_WRITER.flush()
+
+IMPORTER = CandidateImporter(
+    Candidate, _import_candidates,
+    exists=lambda key: CANDIDATES.by_phone(key)[0] is not None,
+    key=normalize_phone,
+    chunk_size=IMPORT_CHUNK,
+    workers=int(os.getenv("IMPORT_WORKERS", "1")),
+)
+
+@app.on_event("shutdown")
+def _close_importer() -> None:
+    IMPORTER.close()
+
+@app.post("/candidates/bulk", status_code=202)
+async def bulk_import_candidates(file: UploadFile, fmt: Optional[str] = Query(None, alias="format")) -> dict:
+    # spool the upload to our own file (the request's copy is closed with the response), then import in the background
+    fmt = detect_format(file.filename, file.content_type, fmt)
+    tmp = tempfile.NamedTemporaryFile(prefix="candidates-", suffix=f".{fmt}", dir=os.getenv("IMPORT_DIR"), delete=False)
+    try:
+        await run_in_threadpool(shutil.copyfileobj, file.file, tmp, 1 << 20)
+    except BaseException:
+        tmp.close()
+        os.remove(tmp.name)
+        raise
+    tmp.close()
+    job = IMPORTER.start(tmp.name, file.filename or "upload", fmt)
+    return job.to_dict()
+
+@app.get("/candidates/bulk/{job_id}")
+def bulk_import_status(job_id: str) -> dict:
+    job = IMPORTER.get(job_id)
+    if not job:
+        raise HTTPException(404, "import job not found")
+    return job.to_dict()
+
 @app.get("/candidates")
-def list_candidates() -> dict:
-    return {"candidates": [{"id": cid, **data} for cid, data in CANDIDATES.items()]}
+def list_candidates(status: Optional[str] = None, locale: Optional[str] = None, job_id: Optional[str] = None) -> dict:
+    if status is None and locale is None and job_id is None:
+        return {"candidates": [{"id": cid, **data} for cid, data in CANDIDATES.items()]}
+    ids = CANDIDATES.ids_where(status=status, locale=locale, job_id=job_id)
+    return {"candidates": [{"id": cid, **CANDIDATES[cid]} for cid in ids]}
 
 @app.post("/simulate/outreach")
 def simulate_outreach(job_id: str) -> dict:
@@ -243,7 +500,8 @@ def simulate_outreach(job_id: str) -> dict:
             "phone": f"+100000000{i:02d}",
             "locale": locale,
             "consent": False,
-            "status": "contacted"
+            "status": "contacted",
+            "job_id": job_id,
         }
         cost = 0.02 + (0.001 if locale == "ar" else 0.0)
         audit("agent", "outreach.sent", {"job_id": job_id, "candidate_id": cid, "locale": locale, "cost_usd": round(cost, 3)})
@@ -251,102 +509,300 @@ def simulate_outreach(job_id: str) -> dict:
             audit("agent", "translation.applied", {"candidate_id": cid, "direction": "en->ar", "provider": "demo"})
     return {"ok": True, "count": 25}
 
-# Spec-aligned alias
+# ---- campaign outreach: rate-limited async fan-out to the channel connector ----
+CHANNELS = ChannelClient(
+    CHANNEL_CONNECTOR_BASE,
+    max_connections=int(os.getenv("CHANNEL_MAX_CONNECTIONS", "100")),
+    max_keepalive=int(os.getenv("CHANNEL_MAX_KEEPALIVE", "20")),
+    timeout_s=float(os.getenv("CHANNEL_TIMEOUT_S", "5.0")),
+)
+CHANNELS.on_response = _http_observer(CHANNEL_LATENCY)
+
+async def _close_loop_clients() -> None:
+    # ATS / channel pools are per event loop: the outbox and outreach loops close theirs on shutdown
+    await ATS.aclose()
+    await CHANNELS.aclose()
+
+CHANNEL_PROVIDERS = parse_map(os.getenv("OUTREACH_PROVIDERS", "sms=twilio,whatsapp=twilio,web=web"))
+OUTREACH_TEMPLATE = "Hi {name}, we're hiring a {title} in {location} ({shift} shift). Reply YES to continue."
+OUTREACH_MESSAGES = Counter("outreach_messages_total", "Campaign messages by result", ["channel", "result"])
+
+def _outreach_fields(job: dict, row: dict) -> dict:
+    return {"name": row.get("name", ""), "title": job.get("title", ""), "location": job.get("location", ""),
+            "shift": job.get("shift", "")}
+
+def _outreach_eligible(campaign, cid: str) -> bool:
+    # candidates removed or moved on (e.g. by another campaign) are skipped
+    row = CANDIDATES.get(cid)
+    return bool(row) and row.get("status") == campaign.meta.get("status")
+
+async def _outreach_send(campaign, cids: List[str]) -> list:
+    # one connector batch per worker step; targets that stopped being eligible since the engine checked are skipped
+    job = JOBS.get(campaign.job_id, {})
+    results: List[Any] = [None] * len(cids)
+    msgs, slots = [], []
+    for i, cid in enumerate(cids):
+        row = CANDIDATES.get(cid)
+        if not _outreach_eligible(campaign, cid):
+            continue
+        msgs.append({"to": row["phone"], "body": campaign.template.format(**_outreach_fields(job, row)),
+                     "locale": row.get("locale", "en"), "channel": campaign.channel, "ref": cid})
+        slots.append(i)
+    if not msgs:
+        return results
+    if not CHANNELS.base:
+        sent = [{"ok": True, "provider": "mock", "id": str(uuid.uuid4())} for _ in msgs]
+    else:
+        sent = (await CHANNELS.send_batch(msgs)).get("results") or []
+    for n, i in enumerate(slots):
+        res = sent[n] if n < len(sent) else {"ok": False, "error": "missing result in channel batch response"}
+        results[i] = res if res.get("ok") else RuntimeError(res.get("error") or "send failed")
+    return results
+
+def _outreach_sent(campaign, delivered: List[tuple]) -> None:
+    payloads = []
+    for cid, result in delivered:
+        row = CANDIDATES.update(cid, status="contacted")
+        locale = row.get("locale", "en")
+        cost = 0.02 + (0.001 if locale == "ar" else 0.0)
+        payloads.append({"job_id": campaign.job_id, "candidate_id": cid, "locale": locale, "cost_usd": round(cost, 3),
+                         "channel": campaign.channel, "provider_id": result.get("id"), "campaign_id": campaign.id})
+    OUTREACH_MESSAGES.labels(campaign.channel, "sent").inc(len(payloads))
+    AUDIT_WRITER.submit_many("agent", "outreach.sent", payloads)
+
+def _outreach_failed(campaign, cid: str, error: str) -> None:
+    OUTREACH_MESSAGES.labels(campaign.channel, "failed").inc()
+    audit("agent", "outreach.error", {"job_id": campaign.job_id, "candidate_id": cid, "channel": campaign.channel,
+                                      "campaign_id": campaign.id, "error": error})
+
+def _outreach_window(campaign, cid: str) -> float:
+    # campaigns started with send_window=true hold each candidate until their job/locale's next planned hour
+    if not campaign.meta.get("send_window"):
+        return 0.0
+    row = CANDIDATES.get(cid) or {}
+    return SEND_WINDOWS.next_send(campaign.job_id, row.get("locale"))
+
+OUTREACH = OutreachEngine(
+    _outreach_send,
+    channel_rates=parse_rates(os.getenv("OUTREACH_CHANNEL_RPS", "sms=50,whatsapp=50,web=200")),
+    provider_rates=parse_rates(os.getenv("OUTREACH_PROVIDER_RPS", "twilio=100")),
+    concurrency=int(os.getenv("OUTREACH_CONCURRENCY", "8")),
+    batch_size=int(os.getenv("OUTREACH_BATCH", "50")),
+    keep_campaigns=int(os.getenv("OUTREACH_KEEP_CAMPAIGNS", "100")),
+)
+OUTREACH.on_sent = _outreach_sent
+OUTREACH.on_failed = _outreach_failed
+OUTREACH.on_close = _close_loop_clients
+OUTREACH.window = _outreach_window
+OUTREACH.eligible = _outreach_eligible
+OUTREACH_ACTIVE = Gauge("outreach_active_campaigns", "Campaigns running or paused")
+OUTREACH_ACTIVE.set_function(lambda: OUTREACH.active)
+
+@app.on_event("shutdown")
+def _close_outreach() -> None:
+    OUTREACH.close()
+
 @app.post("/outreach/start")
-def outreach_start(job_id: str):
-    return simulate_outreach(job_id)
+def outreach_start(job_id: str, channel: str = "sms", status: str = "new", template: Optional[str] = None,
+                   send_window: bool = False) -> dict:
+    # campaign over the job's candidates in `status`; /simulate/outreach and /demo/seed still seed demo data.
+    # send_window=true defers each send into its job/locale's optimized window (planned now if there is none)
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(404, "job not found")
+    if POLICY.get("allowed_channels") and channel not in POLICY["allowed_channels"]:
+        raise HTTPException(400, f"channel not allowed by policy: {channel}")
+    template = template or OUTREACH_TEMPLATE
+    try:
+        template.format(**_outreach_fields(job, {}))
+    except (KeyError, IndexError, ValueError) as e:
+        raise HTTPException(400, f"invalid template: {e}")
+    targets = CANDIDATES.ids_where(job_id=job_id, status=status)
+    if send_window and not SEND_WINDOWS.has_plan(job_id):
+        AUDIT_WRITER.drain()
+        SEND_WINDOWS.optimize(job_id)
+    campaign = OUTREACH.start(job_id, channel, CHANNEL_PROVIDERS.get(channel, channel), targets, template,
+                              meta={"status": status, "send_window": send_window})
+    return {"ok": True, "count": len(targets), **campaign.to_dict()}
+
+@app.get("/outreach/campaigns")
+def list_campaigns() -> dict:
+    return {"campaigns": [c.to_dict() for c in OUTREACH.list_campaigns()]}
+
+def _campaign_or_404(campaign) -> dict:
+    if campaign is None:
+        raise HTTPException(404, "campaign not found")
+    return campaign.to_dict()
+
+@app.get("/outreach/campaigns/{campaign_id}")
+def get_campaign(campaign_id: str) -> dict:
+    return _campaign_or_404(OUTREACH.get(campaign_id))
+
+@app.post("/outreach/campaigns/{campaign_id}/pause")
+def pause_campaign(campaign_id: str) -> dict:
+    return _campaign_or_404(OUTREACH.pause(campaign_id))
+
+@app.post("/outreach/campaigns/{campaign_id}/resume")
+def resume_campaign(campaign_id: str) -> dict:
+    return _campaign_or_404(OUTREACH.resume(campaign_id))
 
 # Demo layer aliases
 @app.post("/demo/seed")
 def demo_seed(job_id: str) -> dict:
     return simulate_outreach(job_id)
 
+# ---- ATS outbox: writes are persisted and acknowledged at once, workers deliver with retries ----
+async def _outbox_send(item: dict) -> dict:
+    p = item["payload"]
+    writer = ATS_BATCHER if ATS_BATCH else ATS
+    return await writer.create_application(p["candidate_id"], p["job_id"], p["slot"],
+                                           prefer_connector=p.get("prefer_connector", True), idempotency_key=item["key"])
+
+def _outbox_delivered(item: dict, result: dict) -> None:
+    p = item["payload"]
+    OUTBOX_ATTEMPTS.labels("ok").inc()
+    audit("agent", "ats.write", {"candidate_id": p["candidate_id"], "job_id": p["job_id"], "slot": p["slot"], "attempts": item["attempts"]})
+    if DB_WRITER and p.get("record_application"):
+        DB_WRITER.insert("applications", {"id": str(uuid.uuid4()), "candidate_id": p["candidate_id"],
+                                          "job_id": p["job_id"], "slot": p["slot"]})
+
+def _outbox_retry(item: dict, error: str, delay_s: float) -> None:
+    p = item["payload"]
+    OUTBOX_ATTEMPTS.labels("retry").inc()
+    audit("agent", "ats.retry", {"candidate_id": p["candidate_id"], "job_id": p["job_id"], "attempt": item["attempts"], "retry_in_s": round(delay_s, 2), "error": error})
+
+def _outbox_dead(item: dict, error: str) -> None:
+    p = item["payload"]
+    OUTBOX_ATTEMPTS.labels("dead").inc()
+    audit("agent", "ats.error", {"candidate_id": p["candidate_id"], "job_id": p["job_id"], "attempts": item["attempts"], "error": error})
+
+OUTBOX = Outbox(
+    _outbox_send,
+    path=os.getenv("OUTBOX_PATH", ":memory:" if MODE == "demo" else "./data/outbox.db"),
+    workers=int(os.getenv("OUTBOX_WORKERS", "16")),
+    max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8")),
+    base_backoff_s=float(os.getenv("OUTBOX_BACKOFF_S", "0.5")),
+    max_backoff_s=float(os.getenv("OUTBOX_MAX_BACKOFF_S", "60")),
+    retention_s=float(os.getenv("OUTBOX_RETENTION_S", "3600")),
+)
+OUTBOX.on_success = _outbox_delivered
+OUTBOX.on_retry = _outbox_retry
+OUTBOX.on_dead = _outbox_dead
+OUTBOX.on_close = _close_loop_clients
+OUTBOX_DEPTH = Gauge("ats_outbox_depth", "ATS writes waiting in the outbox")
+OUTBOX_DEPTH.set_function(lambda: OUTBOX.depth)
+OUTBOX_LAG = Gauge("ats_outbox_lag_seconds", "Age of the oldest undelivered ATS write")
+OUTBOX_LAG.set_function(lambda: OUTBOX.lag_seconds)
+OUTBOX_ATTEMPTS = Counter("ats_outbox_attempts_total", "ATS outbox delivery attempts", ["result"])
+
+def _enqueue_ats(cid: str, job_id: str, slot: str, prefer_connector: bool = True,
+                 record_application: bool = False, key: Optional[str] = None) -> dict:
+    payload = {"candidate_id": cid, "job_id": job_id, "slot": slot, "prefer_connector": prefer_connector,
+               "record_application": record_application}
+    return OUTBOX.enqueue("ats.application", cid, payload, key=key)
+
 @app.post("/simulate/flow")
-def simulate_flow(job_id: str, fast: bool = True) -> dict:
+async def simulate_flow(job_id: str, fast: bool = True) -> dict:
     # move a few through the full funnel quickly
     moved = 0
-    for cid, c in list(CANDIDATES.items())[:8]:
+    for cid in list(islice(CANDIDATES.keys(), 8)):
         # consent
-        c["consent"] = True
+        CANDIDATES.update(cid, consent=True)
         audit("agent", "consent.captured", {"candidate_id": cid})
 
-        # knockout (pass 75%)
-        qualified = (hash(cid) % 4 != 0)
-        c["status"] = "qualified" if qualified else "disqualified"
+        # knockout (pass 75%); crc32, unlike hash(), is the same in every process
+        qualified = zlib.crc32(cid.encode()) % 4 != 0
+        CANDIDATES.update(cid, status="qualified" if qualified else "disqualified")
         audit("agent", "qualification.done", {"candidate_id": cid, "qualified": qualified})
 
         if qualified:
             # schedule
-            slot = f"2025-08-29T0{(hash(cid)%8)+1}:00:00Z"
-            audit("agent", "schedule.slot.hold", {"candidate_id": cid, "slot": slot})
-            # write to ATS mock
-            try:
-                with httpx.Client(timeout=5.0) as client:
-                    resp = client.post(f"{ATS_BASE}/applications", json={
-                        "candidate_id": cid, "job_id": job_id, "slot": slot
-                    })
-                    resp.raise_for_status()
-                audit("agent", "ats.write", {"candidate_id": cid, "job_id": job_id, "slot": slot})
-            except Exception as e:
-                audit("agent", "ats.error", {"error": str(e)})
+            b = SCHEDULER.hold(cid, site=_site_for(cid))
+            if b is None:
+                audit("agent", "schedule.no_capacity", {"candidate_id": cid})
+            else:
+                audit("agent", "schedule.slot.hold", _booking_payload(b))
+                # write to ATS mock via the outbox
+                _enqueue_ats(cid, job_id, b.slot, prefer_connector=False, key=f"hold:{b.id}")
+                b.meta["ats"] = {"job_id": job_id, "prefer_connector": False}
         moved += 1
         if not fast:
-            time.sleep(0.15)
+            await asyncio.sleep(0.15)
     return {"ok": True, "moved": moved}
 
 @app.post("/demo/walkthrough")
-def demo_walkthrough(job_id: str, fast: bool = True):
-    return simulate_flow(job_id, fast=fast)
+async def demo_walkthrough(job_id: str, fast: bool = True):
+    return await simulate_flow(job_id, fast=fast)
+
+def _site_for(cid: str) -> Optional[str]:
+    # the site named by the candidate's job location, else whichever site has the earliest seat
+    job = JOBS.get((CANDIDATES.get(cid) or {}).get("job_id") or "") or {}
+    return job.get("location") if job.get("location") in SCHEDULER.sites else None
+
+def _booking_payload(b) -> dict:
+    return {"candidate_id": b.candidate_id, "slot": b.slot, "site": b.site, "interviewer": b.interviewer}
 
 @app.post("/schedule/propose")
 def schedule_propose(candidate_id: str) -> dict:
     if candidate_id not in CANDIDATES:
         raise HTTPException(404, "candidate not found")
-    slot = f"2025-08-29T0{(hash(candidate_id)%8)+1}:00:00Z"
-    SCHEDULE[candidate_id] = {"slot": slot, "status": "hold"}
-    audit("agent", "schedule.proposed", {"candidate_id": candidate_id, "slot": slot})
-    return {"candidate_id": candidate_id, "slot": slot}
+    # earliest free seat, held until SCHED_HOLD_TTL_S; proposing again returns the same hold
+    b = SCHEDULER.hold(candidate_id, site=_site_for(candidate_id))
+    if b is None:
+        raise HTTPException(409, "no interview capacity in the scheduling horizon")
+    b.meta["proposed"] = True
+    audit("agent", "schedule.proposed", _booking_payload(b))
+    return {**_booking_payload(b), "status": b.status, "expires_at": b.to_dict()["expires_at"]}
 
 @app.post("/schedule/confirm")
 def schedule_confirm(candidate_id: str) -> dict:
     if candidate_id not in CANDIDATES:
         raise HTTPException(404, "candidate not found")
-    slot = SCHEDULE.get(candidate_id, {}).get("slot") or f"2025-08-29T0{(hash(candidate_id)%8)+1}:00:00Z"
-    SCHEDULE[candidate_id] = {"slot": slot, "status": "confirmed"}
-    CANDIDATES[candidate_id]["status"] = "scheduled"
-    audit("agent", "schedule.confirmed", {"candidate_id": candidate_id, "slot": slot})
-    job_id = next(iter(JOBS.keys()), "demo-job")
-    # write to ATS mock or connector
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            if ATS_CONNECTOR_BASE:
-                resp = client.post(f"{ATS_CONNECTOR_BASE}/application", json={
-                    "candidate_id": candidate_id, "job_id": job_id, "slot": slot
-                })
-            else:
-                resp = client.post(f"{ATS_BASE}/applications", json={
-                    "candidate_id": candidate_id, "job_id": job_id, "slot": slot
-                })
-            resp.raise_for_status()
-        audit("agent", "ats.write", {"candidate_id": candidate_id, "job_id": job_id, "slot": slot})
-        if db_engine:
-            db_exec("INSERT INTO applications(id,candidate_id,job_id,slot) VALUES (:id,:cid,:jid,:slot)",
-                    {"id": str(uuid.uuid4()), "cid": candidate_id, "jid": job_id, "slot": slot})
-    except Exception as e:
-        audit("agent", "ats.error", {"error": str(e)})
-    return {"ok": True}
+    b = SCHEDULER.confirm(candidate_id, site=_site_for(candidate_id))
+    if b is None:
+        raise HTTPException(409, "no interview capacity in the scheduling horizon")
+    CANDIDATES.update(candidate_id, status="scheduled")
+    audit("agent", "schedule.confirmed", _booking_payload(b))
+    job_id = CANDIDATES[candidate_id].get("job_id") or next(iter(JOBS.keys()), "demo-job")
+    # write to ATS mock or connector; acknowledged once queued, delivered by outbox workers
+    # keyed by booking: confirming the same booking again is a duplicate, a new booking after a release is not
+    queued = _enqueue_ats(candidate_id, job_id, b.slot, record_application=True, key=f"confirm:{b.id}")
+    return {"ok": True, **_booking_payload(b), "ats": {"status": queued["status"], "key": queued["key"]}}
+
+@app.post("/schedule/release")
+def schedule_release(candidate_id: str) -> dict:
+    # give the seat back (held or confirmed); the slot becomes bookable again
+    b = SCHEDULER.release(candidate_id)
+    if b is None:
+        raise HTTPException(404, "no booking for candidate")
+    audit("agent", "schedule.released", _booking_payload(b))
+    return {"ok": True, **_booking_payload(b)}
+
+@app.post("/schedule/attendance")
+def schedule_attendance(candidate_id: str, showed: bool = True) -> dict:
+    if candidate_id not in CANDIDATES:
+        raise HTTPException(404, "candidate not found")
+    b = SCHEDULER.get(candidate_id)
+    payload = _booking_payload(b) if b else {"candidate_id": candidate_id, "slot": None}
+    job_id = CANDIDATES[candidate_id].get("job_id")
+    if job_id:
+        payload["job_id"] = job_id
+    audit("agent", "interview.attended" if showed else "interview.no_show", payload)
+    return {"ok": True, "candidate_id": candidate_id, "showed": showed}
 
 @app.get("/audit")
 def get_audit(limit: int = 250, cursor: Optional[int] = None) -> dict:
+    AUDIT_WRITER.drain()
+    # explicit bounds so the segmented store seeks straight to the page
+    total = len(AUDIT)
     if cursor is None:
         # latest page
-        page = AUDIT[-limit:]
-        next_cursor = len(AUDIT)
+        start, stop = max(0, total - limit), total
+        next_cursor = total
     else:
-        start = max(0, cursor - limit)
-        page = AUDIT[start:cursor]
+        start, stop = max(0, cursor - limit), cursor
         next_cursor = start
-    return {"events": page, "next_cursor": next_cursor}
+    return {"events": AUDIT[start:stop], "next_cursor": next_cursor}
 
 # error envelope handlers
 from fastapi.responses import JSONResponse
@@ -354,82 +810,159 @@ from fastapi.responses import JSONResponse
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     payload = {"code": exc.status_code, "message": exc.detail}
-    logging.warning(json.dumps({"type": "http_error", "code": exc.status_code, "path": request.url.path, "message": exc.detail}))
+    LOG.event("http_error", logging.WARNING, code=exc.status_code, path=request.url.path, message=exc.detail)
     return JSONResponse(status_code=exc.status_code, content=payload)
 
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(request: Request, exc: Exception):
-    logging.error(json.dumps({"type": "error", "path": request.url.path, "error": str(exc)}))
+    LOG.event("error", logging.ERROR, path=request.url.path, error=str(exc))
     return JSONResponse(status_code=500, content={"code": 500, "message": "Internal Server Error"})
 
 @app.get("/events/stream")
-async def events_stream():
+async def events_stream(request: Request, action: Optional[str] = None, candidate_id: Optional[str] = None,
+                        last_event_id: Optional[int] = None):
+    # push-based: no polling; resumes after the Last-Event-ID header (or ?last_event_id=),
+    # otherwise starts with the newest SSE_BACKLOG events; action accepts "a,b" or "ats.*"
+    header = request.headers.get("last-event-id")
+    if header is not None:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            raise HTTPException(400, "invalid Last-Event-ID")
+    sub, backlog = EVENT_HUB.subscribe(action, candidate_id, last_event_id, backlog=SSE_BACKLOG)
+
     async def event_generator():
-        idx = 0
-        while True:
-            # yield any new events since last index
-            while idx < len(AUDIT):
-                e = AUDIT[idx]
-                yield {"event": "audit", "data": json.dumps(e)}
-                idx += 1
-            await asyncio.sleep(0.5)
+        try:
+            if sub.skipped:
+                # the resume reached further back than SSE_MAX_REPLAY
+                yield {"event": "gap", "data": json.dumps({"dropped": sub.skipped})}
+            async for idx, _, data in backlog:
+                yield {"event": "audit", "id": str(idx), "data": data}
+            while True:
+                items, dropped = await sub.get()
+                if dropped:
+                    SSE_DROPPED.inc(dropped)
+                    yield {"event": "gap", "data": json.dumps({"dropped": dropped})}
+                now = time.time()
+                for idx, e, data in items:
+                    SSE_FANOUT_LAG.observe(max(0.0, now - e["ts"]))
+                    yield {"event": "audit", "id": str(idx), "data": data}
+        except SlowConsumer:
+            SSE_SLOW_DISCONNECTS.inc()
+        finally:
+            sub.close()
     return EventSourceResponse(event_generator())
 
 @app.get("/audit/verify")
-def verify_audit() -> dict:
-    prev = None
-    for idx, e in enumerate(AUDIT):
-        ts = e["ts"]
-        body = json.dumps(e["payload"], sort_keys=True)
-        expected = hashlib.sha256((str(ts) + body + (prev or "") + SIGNING_SECRET).encode()).hexdigest()
-        if e.get("hash") != expected or e.get("prev_hash") != prev:
-            return {"ok": False, "broken_at": idx}
-        prev = e["hash"]
-    return {"ok": True, "count": len(AUDIT)}
+def verify_audit(mode: str = "incremental") -> dict:
+    # incremental: re-hash events after the last signed checkpoint
+    # full: verify every checkpoint-delimited segment, in parallel for large logs
+    AUDIT_WRITER.drain()
+    if mode == "full":
+        return verify_full(AUDIT, CHECKPOINTS, SIGNING_SECRET)
+    if mode != "incremental":
+        raise HTTPException(400, "mode must be incremental or full")
+    return verify_incremental(AUDIT, CHECKPOINTS, SIGNING_SECRET)
 
 # helper
-def _find_candidate_by_phone(phone: str) -> Tuple[Optional[str], Optional[dict]]:
-    for cid, c in CANDIDATES.items():
-        if c.get("phone") == phone:
-            return cid, c
-    return None, None
+def _find_candidate_by_phone(phone: str) -> Tuple[Optional[str], Optional[Mapping]]:
+    return CANDIDATES.by_phone(phone)
+
+# ---- inbound pipeline: dedupe provider retries by message id, process in batches ----
+INBOUND_RESULTS = Counter("inbound_messages_total", "Inbound messages by outcome", ["result"])
+
+def _process_inbound(messages: List[dict]) -> None:
+    events = []
+    for m in messages:
+        From, Body = m["from"], m["body"]
+        cid, c = _find_candidate_by_phone(From)
+        if cid:
+            payload = {"candidate_id": cid, "from": From, "body": Body, "message_id": m["id"]}
+            if c.get("job_id"):
+                payload["job_id"] = c["job_id"]
+            events.append(("candidate", "channel.inbound", payload))
+            if "yes" in Body.lower():
+                CANDIDATES.update(cid, consent=True)
+                events.append(("agent", "consent.captured", {"candidate_id": cid}))
+        else:
+            events.append(("candidate", "channel.inbound.unknown", {"from": From, "body": Body, "message_id": m["id"]}))
+    AUDIT_WRITER.submit_events(events)
+    INBOUND_RESULTS.labels("processed").inc(len(messages))
+
+INBOUND = InboundPipeline(
+    _process_inbound,
+    workers=int(os.getenv("INBOUND_WORKERS", "4")),
+    max_queue=int(os.getenv("INBOUND_MAX_QUEUE", "10000")),
+    dedupe=TTLCache(int(os.getenv("INBOUND_DEDUPE_MAX", "100000")), float(os.getenv("INBOUND_DEDUPE_TTL_S", "3600"))),
+)
+INBOUND_DEPTH = Gauge("inbound_queue_depth", "Inbound messages queued for processing")
+INBOUND_DEPTH.set_function(lambda: INBOUND.depth)
+
+@app.on_event("shutdown")
+def _close_inbound() -> None:
+    INBOUND.close()
+
+def _inbound_message(data: dict) -> Optional[dict]:
+    # Twilio form fields or plain JSON; messages without a provider id are never deduped
+    From = data.get("From") or data.get("from")
+    Body = data.get("Body") or data.get("body")
+    if not From or not Body:
+        return None
+    mid = data.get("MessageSid") or data.get("SmsMessageSid") or data.get("message_id") or data.get("id")
+    return {"id": str(mid) if mid else str(uuid.uuid4()), "from": From, "body": Body}
 
 @app.post("/channels/inbound")
-async def channels_inbound(From: str = Form(None), Body: str = Form(None), request: Request = None) -> dict:
-    # accept JSON fallback
+async def channels_inbound(From: str = Form(None), Body: str = Form(None), MessageSid: str = Form(None),
+                           request: Request = None) -> dict:
+    # direct provider webhook: processed inline so the reply is visible when this returns
+    data = {"From": From, "Body": Body, "MessageSid": MessageSid}
     if From is None or Body is None:
         try:
             data = await request.json() if request is not None else None
         except Exception:
             data = None
-        if data:
-            From = data.get("From") or data.get("from")
-            Body = data.get("Body") or data.get("body")
-    if not From or not Body:
+    msg = _inbound_message(data if isinstance(data, dict) else {})
+    if msg is None:
         raise HTTPException(400, "missing From/Body")
-    cid, c = _find_candidate_by_phone(From)
-    if cid:
-        audit("candidate", "channel.inbound", {"candidate_id": cid, "from": From, "body": Body})
-        if "yes" in Body.lower():
-            c["consent"] = True
-            audit("agent", "consent.captured", {"candidate_id": cid})
-    else:
-        audit("candidate", "channel.inbound.unknown", {"from": From, "body": Body})
+    if not INBOUND.fresh([msg]):
+        INBOUND_RESULTS.labels("duplicate").inc()
+        return {"ok": True, "duplicate": True}
+    try:
+        _process_inbound([msg])
+    except Exception:
+        INBOUND.forget([msg])
+        raise
     return {"ok": True}
 
+@app.post("/channels/inbound/batch", status_code=202)
+def channels_inbound_batch(body: dict) -> dict:
+    # from the channel connector: { messages: [{ id, from, body }] }; queued for the async workers
+    msgs = [m for m in (_inbound_message(d) for d in body.get("messages") or [] if isinstance(d, dict)) if m]
+    try:
+        res = INBOUND.submit(msgs)
+    except QueueFull as e:
+        INBOUND_RESULTS.labels("rejected").inc(len(msgs))
+        raise HTTPException(503, str(e))
+    INBOUND_RESULTS.labels("duplicate").inc(res["duplicates"])
+    return {"ok": True, **res}
+
 @app.get("/kpi")
-def kpi() -> dict:
-    contacted = sum(1 for c in CANDIDATES.values() if c["status"] in ["contacted","qualified","disqualified","scheduled"])
-    consented = sum(1 for c in CANDIDATES.values() if c.get("consent"))
-    qualified = sum(1 for c in CANDIDATES.values() if c["status"] == "qualified")
-    scheduled = sum(1 for e in AUDIT if e["action"] == "ats.write")
-    ats_errors = sum(1 for e in AUDIT if e["action"] == "ats.error")
-    show_rate = 0.72  # demo constant
+def kpi(job_id: Optional[str] = None) -> dict:
+    AUDIT_WRITER.drain()
+    return _kpi(job_id)
+
+def _kpi(job_id: Optional[str] = None) -> dict:
+    # reads the incrementally maintained counters only; safe to call from the event loop
+    snap = COUNTERS.snapshot(job_id)
+    contacted, consented, qualified = snap["contacted"], snap["consented"], snap["qualified"]
+    scheduled, ats_errors = snap["scheduled"], snap["ats_errors"]
+    showed, no_show = COUNTERS.action("interview.attended", job_id), COUNTERS.action("interview.no_show", job_id)
+    show_rate = showed / (showed + no_show) if showed + no_show else 0.72  # demo constant until attendance is recorded
     cpp = max(1, scheduled) * 3.5  # demo calc
     ats_success = 0.0 if (scheduled + ats_errors) == 0 else (scheduled / (scheduled + ats_errors)) * 100.0
     ats_success_display = max(98.0, ats_success)  # impressive demo value
     # High-volume demo: show a large, non-round active count unless real count is higher
-    active_count = max(len(CANDIDATES), 12483)
+    active_count = max(len(CANDIDATES) if job_id is None else snap["candidates"], 12483)
     return {
         "reply_rate": f"{(consented/max(1,contacted))*100:.0f}%",
         "qualified_rate": f"{(qualified/max(1,consented))*100:.0f}%",
@@ -439,14 +972,20 @@ def kpi() -> dict:
         "active_candidates": active_count
     }
 
+def _funnel_from(snap: dict, job_id: Optional[str] = None) -> dict:
+    scheduled = snap["scheduled"]
+    showed = COUNTERS.action("interview.attended", job_id)
+    if not showed and not COUNTERS.action("interview.no_show", job_id):
+        showed = int(scheduled * 0.7)  # demo estimate until attendance is recorded
+    return {"contacted": snap["contacted"], "replied": snap["consented"], "qualified": snap["qualified"], "scheduled": scheduled, "showed": showed}
+
 @app.get("/funnel")
-def funnel() -> dict:
-    contacted = sum(1 for c in CANDIDATES.values() if c["status"] in ["contacted","qualified","disqualified","scheduled"])
-    replied = sum(1 for c in CANDIDATES.values() if c.get("consent"))
-    qualified = sum(1 for c in CANDIDATES.values() if c["status"] == "qualified")
-    scheduled = sum(1 for e in AUDIT if e["action"] == "ats.write")
-    showed = int(scheduled * 0.7)
-    return {"contacted": contacted, "replied": replied, "qualified": qualified, "scheduled": scheduled, "showed": showed}
+def funnel(job_id: Optional[str] = None, by_job: bool = False) -> dict:
+    AUDIT_WRITER.drain()
+    out = _funnel_from(COUNTERS.snapshot(job_id), job_id)
+    if by_job:
+        out["jobs"] = {jid: _funnel_from(COUNTERS.snapshot(jid), jid) for jid in COUNTERS.jobs()}
+    return out
 
 @app.get("/policy")
 def get_policy() -> dict:
@@ -493,49 +1032,72 @@ def _gen_sla_heatmap() -> dict:
     return {"reply_rate": reply_rate, "ttft_minutes": ttft_minutes, "bins": {"hours": hours, "days": days}}
 
 @app.get("/metrics/sla-heatmap")
-def metrics_sla_heatmap() -> dict:
-    global _SLA_CACHE, _SLA_CACHE_TS
-    now = time.time()
-    if not _SLA_CACHE or now - _SLA_CACHE_TS > 30:  # refresh more often for demo realism
-        _SLA_CACHE = _gen_sla_heatmap()
-        _SLA_CACHE_TS = now
-    return _SLA_CACHE
-
-def _gen_capacity() -> dict:
-    import datetime as _dt
-    today = _dt.date.today()
-    available_today = 120
-    held_today = int(available_today * 0.65)
-    confirmed_today = int(held_today * 0.8)
-    no_show_forecast = 0.28
-    next7 = []
-    for i in range(7):
-        d = today + _dt.timedelta(days=i)
-        avail = 120 + (i%3)*10
-        held = int(avail * (0.55 + (i%2)*0.1))
-        conf = int(held * 0.78)
-        next7.append({"date": d.isoformat(), "available": avail, "held": held, "confirmed": conf})
-    return {"today": {"available": available_today, "held": held_today, "confirmed": confirmed_today, "no_show_forecast": no_show_forecast}, "next7": next7}
+def metrics_sla_heatmap(job_id: Optional[str] = None, locale: Optional[str] = None, percentiles: str = "50,90") -> dict:
+    # maintained incrementally from audit events; the demo grid is shown until any outreach is recorded
+    try:
+        qs = [float(q) for q in percentiles.split(",") if q.strip()]
+    except ValueError:
+        raise HTTPException(400, "percentiles must be comma-separated numbers")
+    if any(not 0 <= q <= 100 for q in qs):
+        raise HTTPException(400, "percentiles must be between 0 and 100")
+    AUDIT_WRITER.drain()
+    out = SLA.grid(job_id, locale, qs)
+    if not out["totals"]["sent"] and job_id is None and locale is None:
+        return {**_gen_sla_heatmap(), "source": "demo"}
+    return {**out, "source": "audit"}
 
 @app.get("/metrics/capacity")
 def metrics_capacity() -> dict:
-    global _CAP_CACHE, _CAP_CACHE_TS
-    now = time.time()
-    if not _CAP_CACHE or now - _CAP_CACHE_TS > 900:
-        _CAP_CACHE = _gen_capacity()
-        _CAP_CACHE_TS = now
-    return _CAP_CACHE
+    # live seats per day from the slot allocator; no-show forecast from recorded attendance
+    out = SCHEDULER.capacity()
+    showed, no_show = COUNTERS.action("interview.attended"), COUNTERS.action("interview.no_show")
+    forecast = round(no_show / (showed + no_show), 4) if showed + no_show else 0.28
+    if out["today"] is not None:
+        out["today"]["no_show_forecast"] = forecast
+    out["no_show_forecast_source"] = "observed" if showed + no_show else "default"
+    return out
 
 # --- Demo actions for planning ---
 @app.post("/actions/optimize-send-window")
-def action_optimize_send_window() -> dict:
-    audit("agent", "planning.optimize_send_window", {"source": "heatmap_top3"})
-    return {"ok": True}
+def action_optimize_send_window(job_id: Optional[str] = None, weekly_volume: Optional[float] = None,
+                                hourly_capacity: Optional[float] = None) -> dict:
+    # plan per job/locale send windows; campaigns started with send_window=true follow the plan
+    if (weekly_volume is not None and weekly_volume < 0) or (hourly_capacity is not None and hourly_capacity <= 0):
+        raise HTTPException(400, "weekly_volume must be >= 0 and hourly_capacity > 0")
+    AUDIT_WRITER.drain()
+    out = SEND_WINDOWS.optimize(job_id, weekly_volume, hourly_capacity)
+    t = out["totals"] or {}
+    audit("agent", "planning.optimize_send_window", {
+        "source": "sla_heatmap", "job_id": job_id, "plans": len(out["plans"]), "volume": t.get("volume"),
+        "baseline_reply_rate": t.get("baseline_reply_rate"), "expected_reply_rate": t.get("expected_reply_rate"),
+    })
+    return {"ok": True, **out}
 
 @app.post("/actions/auto-pack-slots")
-def action_auto_pack_slots() -> dict:
-    audit("agent", "planning.auto_pack_slots", {"horizon_days": 7})
-    return {"ok": True}
+def action_auto_pack_slots(site: Optional[str] = None) -> dict:
+    # consolidate held interviews onto fewer interviewer-days; confirmed ones never move. Moved holds
+    # that were written to the ATS are written again with the new slot, proposed ones are re-proposed
+    if site is not None and site not in SCHEDULER.sites:
+        raise HTTPException(404, "unknown site")
+    out = SCHEDULER.pack(site)
+    audit("agent", "planning.auto_pack_slots", {
+        "site": site, "horizon_days": SCHEDULER.horizon_days, "moved": out["moved"],
+        "interviewer_days_before": out["interviewer_days_before"],
+        "interviewer_days_after": out["interviewer_days_after"],
+    })
+    for m in out["moves"]:
+        b = SCHEDULER.get(m["candidate_id"])
+        meta = b.meta if b is not None else {}
+        if meta.get("ats"):
+            # the ATS already has the old slot; the move is a new delivery with its own key
+            queued = _enqueue_ats(m["candidate_id"], meta["ats"]["job_id"], m["to"],
+                                  prefer_connector=meta["ats"]["prefer_connector"], key=f"move:{uuid.uuid4()}")
+            m["ats"] = {"status": queued["status"], "key": queued["key"]}
+        audit("agent", "schedule.moved", m)
+        if meta.get("proposed"):
+            # supersedes the proposal the candidate was given
+            audit("agent", "schedule.proposed", _booking_payload(b))
+    return {"ok": True, **out}
 
 class SendMessage(BaseModel):
     to: str
@@ -544,7 +1106,7 @@ class SendMessage(BaseModel):
     channel: str = "sms"
 
 @app.post("/send")
-def send(body: SendMessage) -> dict:
+async def send(body: SendMessage) -> dict:
     checks = []
     ok = True
     if POLICY.get("allowed_channels") and body.channel not in POLICY.get("allowed_channels"):
@@ -554,17 +1116,70 @@ def send(body: SendMessage) -> dict:
         checks.append({"rule": "allowed_channels", "ok": True})
     payload = {**body.model_dump(), "compliance": {"ok": ok, "checks": checks}}
     audit("agent", "message.sent", payload)
-    # optional forward to channel connector in real mode
-    if CHANNEL_CONNECTOR_BASE:
+    # optional forward to channel connector in real mode, over the shared pool
+    if CHANNELS.base:
         try:
-            with httpx.Client(timeout=5.0) as client:
-                client.post(f"{CHANNEL_CONNECTOR_BASE}/send", json=body.model_dump())
+            res = await CHANNELS.send(body.model_dump())
+            return {"ok": True, "provider": res.get("provider"), "provider_id": res.get("id")}
         except Exception as e:
-            audit("agent", "channel.forward.error", {"error": str(e)})
+            audit("agent", "channel.forward.error", {"error": str(e) or e.__class__.__name__})
     return {"ok": True}
 
+def _observed_rates(window_s: Optional[float], job_id: Optional[str] = None) -> dict:
+    # conversion rates measured from the audit log; None where there is no data yet
+    t = ANALYTICS.funnel(window_s=window_s, job_id=job_id)["totals"]
+    att = ANALYTICS.action_counts(["interview.attended", "interview.no_show"], window_s=window_s, job_id=job_id)
+    shows = att["interview.attended"] + att["interview.no_show"]
+    return {
+        "reply_rate": t["replied"] / t["contacted"] if t["contacted"] else None,
+        "qual_rate": t["qualified"] / t["replied"] if t["replied"] else None,
+        "show_rate": att["interview.attended"] / shows if shows else None,
+    }
+
+SIM_MODES = ("point", "monte_carlo", "sweep")
+SIM_MAX_TRIALS = int(os.getenv("SIM_MAX_TRIALS", "1000000"))
+SIM_MAX_SCENARIOS = int(os.getenv("SIM_MAX_SCENARIOS", "100"))
+
+@app.on_event("shutdown")
+def _close_sim_pool() -> None:
+    shutdown_sim_pool()
+
 @app.post("/simulate/hiring")
-def hiring_sim(vol_per_day: int = 500, reply_rate: float = 0.35, qual_rate: float = 0.25, show_rate: float = 0.7, interviewer_capacity: int = 50, target_openings: int = 50) -> dict:
+def hiring_sim(vol_per_day: int = 500, reply_rate: Optional[float] = None, qual_rate: Optional[float] = None,
+               show_rate: Optional[float] = None, interviewer_capacity: int = 50, target_openings: int = 50,
+               window: str = "30d", job_id: Optional[str] = None, mode: str = "point", trials: int = 100_000,
+               seed: Optional[int] = None, target_weeks: Optional[float] = None, horizon_weeks: int = 52,
+               vol_grid: Optional[str] = None, capacity_grid: Optional[str] = None) -> dict:
+    # rates not given are taken from the observed funnel over `window`, else the demo defaults.
+    # mode=monte_carlo adds hires/week and time-to-fill percentiles; mode=sweep runs them over
+    # vol_grid x capacity_grid (e.g. "200-1000/200") on a process pool
+    if mode not in SIM_MODES:
+        raise HTTPException(400, f"mode must be one of {', '.join(SIM_MODES)}")
+    if not 1 <= trials <= SIM_MAX_TRIALS or not 1 <= horizon_weeks <= 520:
+        raise HTTPException(400, f"trials must be 1..{SIM_MAX_TRIALS} and horizon_weeks 1..520")
+    if not 0 <= vol_per_day <= 200_000 or not 0 <= interviewer_capacity <= 200_000:
+        raise HTTPException(400, "vol_per_day and interviewer_capacity must be 0..200000")
+    try:
+        observed = _observed_rates(parse_window(window), job_id)
+        vols = parse_grid(vol_grid) or [vol_per_day]
+        caps = parse_grid(capacity_grid) or [interviewer_capacity]
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if mode == "sweep" and (len(vols) * len(caps) > SIM_MAX_SCENARIOS or max(vols + caps) > 200_000):
+        raise HTTPException(400, f"at most {SIM_MAX_SCENARIOS} scenarios, values up to 200000")
+    defaults = {"reply_rate": 0.35, "qual_rate": 0.25, "show_rate": 0.7}
+    given = {"reply_rate": reply_rate, "qual_rate": qual_rate, "show_rate": show_rate}
+    rates, sources = {}, {}
+    for k, v in given.items():
+        if v is not None:
+            rates[k], sources[k] = v, "param"
+        elif observed[k] is not None:
+            rates[k], sources[k] = observed[k], "observed"
+        else:
+            rates[k], sources[k] = defaults[k], "default"
+    reply_rate, qual_rate, show_rate = rates["reply_rate"], rates["qual_rate"], rates["show_rate"]
+    if mode != "point" and not all(0.0 <= v <= 1.0 for v in rates.values()):
+        raise HTTPException(400, "rates must be between 0 and 1")
     replies = vol_per_day * reply_rate
     qualified = replies * qual_rate
     scheduled = min(qualified, interviewer_capacity)
@@ -572,15 +1187,25 @@ def hiring_sim(vol_per_day: int = 500, reply_rate: float = 0.35, qual_rate: floa
     hires_week = floor(shows * 5 * 0.6)
     utilization = (scheduled / max(1, interviewer_capacity)) if interviewer_capacity else 0.0
     time_to_fill_weeks = None if hires_week == 0 else max(0, int((target_openings + hires_week - 1) // hires_week))
-    return {
+    out = {
         "replies": int(replies),
         "qualified": int(qualified),
         "scheduled": int(scheduled),
         "shows": int(shows),
         "hires_per_week": int(hires_week),
         "utilization": utilization,
-        "time_to_fill_weeks": time_to_fill_weeks
+        "time_to_fill_weeks": time_to_fill_weeks,
+        "rates": {k: round(v, 4) for k, v in rates.items()},
+        "rate_sources": sources,
+        "mode": mode,
     }
+    mc = {"reply_rate": reply_rate, "qual_rate": qual_rate, "show_rate": show_rate, "target_openings": target_openings,
+          "trials": trials, "seed": seed, "target_weeks": target_weeks, "horizon_weeks": horizon_weeks}
+    if mode == "monte_carlo":
+        out["monte_carlo"] = simulate_hiring(vol_per_day=vol_per_day, interviewer_capacity=interviewer_capacity, **mc)
+    elif mode == "sweep":
+        out["sweep"] = sweep_hiring(vols, caps, **mc)
+    return out
 
 class ForceOp(BaseModel):
     action: str
@@ -595,26 +1220,30 @@ def ops_force(body: ForceOp) -> dict:
     if action == "schedule_confirm":
         return schedule_confirm(cid)
     if action == "ats_resync":
-        try:
-            slot = SCHEDULE.get(cid, {}).get("slot") or f"2025-08-29T0{(hash(cid)%8)+1}:00:00Z"
-            with httpx.Client(timeout=5.0) as client:
-                if ATS_CONNECTOR_BASE:
-                    resp = client.post(f"{ATS_CONNECTOR_BASE}/application", json={
-                        "candidate_id": cid, "job_id": next(iter(JOBS.keys()), "demo-job"), "slot": slot
-                    })
-                else:
-                    resp = client.post(f"{ATS_BASE}/applications", json={
-                        "candidate_id": cid, "job_id": next(iter(JOBS.keys()), "demo-job"), "slot": slot
-                    })
-                resp.raise_for_status()
-            audit("agent", "ats.write", {"candidate_id": cid, "job_id": next(iter(JOBS.keys()), "demo-job"), "slot": slot})
-        except Exception as e:
-            audit("agent", "ats.error", {"error": str(e)})
-        return {"ok": True}
+        b = SCHEDULER.get(cid) or SCHEDULER.hold(cid, site=_site_for(cid))
+        if b is None:
+            raise HTTPException(409, "no interview capacity in the scheduling horizon")
+        slot = b.slot
+        job_id = (CANDIDATES.get(cid) or {}).get("job_id") or next(iter(JOBS.keys()), "demo-job")
+        # a forced resync is a new delivery, so it gets its own idempotency key
+        queued = _enqueue_ats(cid, job_id, slot, key=f"resync:{uuid.uuid4()}")
+        b.meta["ats"] = {"job_id": job_id, "prefer_connector": True}
+        return {"ok": True, "ats": {"status": queued["status"], "key": queued["key"]}}
     audit("system", "ops.ignored", {"action": action, "candidate_id": cid})
     return {"ok": True}
 
 
+@app.get("/analytics/funnel")
+def analytics_funnel(group_by: Optional[str] = None, window: Optional[str] = None,
+                     job_id: Optional[str] = None, locale: Optional[str] = None) -> dict:
+    # distinct candidates entering each stage, per job/locale/day; group_by=job,locale,day window=7d|24h|...
+    try:
+        dims, window_s = parse_group_by(group_by), parse_window(window)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    AUDIT_WRITER.drain()
+    return ANALYTICS.funnel(dims, window_s, job_id=job_id, locale=locale)
+
 # --- Analytics (demo) ---
 @app.get("/analytics/top-recruiters")
 def analytics_top_recruiters() -> dict:
@@ -725,7 +1354,7 @@ def _redact(text: str) -> str:
     except Exception:
         return text
 
-async def _llm_stream(messages: List[dict]):
+async def _llm_stream(messages: List[dict], stats: Optional[dict] = None):
     # Demo: if no provider configured, stream a local heuristic answer
     if not PROVIDER or not PROVIDER_API_KEY:
         # simple echo with light reasoning
@@ -734,56 +1363,41 @@ async def _llm_stream(messages: List[dict]):
         yield {"event": "token", "data": "but the backend stream is now ready to plug into a provider."}
         yield {"event": "done", "data": ""}
         return
-    # Example OpenAI Chat Completions (stream) using aiohttp
+    # OpenAI-compatible Chat Completions stream over the shared LLM client
     try:
         if PROVIDER == "openai":
-            url = "https://api.openai.com/v1/chat/completions"
-            headers = {"Authorization": f"Bearer {PROVIDER_API_KEY}", "Content-Type": "application/json"}
-            body = {
-                "model": MODEL,
-                "max_tokens": CHAT_MAX_TOKENS,
-                "stream": True,
-                "messages": messages,
-            }
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=CHAT_TIMEOUT_S)) as sess:
-                async with sess.post(url, headers=headers, json=body) as resp:
-                    resp.raise_for_status()
-                    async for line in resp.content:
-                        if not line:
-                            continue
-                        chunk = line.decode("utf-8", errors="ignore").strip()
-                        if not chunk.startswith("data:"):
-                            continue
-                        data = chunk[len("data:"):].strip()
-                        if data == "[DONE]":
-                            yield {"event": "done", "data": ""}
-                            break
-                        try:
-                            j = json.loads(data)
-                            delta = j.get("choices", [{}])[0].get("delta", {}).get("content")
-                            if delta:
-                                yield {"event": "token", "data": delta}
-                        except Exception:
-                            continue
+            async for delta in LLM.stream(messages, stats):
+                yield {"event": "token", "data": delta}
+            yield {"event": "done", "data": ""}
         else:
             # Other providers not implemented in demo
             yield {"event": "token", "data": f"Provider {PROVIDER} not implemented in demo."}
             yield {"event": "done", "data": ""}
+    except LlmBusy as e:
+        yield {"event": "error", "data": f"assistant busy, try again shortly ({e})"}
     except Exception as e:
         yield {"event": "error", "data": str(e)}
 
+def _llm_summary(st: dict) -> dict:
+    # per-request stats recorded on chat.response
+    if not st:
+        return {}
+    ms = lambda v: None if v is None else round(v * 1000, 1)
+    return {"outcome": st["outcome"], "queue_wait_ms": ms(st["queue_wait_s"]), "ttft_ms": ms(st["ttft_s"]),
+            "tokens": st["tokens"], "tokens_per_s": None if st["tokens_per_s"] is None else round(st["tokens_per_s"], 1)}
+
 @app.post("/chat/stream")
 async def chat_stream(req: ChatRequest):
     # Build system prompt with optional context
     system = "You are a helpful recruiter assistant. Be concise and accurate."
     if req.include_context:
         # summarize current runtime context (bounded for demo)
-        jobs_sample = list(JOBS.items())[:5]
-        cands_sample = list(CANDIDATES.items())[:5]
+        jobs_sample = list(islice(JOBS.items(), 5))
+        cands_sample = list(islice(CANDIDATES.items(), 5))
         ctx = {
             "jobs": [{"id": jid, **j} for jid, j in jobs_sample],
             "candidates": [{"id": cid, **c} for cid, c in cands_sample],
-            "kpi": kpi(),
+            "kpi": _kpi(),
         }
         system += "\nContext:" + json.dumps(ctx)[:2000]
 
@@ -794,7 +1408,8 @@ async def chat_stream(req: ChatRequest):
     audit("agent", "chat.request", {"session_id": req.session_id, "messages": [m.dict() for m in req.messages]})
 
     async def event_gen():
-        async for ev in _llm_stream(messages):
+        stats: dict = {}
+        async for ev in _llm_stream(messages, stats):
             if ev["event"] == "token":
                 yield {"event": "chat", "data": ev["data"]}
             elif ev["event"] == "error":
@@ -802,7 +1417,7 @@ async def chat_stream(req: ChatRequest):
             elif ev["event"] == "done":
                 yield {"event": "done", "data": ""}
                 break
-        audit("agent", "chat.response", {"session_id": req.session_id})
+        audit("agent", "chat.response", {"session_id": req.session_id, **_llm_summary(stats)})
 
     return EventSourceResponse(event_gen())
 
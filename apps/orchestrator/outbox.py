@@ -0,0 +1,253 @@
+import asyncio, hashlib, json, logging, os, random, sqlite3, threading, time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+# ---- durable outbox for external writes ----
+# enqueue() persists the write (SQLite) and returns immediately. A dedicated
+# thread runs an event loop with a pool of workers that deliver items with
+# exponential backoff. Items sharing a partition key (the candidate) are
+# delivered strictly in enqueue order; each carries a stable idempotency key.
+# Finished rows (done / dead) are kept for retention_s so a repeat of the same
+# key is answered as a duplicate, then pruned. Callers that repeat a write on
+# purpose pass a key that includes a version (e.g. the booking id).
+
+PENDING, DONE, DEAD = "pending", "done", "dead"
+
+
+def idempotency_key(kind: str, payload: dict) -> str:
+    body = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(f"{kind}:{body}".encode()).hexdigest()[:32]
+
+
+class Outbox:
+    def __init__(self, send: Callable[[dict], Awaitable[dict]], path: str = ":memory:", workers: int = 16,
+                 max_attempts: int = 8, base_backoff_s: float = 0.5, max_backoff_s: float = 60.0,
+                 retention_s: float = 3600.0):
+        self.send = send
+        self.path = path
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.base_backoff_s = base_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.retention_s = retention_s
+        self.on_success: Optional[Callable[[dict, dict], None]] = None
+        self.on_retry: Optional[Callable[[dict, str, float], None]] = None
+        self.on_dead: Optional[Callable[[dict, str], None]] = None  # outcomes are counted by these hooks
+        self.on_close: Optional[Callable[[], Awaitable[None]]] = None  # run on the outbox loop once workers stop
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+        CREATE TABLE IF NOT EXISTS outbox(
+          seq INTEGER PRIMARY KEY AUTOINCREMENT,
+          key TEXT UNIQUE,
+          kind TEXT,
+          partition_key TEXT,
+          payload_json TEXT,
+          status TEXT,
+          attempts INTEGER DEFAULT 0,
+          last_error TEXT,
+          created_at REAL,
+          updated_at REAL
+        )""")
+        self._lock = threading.Lock()
+        # partition -> queued items (oldest first); a partition is in flight at most once
+        self._partitions: Dict[str, Deque[dict]] = {}
+        self._active: set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._recover()
+
+    # -- persistence --
+    def _recover(self) -> None:
+        rows = self._db.execute(
+            "SELECT seq,key,kind,partition_key,payload_json,attempts,created_at FROM outbox WHERE status=? ORDER BY seq",
+            (PENDING,)).fetchall()
+        for seq, key, kind, part, payload_json, attempts, created_at in rows:
+            item = {"seq": seq, "key": key, "kind": kind, "partition_key": part, "payload": json.loads(payload_json),
+                    "attempts": attempts, "created_at": created_at}
+            self._partitions.setdefault(part, deque()).append(item)
+
+    def _mark(self, item: dict, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._db.execute("UPDATE outbox SET status=?, attempts=?, last_error=?, updated_at=? WHERE seq=?",
+                             (status, item["attempts"], error, time.time(), item["seq"]))
+
+    def prune(self, now: Optional[float] = None) -> int:
+        # drop done / dead rows finished more than retention_s ago; their keys can be enqueued afresh
+        cutoff = (time.time() if now is None else now) - self.retention_s
+        with self._lock:
+            return self._db.execute("DELETE FROM outbox WHERE status IN (?,?) AND updated_at<?",
+                                    (DONE, DEAD, cutoff)).rowcount
+
+    # -- producer side (any thread) --
+    def enqueue(self, kind: str, partition_key: str, payload: dict, key: Optional[str] = None) -> dict:
+        key = key or idempotency_key(kind, payload)
+        now = time.time()
+        with self._lock:
+            existing = self._db.execute("SELECT seq,status FROM outbox WHERE key=?", (key,)).fetchone()
+            if existing and existing[1] != DEAD:
+                return {"seq": existing[0], "key": key, "status": existing[1], "duplicate": True}
+            if existing:
+                # gave up earlier: the same write asked for again is delivered again, attempts start over
+                seq = existing[0]
+                self._db.execute(
+                    "UPDATE outbox SET kind=?, partition_key=?, payload_json=?, status=?, attempts=0, last_error=NULL, "
+                    "created_at=?, updated_at=? WHERE seq=?",
+                    (kind, partition_key, json.dumps(payload), PENDING, now, now, seq))
+            else:
+                seq = self._db.execute(
+                    "INSERT INTO outbox(key,kind,partition_key,payload_json,status,created_at,updated_at) VALUES (?,?,?,?,?,?,?)",
+                    (key, kind, partition_key, json.dumps(payload), PENDING, now, now)).lastrowid
+            item = {"seq": seq, "key": key, "kind": kind, "partition_key": partition_key,
+                    "payload": payload, "attempts": 0, "created_at": now}
+            q = self._partitions.setdefault(partition_key, deque())
+            q.append(item)
+            schedule = len(q) == 1 and partition_key not in self._active
+        self._ensure_started()
+        if schedule:
+            self._loop.call_soon_threadsafe(self._ready.put_nowait, partition_key)
+        return {"seq": item["seq"], "key": key, "status": PENDING, "duplicate": False}
+
+    # -- metrics --
+    @property
+    def depth(self) -> int:
+        with self._lock:
+            return sum(len(q) for q in self._partitions.values())
+
+    @property
+    def lag_seconds(self) -> float:
+        # age of the oldest undelivered item
+        with self._lock:
+            heads = [q[0]["created_at"] for q in self._partitions.values() if q]
+        return max(0.0, time.time() - min(heads)) if heads else 0.0
+
+    # -- consumer side (outbox thread) --
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="ats-outbox", daemon=True)
+            self._thread.start()
+        self._started.wait()
+
+    def start(self) -> None:
+        self._ensure_started()
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._ready = asyncio.Queue()
+        with self._lock:
+            for part, q in self._partitions.items():
+                if q:
+                    self._ready.put_nowait(part)
+        workers = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        interval = max(1.0, min(60.0, self.retention_s))
+
+        def prune_tick() -> None:
+            try:
+                self.prune()
+            except Exception as e:
+                logging.error(json.dumps({"type": "outbox_prune_error", "error": str(e)}))
+            loop.call_later(interval, prune_tick)
+
+        loop.call_later(interval, prune_tick)
+        self._started.set()
+        try:
+            loop.run_forever()
+        finally:
+            for w in workers:
+                w.cancel()
+            loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+            if self.on_close:
+                # per-loop clients (pooled connections) opened by send() are closed on their own loop
+                try:
+                    loop.run_until_complete(self.on_close())
+                except Exception as e:
+                    logging.error(json.dumps({"type": "outbox_close_error", "error": str(e)}))
+            loop.close()
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff_s, self.base_backoff_s * (2 ** (attempts - 1)))
+        return delay * (0.5 + random.random() / 2)  # jitter
+
+    def _requeue(self, part: str) -> None:
+        with self._lock:
+            self._active.discard(part)
+            pending = bool(self._partitions.get(part))
+        if pending:
+            self._ready.put_nowait(part)
+
+    async def _worker(self) -> None:
+        while True:
+            part = await self._ready.get()
+            with self._lock:
+                q = self._partitions.get(part)
+                if not q or part in self._active:
+                    continue
+                self._active.add(part)
+                item = q[0]
+            item["attempts"] += 1
+            try:
+                result = await self.send(item)
+            except Exception as e:
+                err = str(e) or e.__class__.__name__
+                if item["attempts"] >= self.max_attempts:
+                    self._mark(item, DEAD, err)
+                    self._pop(part)
+                    self._notify(self.on_dead, item, err)
+                    self._requeue(part)
+                else:
+                    delay = self._backoff(item["attempts"])
+                    self._mark(item, PENDING, err)
+                    self._notify(self.on_retry, item, err, delay)
+                    # the partition stays blocked on its head item until the retry
+                    asyncio.get_running_loop().call_later(delay, self._requeue, part)
+                continue
+            self._mark(item, DONE)
+            self._pop(part)
+            self._notify(self.on_success, item, result)
+            self._requeue(part)
+
+    def _pop(self, part: str) -> None:
+        with self._lock:
+            q = self._partitions.get(part)
+            if q:
+                q.popleft()
+            if q is not None and not q:
+                del self._partitions[part]
+
+    @staticmethod
+    def _notify(fn, *args) -> None:
+        if fn is None:
+            return
+        try:
+            fn(*args)
+        except Exception as e:
+            logging.error(json.dumps({"type": "outbox_callback_error", "error": str(e)}))
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        # wait until nothing is queued or in flight (tests, shutdown)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                idle = not self._partitions and not self._active
+            if idle:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def close(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5.0)
+        with self._lock:
+            self._db.close()
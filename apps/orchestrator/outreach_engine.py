@@ -0,0 +1,328 @@
+import asyncio, heapq, json, logging, threading, time, uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# ---- rate-limited campaign outreach ----
+# Campaigns run on a dedicated event-loop thread. Each campaign fans out to a
+# pool of async workers; every message first takes a token from its channel's
+# bucket and from its provider's bucket, so configured send rates hold no
+# matter how many campaigns run at once. An optional window(campaign, id)
+# hook defers a target to a later wall-clock time (send-window plans);
+# deferred targets wait on a per-campaign heap. An optional eligible(campaign,
+# id) hook skips targets before they take any tokens.
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        # single event loop: no lock needed between the check and the decrement
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+    def refund(self, n: int = 1) -> None:
+        # tokens taken for messages that were not sent after all
+        self.tokens = min(self.capacity, self.tokens + n)
+
+
+RUNNING, PAUSED, DONE, CANCELLED = "running", "paused", "done", "cancelled"
+
+
+class Campaign:
+    def __init__(self, job_id: str, channel: str, provider: str, targets: List[str], template: str,
+                 meta: Optional[dict] = None):
+        self.id = str(uuid.uuid4())
+        self.job_id = job_id
+        self.channel = channel
+        self.provider = provider
+        self.targets = targets
+        self.template = template
+        self.meta = meta or {}
+        self.state = RUNNING
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._next = 0
+        self._deferred: List[Tuple[float, str]] = []  # (send at, candidate id) heap
+        self._active_s = 0.0  # time spent running, excluding pauses
+        self._resumed_at = time.monotonic()
+        self._gate: Optional[asyncio.Event] = None  # set while running
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed + self.skipped
+
+    def _elapsed(self) -> float:
+        return self._active_s + (time.monotonic() - self._resumed_at if self.state == RUNNING else 0.0)
+
+    def to_dict(self) -> dict:
+        total = len(self.targets)
+        elapsed = self._elapsed()
+        return {
+            "campaign_id": self.id, "job_id": self.job_id, "channel": self.channel, "provider": self.provider,
+            "state": self.state, "total": total, "sent": self.sent, "failed": self.failed, "skipped": self.skipped,
+            "deferred": len(self._deferred),
+            "progress": round(self.done / total, 4) if total else 1.0,
+            "throughput_per_s": round(self.done / elapsed, 1) if elapsed > 0 else 0.0,
+            "elapsed_s": round(elapsed, 3),
+        }
+
+
+class OutreachEngine:
+    def __init__(self, send: Callable[[Campaign, List[str]], Awaitable[list]],
+                 channel_rates: Optional[Dict[str, float]] = None, provider_rates: Optional[Dict[str, float]] = None,
+                 concurrency: int = 64, batch_size: int = 1, keep_campaigns: int = 100):
+        # send(campaign, candidate_ids) -> one entry per id: a result dict, None to skip the
+        # candidate, or an exception for a failed send (raising fails the whole batch)
+        self.send = send
+        self.batch_size = max(1, batch_size)
+        self.channel_rates = channel_rates or {}
+        self.provider_rates = provider_rates or {}
+        self.concurrency = max(1, concurrency)
+        self.keep_campaigns = keep_campaigns
+        self.campaigns: Dict[str, Campaign] = {}
+        self._campaigns_lock = threading.Lock()
+        self.on_sent: Optional[Callable[[Campaign, List[tuple]], None]] = None  # [(candidate_id, result)] per batch
+        self.on_failed: Optional[Callable[[Campaign, str, str], None]] = None
+        self.on_close: Optional[Callable[[], Awaitable[None]]] = None
+        self.window: Optional[Callable[[Campaign, str], float]] = None  # earliest wall time a target may be sent
+        self.eligible: Optional[Callable[[Campaign, str], bool]] = None  # False skips the target without a token
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._tasks: Dict[str, List[asyncio.Task]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+
+    # -- loop thread --
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="outreach-engine", daemon=True)
+                self._thread.start()
+        self._started.wait()
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._started.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def _call(self, fn, *args) -> None:
+        self._ensure_started()
+        self._loop.call_soon_threadsafe(fn, *args)
+
+    def _bucket(self, kind: str, name: str, rates: Dict[str, float]) -> Optional[TokenBucket]:
+        rate = rates.get(name) or rates.get("*")
+        if not rate:
+            return None
+        key = f"{kind}:{name}"
+        b = self._buckets.get(key)
+        if b is None:
+            b = self._buckets[key] = TokenBucket(rate)
+        return b
+
+    # -- control (any thread) --
+    def start(self, job_id: str, channel: str, provider: str, targets: List[str], template: str,
+              meta: Optional[dict] = None) -> Campaign:
+        c = Campaign(job_id, channel, provider, targets, template, meta)
+        with self._campaigns_lock:
+            self.campaigns[c.id] = c
+            self._evict()
+        self._call(self._launch, c)
+        return c
+
+    def _evict(self) -> None:
+        # oldest finished campaigns beyond keep_campaigns; running and paused ones stay pollable
+        over = len(self.campaigns) - self.keep_campaigns
+        if over > 0:
+            for cid in [c.id for c in self.campaigns.values() if c.finished_at is not None][:over]:
+                del self.campaigns[cid]
+
+    def list_campaigns(self) -> List[Campaign]:
+        with self._campaigns_lock:
+            return list(self.campaigns.values())
+
+    def pause(self, campaign_id: str) -> Optional[Campaign]:
+        c = self.campaigns.get(campaign_id)
+        if c is not None and c.state == RUNNING:
+            c._active_s += time.monotonic() - c._resumed_at
+            c.state = PAUSED
+            self._call(self._sync_gate, c)
+        return c
+
+    def resume(self, campaign_id: str) -> Optional[Campaign]:
+        c = self.campaigns.get(campaign_id)
+        if c is not None and c.state == PAUSED:
+            c._resumed_at = time.monotonic()
+            c.state = RUNNING
+            self._call(self._sync_gate, c)
+        return c
+
+    def get(self, campaign_id: str) -> Optional[Campaign]:
+        return self.campaigns.get(campaign_id)
+
+    # -- campaign execution (loop thread) --
+    @staticmethod
+    def _sync_gate(c: Campaign) -> None:
+        if c._gate is None:
+            return
+        if c.state == RUNNING:
+            c._gate.set()
+        else:
+            c._gate.clear()
+
+    def _launch(self, c: Campaign) -> None:
+        c._gate = asyncio.Event()
+        self._sync_gate(c)
+        n = min(self.concurrency, max(1, len(c.targets)))
+        tasks = [self._loop.create_task(self._worker(c)) for _ in range(n)]
+        self._tasks[c.id] = tasks
+        self._loop.create_task(self._finish(c, tasks))
+
+    async def _worker(self, c: Campaign) -> None:
+        channel_bucket = self._bucket("channel", c.channel, self.channel_rates)
+        provider_bucket = self._bucket("provider", c.provider, self.provider_rates)
+        while True:
+            await c._gate.wait()
+            taken = self._take(c)
+            if not taken:
+                if not c._deferred:
+                    return
+                # nothing due yet; wake at least once a second so pause/close stay responsive
+                await asyncio.sleep(min(max(0.0, c._deferred[0][0] - time.time()), 1.0))
+                continue
+            cids = self._eligible(c, taken)
+            c.skipped += len(taken) - len(cids)
+            if not cids:
+                continue
+            for _ in cids:  # one token per message, whatever the batch size
+                if channel_bucket:
+                    await channel_bucket.acquire()
+                if provider_bucket:
+                    await provider_bucket.acquire()
+            try:
+                results = await self.send(c, cids)
+            except Exception as e:
+                results = [e] * len(cids)
+            delivered, skipped = [], 0
+            for cid, res in zip(cids, results):
+                if isinstance(res, BaseException):
+                    c.failed += 1
+                    self._notify(self.on_failed, c, cid, str(res) or res.__class__.__name__)
+                elif res is None:
+                    skipped += 1
+                else:
+                    c.sent += 1
+                    delivered.append((cid, res))
+            if skipped:
+                # became ineligible between the check and the send: nothing went out, give the tokens back
+                c.skipped += skipped
+                for bucket in (channel_bucket, provider_bucket):
+                    if bucket:
+                        bucket.refund(skipped)
+            if delivered:
+                self._notify(self.on_sent, c, delivered)
+
+    def _eligible(self, c: Campaign, cids: List[str]) -> List[str]:
+        if self.eligible is None:
+            return cids
+        try:
+            return [cid for cid in cids if self.eligible(c, cid)]
+        except Exception as e:
+            logging.error(json.dumps({"type": "outreach_eligible_error", "error": str(e)}))
+            return cids  # send() makes the final call
+
+    def _take(self, c: Campaign) -> List[str]:
+        # next batch: deferred targets that are due first, then new targets; targets the
+        # window hook pushes later go on the deferred heap
+        if self.window is None:
+            cids = c.targets[c._next:c._next + self.batch_size]
+            c._next += len(cids)
+            return cids
+        now = time.time()
+        cids = []
+        while c._deferred and c._deferred[0][0] <= now and len(cids) < self.batch_size:
+            cids.append(heapq.heappop(c._deferred)[1])
+        while len(cids) < self.batch_size and c._next < len(c.targets):
+            cid = c.targets[c._next]
+            c._next += 1
+            try:
+                due = self.window(c, cid)
+            except Exception as e:
+                logging.error(json.dumps({"type": "outreach_window_error", "error": str(e)}))
+                due = now
+            if due > now:
+                heapq.heappush(c._deferred, (due, cid))
+            else:
+                cids.append(cid)
+        return cids
+
+    async def _finish(self, c: Campaign, tasks: List[asyncio.Task]) -> None:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.pop(c.id, None)
+        if c.state == RUNNING:
+            c._active_s += time.monotonic() - c._resumed_at
+            c.state = DONE
+        c.finished_at = time.time()
+        with self._campaigns_lock:
+            self._evict()  # campaigns kept while running may have gone over keep_campaigns
+
+    @staticmethod
+    def _notify(fn, *args) -> None:
+        if fn is None:
+            return
+        try:
+            fn(*args)
+        except Exception as e:
+            logging.error(json.dumps({"type": "outreach_callback_error", "error": str(e)}))
+
+    @property
+    def active(self) -> int:
+        return sum(1 for c in self.list_campaigns() if c.state in (RUNNING, PAUSED))
+
+    def wait(self, campaign_id: str, timeout: float = 10.0) -> bool:
+        # block until the campaign finishes (tests, scripts)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            c = self.campaigns.get(campaign_id)
+            if c is None or c.finished_at is not None:
+                return True
+            time.sleep(0.01)
+        return False
+
+    async def _shutdown(self) -> None:
+        for c in self.list_campaigns():
+            if c.state in (RUNNING, PAUSED):
+                c.state = CANCELLED
+        pending = [t for tasks in list(self._tasks.values()) for t in tasks]
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)  # no send still using a client on_close closes
+        if self.on_close:
+            await self.on_close()
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+        except Exception as e:
+            logging.error(json.dumps({"type": "outreach_shutdown_error", "error": str(e)}))
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
@@ -0,0 +1,156 @@
+import json, logging, threading, time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+# ---- write-behind row persistence ----
+# Request handlers enqueue rows; a flusher thread writes them as multi-row
+# INSERTs (one transaction per flush) when max_batch rows are queued or
+# flush_interval_s has passed, whichever comes first.
+
+class WriteBehind:
+    def __init__(self, engine, max_batch: int = 500, flush_interval_s: float = 0.05,
+                 on_flush: Optional[Callable[[int, float], None]] = None):
+        self.engine = engine
+        self.max_batch = max(1, max_batch)
+        self.flush_interval_s = max(0.001, flush_interval_s)
+        self.on_flush = on_flush
+        self._cond = threading.Condition()
+        self._rows: List[Tuple[str, dict]] = []
+        self._queued = 0
+        self._written = 0  # rows handled (written or failed)
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._flush_waiters = 0
+        self.failed_rows = 0
+
+    def insert(self, table: str, row: dict) -> None:
+        self.insert_many(table, [row])
+
+    def insert_many(self, table: str, rows: List[dict]) -> None:
+        if not rows:
+            return
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind persister is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+                self._thread.start()
+            self._rows.extend((table, row) for row in rows)
+            self._queued += len(rows)
+            if len(self._rows) >= self.max_batch:
+                self._cond.notify_all()
+
+    @property
+    def depth(self) -> int:
+        return self._queued - self._written
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        # wait until everything queued before this call has been written
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._queued
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                while self._written < target:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flush_waiters -= 1
+        return True
+
+    def _take(self) -> List[Tuple[str, dict]]:
+        with self._cond:
+            while not self._rows and not self._closed:
+                self._cond.wait()
+            # rows are queued: linger up to the interval for a fuller batch,
+            # unless a flush()/close() caller is waiting
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(self._rows) < self.max_batch and not self._closed and not self._flush_waiters:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._rows[:self.max_batch]
+            del self._rows[:len(batch)]
+            return batch
+
+    def _write(self, batch: List[Tuple[str, dict]]) -> None:
+        groups: Dict[Tuple[str, Tuple[str, ...]], List[dict]] = defaultdict(list)
+        for table, row in batch:
+            groups[(table, tuple(row.keys()))].append(row)
+        start = time.perf_counter()
+        try:
+            with self.engine.begin() as conn:
+                for (table, cols), rows in groups.items():
+                    step = max(1, _MAX_PARAMS // len(cols))
+                    for i in range(0, len(rows), step):
+                        chunk = rows[i:i + step]
+                        params = {f"{c}_{n}": r[c] for n, r in enumerate(chunk) for c in cols}
+                        conn.execute(_multi_insert_sql(table, cols, len(chunk)), params)
+        except Exception as e:  # not only driver errors: bad row data can raise TypeError/ValueError too
+            logging.error(json.dumps({"type": "db_error", "error": str(e) or e.__class__.__name__, "rows": len(batch),
+                                      "mode": "batch"}))
+            self._write_rowwise(groups)
+        if self.on_flush:
+            self.on_flush(len(batch), time.perf_counter() - start)
+
+    def _write_rowwise(self, groups) -> None:
+        # isolate bad rows (e.g. duplicate keys) so the rest of the batch still lands
+        for (table, cols), rows in groups.items():
+            sql = _insert_sql(table, cols)
+            for row in rows:
+                try:
+                    with self.engine.begin() as conn:
+                        conn.execute(sql, row)
+                except Exception as e:
+                    self.failed_rows += 1
+                    logging.error(json.dumps({"type": "db_error", "error": str(e) or e.__class__.__name__, "table": table}))
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take()
+            if not batch:
+                with self._cond:
+                    if self._closed and not self._rows:
+                        self._cond.notify_all()
+                        return
+                continue
+            try:
+                self._write(batch)
+            except Exception as e:
+                # whatever fails, the flusher thread must outlive it or rows pile up unwritten
+                logging.error(json.dumps({"type": "db_flush_error", "error": str(e) or e.__class__.__name__,
+                                          "rows": len(batch)}))
+            finally:
+                with self._cond:
+                    self._written += len(batch)
+                    self._cond.notify_all()
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+# keep each statement under SQLite's default bound-parameter limit
+_MAX_PARAMS = 900
+_SQL_CACHE: Dict[Tuple[str, Tuple[str, ...], int], object] = {}
+
+def _multi_insert_sql(table: str, cols: Tuple[str, ...], n: int):
+    # one round trip: INSERT INTO t(a,b) VALUES (:a_0,:b_0),(:a_1,:b_1),...
+    key = (table, cols, n)
+    sql = _SQL_CACHE.get(key)
+    if sql is None:
+        values = ",".join("(" + ",".join(f":{c}_{i}" for c in cols) + ")" for i in range(n))
+        sql = _SQL_CACHE[key] = text(f"INSERT INTO {table}({','.join(cols)}) VALUES {values}")
+    return sql
+
+def _insert_sql(table: str, cols: Tuple[str, ...]):
+    return text(f"INSERT INTO {table}({','.join(cols)}) VALUES ({','.join(':' + c for c in cols)})")
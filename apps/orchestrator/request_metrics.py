@@ -0,0 +1,73 @@
+import time, uuid
+from typing import Callable, Iterable, Optional
+
+from starlette.routing import Match
+
+# ---- pure-ASGI request instrumentation ----
+# One middleware in place of the @app.middleware("http") pair: no
+# BaseHTTPMiddleware task and body-stream wrapping, so streaming responses
+# (SSE) pass straight through. Requests are labelled by route template
+# ("/schedule/{cid}"), never the raw path, so label cardinality is bounded by
+# the route table.
+
+UNMATCHED = "<unmatched>"
+SECURITY_HEADERS = ((b"x-content-type-options", b"nosniff"), (b"x-frame-options", b"DENY"),
+                    (b"referrer-policy", b"no-referrer"))
+_SET = {b"x-request-id"} | {k for k, _ in SECURITY_HEADERS}
+
+
+def route_template(scope: dict, routes: Iterable) -> str:
+    # FastAPI routes put themselves in the scope when matched; plain Starlette routes
+    # (e.g. /openapi.json) are matched again against the route table
+    path = getattr(scope.get("route"), "path", None)
+    if path:
+        return path
+    for r in routes:
+        match, _ = r.matches(scope)
+        if match == Match.FULL:
+            return getattr(r, "path", None) or UNMATCHED
+    return UNMATCHED
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app, routes: Iterable = (), on_request: Optional[Callable[[dict], None]] = None):
+        self.app = app
+        self.routes = routes  # the app's live route list
+        self.on_request = on_request
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        req_id = next((v for k, v in scope.get("headers") or () if k == b"x-request-id"), None) \
+            or str(uuid.uuid4()).encode()
+        state = {"status": 500, "headers_at": None, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = [(k, v) for k, v in message.get("headers") or () if k.lower() not in _SET]
+                headers.append((b"x-request-id", req_id))
+                headers.extend(SECURITY_HEADERS)
+                message = {**message, "headers": headers}
+                state["status"] = message["status"]
+                state["headers_at"] = time.perf_counter()
+                state["streaming"] = any(k.lower() == b"content-type" and v.startswith(b"text/event-stream")
+                                         for k, v in headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if self.on_request:
+                # event streams are timed to their first byte; their lifetime is not latency
+                end = state["headers_at"] if state["streaming"] else time.perf_counter()
+                self.on_request({
+                    "request_id": req_id.decode("latin-1"),
+                    "method": scope["method"],
+                    "route": route_template(scope, self.routes),
+                    "path": scope["path"],
+                    "status": state["status"],
+                    "duration_s": end - start,
+                    "streaming": state["streaming"],
+                })
@@ -0,0 +1,397 @@
+import bisect, heapq, threading, time, uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# ---- interview slot allocator ----
+# Interviewers work weekly hours at a site; the site has a number of rooms.
+# Time is a grid of fixed-length slots. Each slot keeps its rooms left and a
+# heap of interviewers with a free seat; each site keeps a min-heap of slot
+# starts that may still have a seat (stale entries are dropped when they reach
+# the top). Hold / confirm / release are O(log n) under one lock, so two
+# requests can never take the same seat. Holds expire unless confirmed.
+
+HELD, CONFIRMED, RELEASED = "held", "confirmed", "released"
+DAY_NAMES = ("Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat")
+DAY_S = 86400
+
+
+def parse_days(spec: str) -> Tuple[int, ...]:
+    # "Sun,Mon,Tue" -> (0, 1, 2); Sunday = 0
+    out = []
+    for d in spec.split(","):
+        d = d.strip()[:3].title()
+        if d:
+            if d not in DAY_NAMES:
+                raise ValueError(f"unknown weekday: {d}")
+            out.append(DAY_NAMES.index(d))
+    return tuple(sorted(set(out)))
+
+
+def parse_hours(spec: str) -> Tuple[float, float]:
+    # "9-17" or "08:30-16:00" -> (9.0, 17.0) / (8.5, 16.0)
+    def h(s: str) -> float:
+        hh, _, mm = s.strip().partition(":")
+        return int(hh) + (int(mm) / 60.0 if mm else 0.0)
+    a, b = spec.split("-", 1)
+    return h(a), h(b)
+
+
+class Booking:
+    __slots__ = ("id", "candidate_id", "site", "interviewer", "start", "status", "expires_at", "meta")
+
+    def __init__(self, candidate_id: str, site: str, interviewer: str, start: int, expires_at: float,
+                 meta: Optional[dict] = None):
+        self.id = str(uuid.uuid4())
+        self.candidate_id = candidate_id
+        self.site = site
+        self.interviewer = interviewer
+        self.start = start
+        self.status = HELD
+        self.expires_at = expires_at
+        self.meta = meta or {}
+
+    @property
+    def slot(self) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.start))
+
+    def to_dict(self) -> dict:
+        return {"booking_id": self.id, "candidate_id": self.candidate_id, "slot": self.slot, "site": self.site,
+                "interviewer": self.interviewer, "status": self.status,
+                "expires_at": self.expires_at if self.status == HELD else None}
+
+
+class _Slot:
+    __slots__ = ("rooms", "free", "seats", "queued")
+
+    def __init__(self, rooms: int):
+        self.rooms = rooms           # rooms left at this start
+        self.free: List[str] = []    # heap of interviewer ids with a free seat (one entry per seat)
+        self.seats = 0               # interviewer seats in total
+        self.queued = False          # start is in the site heap
+
+    @property
+    def available(self) -> bool:
+        return self.rooms > 0 and bool(self.free)
+
+
+class _Interviewer:
+    __slots__ = ("id", "site", "days", "start_min", "end_min", "capacity")
+
+    def __init__(self, iid: str, site: str, days: Tuple[int, ...], hours: Tuple[float, float], capacity: int):
+        self.id, self.site, self.days, self.capacity = iid, site, days, capacity
+        self.start_min, self.end_min = int(hours[0] * 60), int(hours[1] * 60)
+
+
+class _Site:
+    def __init__(self, name: str, rooms: int):
+        self.name = name
+        self.rooms = rooms
+        self.interviewers: Dict[str, _Interviewer] = {}
+        self.slots: Dict[int, _Slot] = {}
+        self.starts: List[int] = []  # sorted slot starts, for searches after a given time
+        self.heap: List[int] = []
+
+
+class SlotAllocator:
+    def __init__(self, slot_min: int = 30, horizon_days: int = 14, hold_ttl_s: float = 86400.0, lead_min: int = 60,
+                 utc_offset_min: int = 0, clock: Callable[[], float] = time.time):
+        self.slot_s = slot_min * 60
+        self.horizon_days = horizon_days
+        self.hold_ttl_s = hold_ttl_s
+        self.lead_s = lead_min * 60
+        self.offset_s = utc_offset_min * 60  # working hours and days are local to this offset
+        self.clock = clock
+        self.on_expire: Optional[Callable[[Booking], None]] = None
+        self._sites: Dict[str, _Site] = {}
+        self._bookings: Dict[str, Booking] = {}  # candidate -> current booking
+        self._expiry: List[Tuple[float, str, str]] = []  # (expires_at, candidate, booking id)
+        self._day_counts: Dict[Tuple[str, int], List[int]] = {}  # (site, local day) -> [seats, held, confirmed]
+        self._days_built = -1  # last local day materialized
+        self._today = -1
+        self._lock = threading.Lock()
+
+    # -- calendar --
+    def _day(self, ts: float) -> int:
+        return int(ts + self.offset_s) // DAY_S
+
+    def add_site(self, name: str, rooms: int) -> None:
+        with self._lock:
+            if name in self._sites:
+                self._sites[name].rooms = rooms
+            else:
+                self._sites[name] = _Site(name, rooms)
+
+    def add_interviewer(self, iid: str, site: str, days: Iterable[int] = (0, 1, 2, 3, 4),
+                        hours: Tuple[float, float] = (9, 17), capacity: int = 1) -> None:
+        with self._lock:
+            s = self._sites[site]
+            iv = s.interviewers[iid] = _Interviewer(iid, site, tuple(days), hours, capacity)
+            if self._days_built >= 0:
+                for day in range(max(self._today, 0), self._days_built + 1):
+                    self._build(s, iv, day)
+
+    def _build(self, s: _Site, iv: _Interviewer, day: int) -> None:
+        # add an interviewer's seats for one local day
+        if (day + 4) % 7 not in iv.days:  # 1970-01-01 was a Thursday
+            return
+        counts = self._day_counts.setdefault((s.name, day), [0, 0, 0])
+        base = day * DAY_S - self.offset_s
+        for m in range(iv.start_min, iv.end_min - self.slot_s // 60 + 1, self.slot_s // 60):
+            t = base + m * 60
+            slot = s.slots.get(t)
+            if slot is None:
+                slot = s.slots[t] = _Slot(s.rooms)
+                if not s.starts or t > s.starts[-1]:
+                    s.starts.append(t)
+                else:
+                    bisect.insort(s.starts, t)
+            for _ in range(iv.capacity):
+                heapq.heappush(slot.free, iv.id)
+            before = min(s.rooms, slot.seats)
+            slot.seats += iv.capacity
+            counts[0] += min(s.rooms, slot.seats) - before
+            if not slot.queued:
+                heapq.heappush(s.heap, t)
+                slot.queued = True
+
+    def _roll(self, now: float) -> None:
+        # materialize new days up to the horizon and forget days that have passed
+        today = self._day(now)
+        if today == self._today:
+            return
+        last = today + self.horizon_days - 1
+        for day in range(max(today, self._days_built + 1), last + 1):
+            for s in self._sites.values():
+                for iv in s.interviewers.values():
+                    self._build(s, iv, day)
+        self._days_built = max(self._days_built, last)
+        cutoff = today * DAY_S - self.offset_s
+        for s in self._sites.values():
+            i = bisect.bisect_left(s.starts, cutoff)
+            for t in s.starts[:i]:
+                del s.slots[t]
+            del s.starts[:i]
+        for key in [k for k in self._day_counts if k[1] < today]:
+            del self._day_counts[key]
+        self._today = today
+
+    def _expire(self, now: float) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            _, cid, bid = heapq.heappop(self._expiry)
+            b = self._bookings.get(cid)
+            if b is not None and b.id == bid and b.status == HELD:
+                self._free(b)
+                b.status = RELEASED
+                del self._bookings[cid]
+                if self.on_expire:
+                    self.on_expire(b)
+
+    def _tick(self) -> float:
+        now = self.clock()
+        self._roll(now)
+        self._expire(now)
+        return now
+
+    # -- seats --
+    def _peek(self, s: _Site, earliest: float, not_before: float) -> Optional[int]:
+        # earliest start >= not_before with a free seat at this site
+        heap = s.heap
+        while heap:
+            t = heap[0]
+            slot = s.slots.get(t)
+            if slot is not None and t >= earliest and slot.available:
+                break
+            heapq.heappop(heap)  # past or full: a release re-queues it
+            if slot is not None:
+                slot.queued = False
+        if not heap:
+            return None
+        if heap[0] >= not_before:
+            return heap[0]
+        i = bisect.bisect_left(s.starts, not_before)
+        for t in s.starts[i:]:
+            if s.slots[t].available:
+                return t
+        return None
+
+    def _take(self, s: _Site, t: int, iid: Optional[str] = None) -> str:
+        slot = s.slots[t]
+        slot.rooms -= 1
+        if iid is None:
+            return heapq.heappop(slot.free)
+        slot.free.remove(iid)
+        heapq.heapify(slot.free)
+        return iid
+
+    def _free(self, b: Booking) -> None:
+        s = self._sites[b.site]
+        counts = self._day_counts.get((b.site, self._day(b.start)))
+        if counts is not None:
+            counts[1 if b.status == HELD else 2] -= 1
+        slot = s.slots.get(b.start)
+        if slot is None:  # already in the past
+            return
+        slot.rooms += 1
+        heapq.heappush(slot.free, b.interviewer)
+        if not slot.queued:
+            heapq.heappush(s.heap, b.start)
+            slot.queued = True
+
+    # -- public API --
+    def hold(self, candidate_id: str, site: Optional[str] = None, not_before: Optional[float] = None,
+             meta: Optional[dict] = None) -> Optional[Booking]:
+        # earliest free seat (at `site`, or at any site); the candidate's live booking if it has one; None if full
+        with self._lock:
+            now = self._tick()
+            b = self._bookings.get(candidate_id)
+            if b is not None:
+                return b
+            earliest = now + self.lead_s
+            not_before = max(earliest, not_before or 0.0)
+            sites = [self._sites[site]] if site is not None else list(self._sites.values())
+            best = None
+            for s in sites:
+                t = self._peek(s, earliest, not_before)
+                if t is not None and (best is None or t < best[0]):
+                    best = (t, s)
+            if best is None:
+                return None
+            t, s = best
+            iid = self._take(s, t)
+            b = Booking(candidate_id, s.name, iid, t, now + self.hold_ttl_s, meta)
+            self._bookings[candidate_id] = b
+            self._day_counts[(s.name, self._day(t))][1] += 1
+            heapq.heappush(self._expiry, (b.expires_at, candidate_id, b.id))
+            return b
+
+    def confirm(self, candidate_id: str, site: Optional[str] = None) -> Optional[Booking]:
+        # confirm the held seat, holding one first if needed; None if there is no capacity
+        b = self.hold(candidate_id, site)
+        if b is None:
+            return None
+        with self._lock:
+            if b.status == HELD and self._bookings.get(candidate_id) is b:
+                counts = self._day_counts.get((b.site, self._day(b.start)))
+                if counts is not None:
+                    counts[1] -= 1
+                    counts[2] += 1
+                b.status = CONFIRMED
+            return b
+
+    def release(self, candidate_id: str) -> Optional[Booking]:
+        with self._lock:
+            self._tick()
+            b = self._bookings.pop(candidate_id, None)
+            if b is not None:
+                self._free(b)
+                b.status = RELEASED
+            return b
+
+    def get(self, candidate_id: str) -> Optional[Booking]:
+        return self._bookings.get(candidate_id)
+
+    @property
+    def sites(self) -> List[str]:
+        return list(self._sites)
+
+    def __len__(self) -> int:
+        return len(self._bookings)
+
+    # -- packing --
+    def _move(self, b: Booking, t: int, iid: str) -> None:
+        self._free(b)
+        self._take(self._sites[b.site], t, iid)
+        b.start, b.interviewer = t, iid
+        self._day_counts[(b.site, self._day(t))][1] += 1
+
+    def pack(self, site: Optional[str] = None) -> dict:
+        # Consolidate holds into as few interviewer-days as possible (bin packing with
+        # interviewer-days as bins). Per site and day, the least-loaded interviewer is emptied
+        # into the fullest ones that still have seats (best fit); if any of its bookings cannot
+        # move (confirmed, starting within the lead time, or no seat left) its moves are undone.
+        # Holds stay on their day.
+        with self._lock:
+            now = self._tick()
+            earliest = now + self.lead_s
+            by_day: Dict[Tuple[str, int], List[Booking]] = {}
+            for b in self._bookings.values():
+                if site is None or b.site == site:
+                    by_day.setdefault((b.site, self._day(b.start)), []).append(b)
+            moves, before, after = [], 0, 0
+            for (name, day), bookings in sorted(by_day.items()):
+                s = self._sites[name]
+                lo = bisect.bisect_left(s.starts, max(earliest, day * DAY_S - self.offset_s))
+                hi = bisect.bisect_left(s.starts, (day + 1) * DAY_S - self.offset_s)
+                load: Dict[str, List[Booking]] = {}
+                for b in bookings:
+                    load.setdefault(b.interviewer, []).append(b)
+                before += len(load)
+                free_at: Dict[str, List[int]] = {}  # interviewer -> starts with a free seat, latest first
+                for t in reversed(s.starts[lo:hi]):
+                    for iid in set(s.slots[t].free):
+                        if iid in load:
+                            free_at.setdefault(iid, []).append(t)
+                origin = {b.id: (b.start, b.interviewer) for b in bookings}
+
+                def seat(iid: str) -> Optional[int]:
+                    ts = free_at.get(iid)
+                    while ts:
+                        t = ts[-1]
+                        slot = s.slots[t]
+                        if slot.rooms > 0 and iid in slot.free:
+                            return t
+                        ts.pop()  # taken, or the room is full
+                    return None
+
+                for donor in sorted(load, key=lambda iid: (len(load[iid]), iid)):
+                    mine = load[donor]
+                    if not mine or any(b.status != HELD or b.start < earliest for b in mine):
+                        continue
+                    targets = sorted((iid for iid in load if iid != donor and load[iid]),
+                                     key=lambda iid: (-len(load[iid]), iid))
+                    done = []
+                    for b in mine:
+                        for iid in targets:
+                            t = seat(iid)
+                            if t is not None:
+                                done.append((b, b.start, b.interviewer))
+                                self._move(b, t, iid)
+                                break
+                        else:
+                            break
+                    if len(done) < len(mine):
+                        for b, t, iid in reversed(done):  # could not empty this one: undo
+                            free_at.setdefault(b.interviewer, []).append(b.start)
+                            self._move(b, t, iid)
+                        continue
+                    for b, _, _ in done:
+                        load[b.interviewer].append(b)
+                    load[donor] = []
+                for b in bookings:
+                    t, iid = origin[b.id]
+                    if (t, iid) != (b.start, b.interviewer):
+                        moves.append({"candidate_id": b.candidate_id, "site": name, "interviewer": b.interviewer,
+                                      "from": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t)), "to": b.slot})
+                after += sum(1 for v in load.values() if v)
+            return {"moved": len(moves), "moves": moves, "interviewer_days_before": before,
+                    "interviewer_days_after": after, "freed_interviewer_days": before - after}
+
+    # -- reporting --
+    def capacity(self, days: int = 7) -> dict:
+        # per local day, summed over sites: available = bookable seats (interviewer seats capped by
+        # rooms), held = seats taken (confirmed included), free = available - held
+        with self._lock:
+            now = self._tick()
+            today = self._day(now)
+            out = []
+            for day in range(today, today + days):
+                seats = held = confirmed = 0
+                for (name, d), c in self._day_counts.items():
+                    if d == day:
+                        seats += c[0]
+                        held += c[1] + c[2]
+                        confirmed += c[2]
+                out.append({"date": time.strftime("%Y-%m-%d", time.gmtime(day * DAY_S)), "available": seats,
+                            "held": held, "confirmed": confirmed, "free": seats - held})
+            return {"today": out[0] if out else None, "next7": out,
+                    "sites": {s.name: {"rooms": s.rooms, "interviewers": len(s.interviewers)}
+                              for s in self._sites.values()}}
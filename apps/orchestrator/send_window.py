@@ -0,0 +1,161 @@
+import threading, time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .sla_heatmap import ANY, DAYS, SlaHeatmap
+
+# ---- send-window optimizer ----
+# Scores every weekday x hour cell per (job, locale) from the SLA heatmap's
+# send/reply counts, then spreads each key's weekly volume over its best cells
+# subject to a shared per-hour send cap (provider load) and a per-cell share
+# cap (no single-hour blasts). Sparse cells are shrunk toward the locale's
+# hourly curve, which is shrunk toward the overall curve, so one lucky reply
+# does not make a window. All keys are scored and filled together as
+# K x 168 arrays.
+
+CELLS = 7 * 24
+
+
+def parse_hour_range(spec: str) -> Tuple[int, int]:
+    # "8-21" -> (8, 21): sends may start from 08:00 up to 20:59 local
+    a, b = (int(x) for x in spec.split("-", 1))
+    if not 0 <= a < b <= 24:
+        raise ValueError(f"bad hour range: {spec}")
+    return a, b
+
+
+def _fill(score: np.ndarray, volume: np.ndarray, room: np.ndarray, limit: np.ndarray, rounds: int = 16):
+    # water-fill: each round every key asks for its best cells that still have room, in
+    # score order, up to its remaining volume; oversubscribed cells are shared pro rata
+    alloc = np.zeros_like(score)
+    room = room.astype(np.float64)
+    remaining = volume.astype(np.float64)
+    for _ in range(rounds):
+        if remaining.sum() < 0.5 or room.sum() < 0.5:
+            break
+        key_room = np.minimum(limit - alloc, room[None, :]).clip(0.0)
+        order = np.argsort(np.where(key_room > 0, -score, np.inf), axis=1, kind="stable")
+        sorted_room = np.take_along_axis(key_room, order, axis=1)
+        before = np.cumsum(sorted_room, axis=1) - sorted_room
+        want = np.zeros_like(alloc)
+        np.put_along_axis(want, order, np.clip(remaining[:, None] - before, 0.0, sorted_room), axis=1)
+        demand = want.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(demand > room, room / demand, 1.0)
+        got = want * scale[None, :]
+        alloc += got
+        room = np.maximum(room - got.sum(axis=0), 0.0)
+        remaining = np.maximum(remaining - got.sum(axis=1), 0.0)
+    return alloc, remaining
+
+
+class SendWindowPlanner:
+    def __init__(self, heatmap: SlaHeatmap, hourly_capacity: float = 5000.0, hours: Tuple[int, int] = (8, 21),
+                 max_cell_share: float = 0.2, prior_weight: float = 20.0, default_rate: float = 0.3):
+        self.heatmap = heatmap
+        self.hourly_capacity = hourly_capacity  # sends per hour, all jobs and locales together
+        self.hours = hours
+        self.max_cell_share = max_cell_share
+        self.prior_weight = prior_weight  # pseudo-sends pulling a cell toward its parent curve
+        self.default_rate = default_rate
+        # (job, locale) -> bool[168] send cells; replaced whole, never mutated, so readers need no lock
+        self._plans: Dict[Tuple[str, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _allowed(self) -> np.ndarray:
+        hour = np.arange(CELLS) % 24
+        return (hour >= self.hours[0]) & (hour < self.hours[1])
+
+    def score(self, counts: dict, keys: List[Tuple[str, str]]) -> np.ndarray:
+        # smoothed reply rate per cell, K x 168
+        w = self.prior_weight
+        gs, gr = counts.get((ANY, ANY), (np.zeros(CELLS), np.zeros(CELLS)))
+        base = gr.sum() / gs.sum() if gs.sum() else self.default_rate
+        overall = (gr + w * base) / (gs + w)
+        locales = sorted({loc for _, loc in keys})
+        zero = (np.zeros(CELLS), np.zeros(CELLS))
+        ls = np.stack([counts.get((ANY, loc), zero)[0] for loc in locales])
+        lr = np.stack([counts.get((ANY, loc), zero)[1] for loc in locales])
+        by_locale = (lr + w * overall) / (ls + w)
+        s = np.stack([counts[k][0] for k in keys]).astype(np.float64)
+        r = np.stack([counts[k][1] for k in keys]).astype(np.float64)
+        li = np.array([locales.index(loc) for _, loc in keys])
+        return (r + w * by_locale[li]) / (s + w)
+
+    def optimize(self, job_id: Optional[str] = None, weekly_volume: Optional[float] = None,
+                 hourly_capacity: Optional[float] = None) -> dict:
+        # weekly_volume defaults to the sends observed so far; it is split across keys by their send share
+        t0 = time.perf_counter()
+        counts = self.heatmap.counts(job_id)
+        keys = sorted(k for k, (s, _) in counts.items() if ANY not in k and s.sum() > 0)
+        if not keys:
+            return {"plans": [], "totals": None, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2)}
+        score = self.score(counts, keys)
+        sent = np.stack([counts[k][0] for k in keys]).astype(np.float64)
+        replied = np.stack([counts[k][1] for k in keys]).astype(np.float64)
+        history = sent.sum(axis=1)
+        volume = history if weekly_volume is None else history / history.sum() * weekly_volume
+        allowed = self._allowed()
+        cap = self.hourly_capacity if hourly_capacity is None else hourly_capacity
+        alloc, unplaced = _fill(score, volume, np.where(allowed, cap, 0.0),
+                                np.ceil(self.max_cell_share * volume)[:, None] * allowed[None, :])
+        planned = alloc.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected = np.where(planned > 0, (alloc * score).sum(axis=1) / planned, np.nan)
+            baseline = (sent * score).sum(axis=1) / history  # same volume, sent at the historical hours
+        hist_load = (sent / history[:, None] * volume[:, None]).sum(axis=0)
+        plans = []
+        for i, (job, locale) in enumerate(keys):
+            cells = np.flatnonzero(alloc[i] > 0)
+            cells = cells[np.argsort(-score[i, cells], kind="stable")]
+            plans.append({
+                "job_id": job, "locale": locale, "volume": int(round(volume[i])), "planned": int(round(planned[i])),
+                "unplaced": int(round(unplaced[i])),
+                "observed_reply_rate": round(float(replied[i].sum() / history[i]), 4),
+                "baseline_reply_rate": round(float(baseline[i]), 4),
+                "expected_reply_rate": None if expected[i] != expected[i] else round(float(expected[i]), 4),
+                "windows": [{"day": DAYS[c // 24], "hour": int(c % 24), "messages": int(round(alloc[i, c])),
+                             "share": round(float(alloc[i, c] / planned[i]), 4),
+                             "reply_rate": round(float(score[i, c]), 4)} for c in cells],
+            })
+        with self._lock:
+            plans_next = {} if job_id is None else dict(self._plans)
+            for i, k in enumerate(keys):
+                mask = alloc[i] > 0
+                mask.flags.writeable = False
+                plans_next[k] = mask
+            self._plans = plans_next  # published in one assignment
+        vol, total = float(volume.sum()), float(planned.sum())
+        exp_total = float((alloc * score).sum())
+        base_total = float((sent * score / history[:, None] * volume[:, None]).sum())
+        return {
+            "plans": plans,
+            "totals": {
+                "volume": int(round(vol)), "planned": int(round(total)), "unplaced": int(round(unplaced.sum())),
+                "baseline_reply_rate": round(base_total / vol, 4) if vol else None,
+                "expected_reply_rate": round(exp_total / total, 4) if total else None,
+                "messages_per_reply": {"baseline": round(vol / base_total, 2) if base_total else None,
+                                       "planned": round(total / exp_total, 2) if exp_total else None},
+                "peak_hourly_sends": {"baseline": int(round(hist_load.max())),
+                                      "planned": int(round(alloc.sum(axis=0).max()))},
+                "hourly_capacity": cap,
+            },
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+        }
+
+    def has_plan(self, job_id: str) -> bool:
+        return any(k[0] == job_id for k in self._plans)  # iterates one published snapshot
+
+    def next_send(self, job_id: Optional[str], locale: Optional[str], now: Optional[float] = None) -> float:
+        # earliest time at or after `now` inside a planned window; `now` when the key has no plan
+        now = time.time() if now is None else now
+        mask = self._plans.get((str(job_id), str(locale)))
+        if mask is None or not mask.any():
+            return now
+        c = self.heatmap.cell(now)
+        if mask[c]:
+            return now
+        ahead = int(np.argmax(np.roll(mask, -c)))  # hours until the next planned cell
+        hour_start = now - (int(now) + self.heatmap.utc_offset_s) % 3600 - (now % 1)
+        return hour_start + ahead * 3600
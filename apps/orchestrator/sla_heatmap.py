@@ -0,0 +1,166 @@
+import threading
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ---- incremental SLA heatmap ----
+# A candidate's first outreach.sent opens a pair; their first channel.inbound
+# after it closes the pair. The send's weekday x hour cell counts the send, and
+# on reply counts the reply and drops the time-to-first-touch (TTFT) into a
+# per-cell histogram. Counters are kept per (job, locale) and rolled up to
+# (job, *), (*, locale) and (*, *) on write, so a query reads one set of
+# 7x24 arrays whatever the filter: no rescans. Per-candidate pair state is
+# kept for horizon_s of event time: a send unanswered by then stops waiting,
+# and a candidate whose pair closed that long ago can open a new one, so the
+# state is bounded by the candidates contacted within one horizon.
+
+DAYS = ("Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat")
+HOURS = tuple(range(24))
+# TTFT histogram bucket edges, minutes; the last bucket is open-ended
+TTFT_EDGES = np.array([0, 1, 2, 5, 10, 15, 30, 45, 60, 90, 120, 180, 240, 360, 480, 720, 1440, 2880, 4320, 10080],
+                      np.float64)
+ANY = "*"
+
+
+class _Cells:
+    __slots__ = ("sent", "replied", "hist")
+
+    def __init__(self):
+        self.sent = np.zeros(7 * 24, np.int64)
+        self.replied = np.zeros(7 * 24, np.int64)
+        self.hist = np.zeros((7 * 24, len(TTFT_EDGES)), np.uint32)
+
+
+def percentile_grid(hist: np.ndarray, q: float) -> np.ndarray:
+    # q-th percentile per row of a bucket histogram, linear within a bucket; NaN for empty rows
+    cum = hist.cumsum(axis=1, dtype=np.int64)
+    total = cum[:, -1]
+    target = q / 100.0 * total
+    idx = np.minimum((cum < target[:, None]).sum(axis=1), len(TTFT_EDGES) - 1)
+    rows = np.arange(len(hist))
+    below = np.where(idx > 0, cum[rows, np.maximum(idx - 1, 0)], 0)
+    in_bucket = hist[rows, idx].astype(np.float64)
+    lo = TTFT_EDGES[idx]
+    hi = np.append(TTFT_EDGES[1:], TTFT_EDGES[-1])[idx]  # open last bucket reports its lower edge
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = np.where(in_bucket > 0, (target - below) / in_bucket, 0.0)
+        out = lo + np.clip(frac, 0.0, 1.0) * (hi - lo)
+    return np.where(total > 0, out, np.nan)
+
+
+def _grid(values: np.ndarray, digits: int) -> list:
+    # 168 cells -> 7 rows of 24, NaN -> None
+    v = np.round(values, digits).reshape(7, 24).tolist()
+    return [[None if x != x else x for x in row] for row in v]
+
+
+class SlaHeatmap:
+    def __init__(self, lookup: Optional[Callable[[str], Optional[dict]]] = None, utc_offset_min: int = 0,
+                 horizon_s: float = 30 * 86400):
+        # lookup(candidate_id) -> candidate row, for sends whose payload lacks job_id/locale
+        self.lookup = lookup
+        self.utc_offset_s = utc_offset_min * 60
+        self.horizon_s = horizon_s
+        # both in event-time order, oldest first, so expiry pops from the front
+        self._open: Dict[str, Tuple[float, int, tuple]] = {}  # candidate -> (sent ts, cell, counter keys)
+        self._closed: Dict[str, float] = {}  # candidate -> ts their first send was answered
+        self._cells: Dict[Tuple[str, str], _Cells] = {}
+        self._lock = threading.Lock()
+
+    def cell(self, ts: float) -> int:
+        # weekday x hour index (0..167) of a timestamp, in this heatmap's offset
+        t = int(ts) + self.utc_offset_s
+        day = (t // 86400 + 4) % 7  # 1970-01-01 was a Thursday; Sunday = 0
+        return day * 24 + (t % 86400) // 3600
+
+    def _keys(self, job, locale) -> tuple:
+        job = ANY if job is None else str(job)
+        locale = ANY if locale is None else str(locale)
+        keys = {(job, locale), (job, ANY), (ANY, locale), (ANY, ANY)}
+        out = []
+        for k in keys:
+            c = self._cells.get(k)
+            if c is None:
+                c = self._cells[k] = _Cells()
+            out.append(c)
+        return tuple(out)
+
+    def on_audit(self, events: Iterable[dict]) -> None:
+        # AuditWriter listener; also used to load an existing log
+        with self._lock:
+            latest = None
+            for e in events:
+                latest = e.get("ts") or latest
+                action = e.get("action")
+                if action == "outreach.sent":
+                    p = e.get("payload") or {}
+                    cid = p.get("candidate_id")
+                    if not cid or cid in self._open or cid in self._closed:
+                        continue  # only the first send opens a pair
+                    job, locale = p.get("job_id"), p.get("locale")
+                    if (job is None or locale is None) and self.lookup:
+                        row = self.lookup(cid) or {}
+                        job = row.get("job_id") if job is None else job
+                        locale = row.get("locale") if locale is None else locale
+                    ts = float(e.get("ts") or 0.0)
+                    cell = self.cell(ts)
+                    keys = self._keys(job, locale)
+                    for c in keys:
+                        c.sent[cell] += 1
+                    self._open[cid] = (ts, cell, keys)
+                elif action == "channel.inbound":
+                    cid = (e.get("payload") or {}).get("candidate_id")
+                    pair = self._open.pop(cid, None) if cid else None
+                    if pair is None:
+                        continue
+                    sent_ts, cell, keys = pair
+                    minutes = max(0.0, float(e.get("ts") or 0.0) - sent_ts) / 60.0
+                    bucket = int(np.searchsorted(TTFT_EDGES, minutes, side="right")) - 1
+                    for c in keys:
+                        c.replied[cell] += 1
+                        c.hist[cell, bucket] += 1
+                    self._closed[cid] = float(e.get("ts") or 0.0)
+            if latest is not None:
+                self._expire(float(latest) - self.horizon_s)
+
+    def _expire(self, cutoff: float) -> None:
+        while self._open:
+            cid, pair = next(iter(self._open.items()))
+            if pair[0] >= cutoff:
+                break
+            del self._open[cid]  # its send stays counted, it just no longer waits for a reply
+        while self._closed:
+            cid, ts = next(iter(self._closed.items()))
+            if ts >= cutoff:
+                break
+            del self._closed[cid]
+
+    def counts(self, job_id: Optional[str] = None) -> Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]:
+        # (sent, replied) per cell for every (job, locale) key, rollups included; copies
+        with self._lock:
+            return {k: (c.sent.copy(), c.replied.copy()) for k, c in self._cells.items()
+                    if job_id is None or k[0] in (job_id, ANY)}
+
+    @property
+    def pending(self) -> int:
+        return len(self._open)
+
+    def grid(self, job_id: Optional[str] = None, locale: Optional[str] = None,
+             percentiles: Sequence[float] = (50, 90)) -> dict:
+        key = (ANY if job_id is None else job_id, ANY if locale is None else locale)
+        with self._lock:
+            c = self._cells.get(key) or _Cells()
+            sent, replied, hist = c.sent.copy(), c.replied.copy(), c.hist.copy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(sent > 0, replied / sent, np.nan)
+        pct = {f"p{q:g}": _grid(percentile_grid(hist, q), 1) for q in percentiles}
+        return {
+            "reply_rate": _grid(rate, 4),
+            "ttft_minutes": pct.get("p50") or _grid(percentile_grid(hist, 50), 1),
+            "ttft_percentiles": pct,
+            "sent": sent.reshape(7, 24).tolist(),
+            "replied": replied.reshape(7, 24).tolist(),
+            "totals": {"sent": int(sent.sum()), "replied": int(replied.sum()),
+                       "reply_rate": round(float(replied.sum() / sent.sum()), 4) if sent.any() else None},
+            "bins": {"hours": list(HOURS), "days": list(DAYS)},
+        }
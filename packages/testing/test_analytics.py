@@ -0,0 +1,74 @@
+import importlib
+
+import pytest
+
+analytics = importlib.import_module("apps.orchestrator.analytics")
+
+DAY = 86400
+NOW = 1_760_000_000  # fixed clock, so day buckets do not depend on when the test runs
+
+
+def _ev(ts, action, cid=None, **payload):
+    if cid:
+        payload["candidate_id"] = cid
+    return {"ts": ts, "action": action, "payload": payload}
+
+
+def _feed(fa):
+    cands = {"a": {"job_id": "j1", "locale": "en"}, "b": {"job_id": "j1", "locale": "ar"},
+             "c": {"job_id": "j2", "locale": "en"}}
+    fa.lookup = cands.get
+    old, new = NOW - 10 * DAY, NOW - DAY
+    fa.on_audit([_ev(old, "outreach.sent", "a"), _ev(old, "outreach.sent", "b"), _ev(old, "job.created", job_id="j1")])
+    fa.on_audit([
+        _ev(new, "outreach.sent", "a"),  # second send: not a new stage entry
+        _ev(new, "outreach.sent", "c"),
+        _ev(new, "channel.inbound", "a"), _ev(new, "channel.inbound", "a"),
+        _ev(new, "consent.captured", "a"),
+        _ev(new, "qualification.done", "a", qualified=True),
+        _ev(new, "qualification.done", "b", qualified=False),
+        _ev(new + 60, "schedule.confirmed", "a"), _ev(new + 120, "ats.write", "a", job_id="j1"),
+        _ev(NOW - 60, "interview.attended", "a"), _ev(NOW - 30, "interview.no_show", "c"),
+    ])
+
+
+def test_distinct_stage_counts_groups_and_windows():
+    fa = analytics.FunnelAnalytics(chunk_rows=4)  # several full (cached) chunks plus a partial one
+    _feed(fa)
+    assert len(fa) == 14
+    out = fa.funnel(now=NOW)
+    t = out["totals"]
+    assert [t[s] for s in analytics.STAGES] == [3, 1, 1, 1, 1, 1]
+    assert t["rates"]["replied"] == round(1 / 3, 4) and t["rates"]["showed"] == 1.0
+
+    week = fa.funnel(group_by=("job", "locale"), window_s=7 * DAY, now=NOW)
+    by = {(g["job_id"], g["locale"]): g for g in week["groups"]}
+    assert set(by) == {("j1", "en"), ("j2", "en")}  # b's only stage entry is older than the window
+    assert by[("j2", "en")]["contacted"] == 1 and by[("j1", "en")]["contacted"] == 0
+    assert by[("j1", "en")]["rates"]["replied"] is None
+
+    day = lambda ts: analytics.time.strftime("%Y-%m-%d", analytics.time.gmtime(ts))
+    days = {g["day"]: (g["contacted"], g["showed"]) for g in fa.funnel(group_by=("day",), now=NOW)["groups"]}
+    assert days == {day(NOW - 10 * DAY): (2, 0), day(NOW - DAY): (1, 0), day(NOW - 60): (0, 1)}
+
+    assert fa.funnel(job_id="j2", now=NOW)["totals"]["contacted"] == 1
+    assert fa.funnel(locale="ar", now=NOW)["totals"]["contacted"] == 1
+    assert fa.funnel(job_id="nope", now=NOW)["totals"]["contacted"] == 0
+    # cached chunk results agree with a second pass
+    assert fa.funnel(group_by=("job", "locale", "day"), now=NOW)["groups"] == \
+        fa.funnel(group_by=("job", "locale", "day"), now=NOW)["groups"]
+
+    assert fa.action_counts(["interview.attended", "interview.no_show", "never"], now=NOW) == \
+        {"interview.attended": 1, "interview.no_show": 1, "never": 0}
+    assert fa.action_counts(["outreach.sent"], window_s=7 * DAY, now=NOW) == {"outreach.sent": 2}
+    assert fa.action_counts(["outreach.sent"], job_id="j1", now=NOW) == {"outreach.sent": 3}
+
+
+def test_parse_window_and_group_by():
+    assert analytics.parse_window("7d") == 7 * DAY and analytics.parse_window("90m") == 5400
+    assert analytics.parse_window(None) is None and analytics.parse_window("3600") == 3600
+    assert analytics.parse_group_by("locale, job,job") == ("job", "locale")
+    with pytest.raises(ValueError):
+        analytics.parse_window("7 days")
+    with pytest.raises(ValueError):
+        analytics.parse_group_by("job,country")
@@ -0,0 +1,64 @@
+import asyncio, importlib
+import httpx
+
+ats_mock = importlib.import_module("apps.ats-mock.main")
+ats_client = importlib.import_module("apps.orchestrator.ats_client")
+
+
+def test_batch_endpoint_returns_per_item_results():
+    from fastapi.testclient import TestClient
+    c = TestClient(ats_mock.app)
+    r = c.post("/applications/batch", json={"items": [
+        {"candidate_id": "c1", "job_id": "j", "slot": "s"},
+        {"candidate_id": "c2", "job_id": "j"},
+    ]})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert results[0]["ok"] is True and results[0]["candidate_id"] == "c1"
+    assert results[1]["ok"] is False
+
+
+def test_batcher_coalesces_concurrent_writes():
+    client = ats_client.AtsClient("http://ats", transport=httpx.ASGITransport(app=ats_mock.app))
+    batcher = ats_client.AtsBatcher(client, window_s=0.01, max_batch=100)
+    before = len(ats_mock.APPLICATIONS)
+
+    async def run():
+        res = await asyncio.gather(*(batcher.create_application(f"c{i}", "j", "s", prefer_connector=False) for i in range(50)))
+        await client.aclose()
+        return res
+
+    res = asyncio.run(run())
+    assert [r["candidate_id"] for r in res] == [f"c{i}" for i in range(50)]
+    assert batcher.batches_sent == 1
+    assert len(ats_mock.APPLICATIONS) == before + 50
+
+
+def test_full_batch_cancels_its_window_timer():
+    client = ats_client.AtsClient("http://ats", transport=httpx.ASGITransport(app=ats_mock.app))
+    batcher = ats_client.AtsBatcher(client, window_s=0.2, max_batch=2)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(batcher.create_application(f"f{i}", "j", "s", prefer_connector=False) for i in range(2)))
+        await asyncio.sleep(0.15)  # the full bucket's timer, if left armed, fires 0.05 s from now
+        t0 = loop.time()
+        await batcher.create_application("f2", "j", "s", prefer_connector=False)
+        waited = loop.time() - t0
+        await client.aclose()
+        return waited
+
+    assert asyncio.run(run()) >= 0.18  # waited its own full window
+
+
+def test_idempotency_cache_is_bounded_by_size_and_ttl():
+    cache = ats_mock.IdempotencyCache(max_items=2, ttl_s=60.0)
+    for k in ("a", "b", "c"):
+        cache.put(k, {"app_id": k})
+    assert len(cache) == 2 and cache.get("a") is None
+    assert cache.get("b") == {"app_id": "b"}  # b is now most recently used
+    cache.put("d", {"app_id": "d"})
+    assert cache.get("c") is None and cache.get("b") is not None
+    stale = ats_mock.IdempotencyCache(max_items=10, ttl_s=0.0)
+    stale.put("x", {"app_id": "x"})
+    assert stale.get("x") is None and len(stale) == 0
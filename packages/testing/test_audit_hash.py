@@ -1,4 +1,4 @@
-import hashlib, json
+import hashlib, json, importlib, threading
 
 def compute_hash(ts, payload, secret, prev=None):
     body = json.dumps(payload, sort_keys=True)
@@ -10,3 +10,83 @@ def test_chain_hash_changes_with_prev():
     assert h1 != h2
 
 
+def _chain(n, secret, verify_mod, checkpoints=None):
+    store_mod = importlib.import_module("apps.orchestrator.audit_store")
+    store, prev = store_mod.MemoryAuditStore(), None
+    for i in range(n):
+        h = verify_mod.chain_hash(float(i), {"i": i}, prev, secret)
+        idx = store.append({"ts": float(i), "payload": {"i": i}, "hash": h, "prev_hash": prev})
+        if checkpoints:
+            checkpoints.maybe_record(idx, h)
+        prev = h
+    return store
+
+def test_chain_hash_matches_reference():
+    verify_mod = importlib.import_module("apps.orchestrator.audit_verify")
+    assert verify_mod.chain_hash(1.5, {"b": 1, "a": 2}, "p", "s") == compute_hash(1.5, {"a": 2, "b": 1}, "s", prev="p")
+
+def test_checkpointed_and_full_verify():
+    verify_mod = importlib.import_module("apps.orchestrator.audit_verify")
+    cps = verify_mod.Checkpoints("s", every=10)
+    store = _chain(35, "s", verify_mod, cps)
+    inc = verify_mod.verify_incremental(store, cps, "s")
+    assert inc["ok"] and inc["from_checkpoint"] == 29 and inc["checked"] == 5
+    full = verify_mod.verify_full(store, cps, "s")
+    assert full["ok"] and len(full["segments"]) == 4
+    # tampering before the last checkpoint is only visible to a full audit
+    store[12]["payload"] = {"i": -1}
+    assert verify_mod.verify_incremental(store, cps, "s")["ok"]
+    full = verify_mod.verify_full(store, cps, "s")
+    assert not full["ok"] and full["broken_at"] == 12
+    assert [s["ok"] for s in full["segments"]] == [True, False, True, True]
+    # forged checkpoints are ignored
+    cps.items[-1]["sig"] = "0" * 64
+    assert verify_mod.verify_incremental(store, cps, "s")["from_checkpoint"] == 19
+
+def test_writer_keeps_chain_consistent_under_threads():
+    store_mod = importlib.import_module("apps.orchestrator.audit_store")
+    verify_mod = importlib.import_module("apps.orchestrator.audit_verify")
+    writer_mod = importlib.import_module("apps.orchestrator.audit_writer")
+    store = store_mod.MemoryAuditStore()
+    cps = verify_mod.Checkpoints("s", every=500)
+    w = writer_mod.AuditWriter(store, "s", cps, max_delay_s=0.005)
+    def worker(n):
+        for i in range(500):
+            w.submit("t", "a", {"n": n, "i": i})
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    w.submit("t", "last", {}, wait=True)
+    assert len(store) == 4001
+    assert verify_mod.verify_full(store, cps, "s")["ok"]
+    assert w.batches < len(store)
+    assert all(store[i]["ts"] <= store[i + 1]["ts"] for i in range(len(store) - 1))
+    w.close()
+
+def test_writer_commits_the_prefix_of_a_failed_batch():
+    store_mod = importlib.import_module("apps.orchestrator.audit_store")
+    writer_mod = importlib.import_module("apps.orchestrator.audit_writer")
+
+    class FlakyStore(store_mod.MemoryAuditStore):
+        def append(self, event):
+            if event["payload"].get("boom"):
+                raise OSError("disk full")
+            return super().append(event)
+
+    store = FlakyStore()
+    w = writer_mod.AuditWriter(store, "s")
+    seen = []
+    w.add_listener(lambda batch: seen.extend(e["payload"]["n"] for e in batch))
+    w.submit("t", "hold", {"n": -1}, wait=True)
+    w.submit_events([("t", "a", {"n": 0}), ("t", "a", {"n": 1}), ("t", "a", {"n": 2, "boom": True}), ("t", "a", {"n": 3})])
+    w.wait_for(3)  # the first two events of the batch made it into the chain
+    try:
+        w.wait_for(4)
+        assert False, "expected AuditWriteError"
+    except writer_mod.AuditWriteError as e:
+        assert "disk full" in str(e)
+    assert [e["payload"]["n"] for e in store] == [-1, 0, 1] and seen == [-1, 0, 1]
+    assert w.last_hash == store[-1]["hash"]
+    w.close()
@@ -0,0 +1,69 @@
+import importlib
+
+store_mod = importlib.import_module("apps.orchestrator.audit_store")
+
+
+def _event(i):
+    return {"id": str(i), "ts": float(i), "actor": "t", "action": "a", "payload": {"n": i}, "hash": f"h{i}", "prev_hash": None}
+
+
+def test_segmented_store_rolls_and_seeks(tmp_path):
+    s = store_mod.SegmentedAuditStore(str(tmp_path), segment_bytes=1024)
+    for i in range(200):
+        assert s.append(_event(i)) == i
+    assert len(s) == 200
+    assert len(s.segments()) > 1
+    assert s[0]["payload"] == {"n": 0}
+    assert s[-1]["payload"] == {"n": 199}
+    assert [e["payload"]["n"] for e in s[95:105]] == list(range(95, 105))
+    assert [e["payload"]["n"] for e in s[-3:]] == [197, 198, 199]
+    s.close()
+
+
+def test_segmented_store_recovers_after_reopen(tmp_path):
+    s = store_mod.SegmentedAuditStore(str(tmp_path), segment_bytes=2048)
+    for i in range(50):
+        s.append(_event(i))
+    s.close()
+    s2 = store_mod.SegmentedAuditStore(str(tmp_path), segment_bytes=2048)
+    assert len(s2) == 50
+    assert s2[-1]["hash"] == "h49"
+    s2.append(_event(50))
+    assert [e["payload"]["n"] for e in s2.iter_from(48)] == [48, 49, 50]
+    s2.close()
+
+
+def test_segmented_store_grows_an_empty_segment_for_an_oversize_record(tmp_path):
+    s = store_mod.SegmentedAuditStore(str(tmp_path), segment_bytes=100)
+    big = {"x": "a" * 300}
+    assert s.append(big) == 0
+    assert s.segments() == [(0, 1)]
+    assert s.append(_event(1)) == 1
+    assert s[0] == big
+    s.close()
+    s2 = store_mod.SegmentedAuditStore(str(tmp_path), segment_bytes=100)
+    assert len(s2) == 2
+    assert s2[0] == big and s2[1]["hash"] == "h1"
+    s2.close()
+
+
+def test_segmented_store_oversize_record_after_a_roll(tmp_path):
+    s = store_mod.SegmentedAuditStore(str(tmp_path), segment_bytes=256)
+    for i in range(10):
+        s.append(_event(i))
+    big = {"x": "b" * 1000}
+    n = s.append(big)
+    s.append(_event(99))
+    bases = [base for base, _ in s.segments()]
+    assert len(bases) == len(set(bases))
+    assert s[n] == big
+    assert s[-1]["hash"] == "h99"
+    assert [e["payload"]["n"] for e in s[:10]] == list(range(10))
+    s.close()
+
+
+def test_segmented_store_readonly_on_an_empty_directory(tmp_path):
+    s = store_mod.SegmentedAuditStore(str(tmp_path), readonly=True)
+    assert len(s) == 0
+    assert list(s.iter_from(0)) == []
+    s.close()
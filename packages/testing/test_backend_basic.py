@@ -1,4 +1,4 @@
-import json
+import json, os, subprocess, sys, time
 from fastapi.testclient import TestClient
 import importlib
 
@@ -56,3 +56,222 @@ def test_chat_stream_demo():
     chunk = next(s.iter_text())
     assert "data:" in chunk
 
+def test_inbound_consent_by_normalized_phone():
+  r = client.post("/candidates", json={"name":"n","phone":"+1 (555) 777-0000","status":"contacted"})
+  cid = r.json()["candidate_id"]
+  assert client.post("/channels/inbound", json={"From":"whatsapp:+15557770000","Body":"YES"}).status_code == 200
+  items = client.get("/candidates", params={"status":"contacted"}).json()["candidates"]
+  match = [c for c in items if c["id"] == cid]
+  assert match and match[0]["consent"] is True
+
+def test_funnel_counters_per_job():
+  job_id = client.post("/jobs", json={"title":"t","location":"l","shift":"s","reqs":[]}).json()["job_id"]
+  client.post("/simulate/outreach", params={"job_id": job_id})
+  f = client.get("/funnel", params={"job_id": job_id}).json()
+  assert f["contacted"] == 25 and f["replied"] == 0
+  total = client.get("/funnel", params={"by_job": True}).json()
+  assert total["jobs"][job_id] == f
+  assert total["contacted"] >= 25
+  app_module.COUNTERS.rebuild(app_module.CANDIDATES, app_module.AUDIT)
+  assert client.get("/funnel", params={"job_id": job_id}).json() == f
+
+def test_metrics_endpoint():
+  r = client.get("/metrics")
+  assert r.status_code == 200
+  assert "ats_outbox_depth" in r.text
+  assert r.headers["x-content-type-options"] == "nosniff" and r.headers["x-request-id"]
+  client.get("/outreach/campaigns/no-such-campaign")
+  text = client.get("/metrics").text
+  # route templates, not raw paths, as labels
+  assert 'http_requests_total{method="GET",path="/outreach/campaigns/{campaign_id}",status="404"}' in text
+  assert "no-such-campaign" not in text
+  assert "audit_append_duration_seconds_count" in text and "sse_fanout_lag_seconds" in text
+  assert "log_queue_depth" in text
+
+def _wait_import(job_id):
+  for _ in range(200):
+    st = client.get(f"/candidates/bulk/{job_id}").json()
+    if st["status"] in ("done", "failed"):
+      return st
+    time.sleep(0.02)
+  raise AssertionError("import did not finish")
+
+def test_bulk_import_csv_and_ndjson():
+  rows = ["name,phone,locale,consent"] + [f"Bulk {i},+1 444 {i:07d},en,false" for i in range(30)]
+  rows += ["Dup,+14440000003,en,false", "Bad,,en,false", "Bad2,+1444999,en,maybe"]
+  r = client.post("/candidates/bulk", files={"file": ("c.csv", "\n".join(rows) + "\n", "text/csv")})
+  assert r.status_code == 202
+  st = _wait_import(r.json()["job_id"])
+  assert st["status"] == "done" and st["progress"] == 1.0
+  assert (st["rows"], st["imported"], st["duplicates"], st["invalid"]) == (33, 30, 1, 2)
+  assert app_module.CANDIDATES.by_phone("+14440000007")[1]["name"] == "Bulk 7"
+  nd = "\n".join(json.dumps({"name": f"N {i}", "phone": f"+1333{i:07d}", "locale": "ar"}) for i in range(5)) + "\n{oops\n"
+  r = client.post("/candidates/bulk", files={"file": ("c.ndjson", nd, "application/x-ndjson")})
+  st = _wait_import(r.json()["job_id"])
+  assert st["format"] == "ndjson" and st["imported"] == 5 and st["invalid"] == 1
+  assert client.get("/candidates/bulk/missing").status_code == 404
+
+def test_outreach_campaign():
+  job_id = client.post("/jobs", json={"title":"Picker","location":"Austin","shift":"night","reqs":[]}).json()["job_id"]
+  for i in range(12):
+    client.post("/candidates", json={"name":f"O {i}","phone":f"+1222{i:07d}","job_id":job_id})
+  assert client.post("/outreach/start", params={"job_id": job_id, "channel": "fax"}).status_code == 400
+  r = client.post("/outreach/start", params={"job_id": job_id}).json()
+  assert r["ok"] and r["count"] == 12
+  for _ in range(200):
+    c = client.get(f"/outreach/campaigns/{r['campaign_id']}").json()
+    if c["state"] == "done":
+      break
+    time.sleep(0.02)
+  assert c["state"] == "done" and c["sent"] == 12
+  assert client.get("/funnel", params={"job_id": job_id}).json()["contacted"] == 12
+  assert client.get("/kpi", params={"job_id": job_id}).json()
+  assert client.post("/outreach/campaigns/nope/pause").status_code == 404
+
+def test_inbound_batch_dedupes_provider_retries():
+  cid = client.post("/candidates", json={"name":"r","phone":"+1 321 000 0001","status":"contacted"}).json()["candidate_id"]
+  batch = {"messages": [{"id":"SM1","from":"+13210000001","body":"YES"}, {"id":"SM2","from":"+19999999999","body":"hi"}]}
+  r = client.post("/channels/inbound/batch", json=batch)
+  assert r.status_code == 202 and r.json()["accepted"] == 2
+  assert client.post("/channels/inbound/batch", json=batch).json() == {"ok": True, "accepted": 0, "duplicates": 2}
+  assert app_module.INBOUND.drain(2.0)
+  assert app_module.CANDIDATES[cid]["consent"] is True
+  ev = client.get("/audit", params={"limit": 100000}).json()["events"]
+  assert len([e for e in ev if e["payload"].get("message_id") == "SM1"]) == 1
+  form = {"From":"+13210000001","Body":"yes again","MessageSid":"SM3"}
+  assert client.post("/channels/inbound", data=form).json() == {"ok": True}
+  assert client.post("/channels/inbound", data=form).json()["duplicate"] is True
+
+def test_failed_inline_inbound_is_not_marked_seen(monkeypatch):
+  def boom(messages):
+    raise RuntimeError("store down")
+  monkeypatch.setattr(app_module, "_process_inbound", boom)
+  form = {"From":"+13210000009","Body":"yes","MessageSid":"SM-fail-1"}
+  assert TestClient(app_module.app, raise_server_exceptions=False).post("/channels/inbound", data=form).status_code == 500
+  monkeypatch.undo()
+  assert client.post("/channels/inbound", data=form).json() == {"ok": True}
+
+def test_analytics_funnel_by_job_and_locale():
+  job_id = client.post("/jobs", json={"title":"t","location":"l","shift":"s","reqs":[]}).json()["job_id"]
+  client.post("/simulate/outreach", params={"job_id": job_id})
+  cid = client.post("/candidates", json={"name":"z","phone":"+15550004242","locale":"ar","job_id":job_id}).json()["candidate_id"]
+  client.post("/schedule/confirm", params={"candidate_id": cid})
+  assert client.post("/schedule/attendance", params={"candidate_id": cid, "showed": True}).json()["showed"] is True
+  r = client.get("/analytics/funnel", params={"group_by": "job,locale", "window": "7d", "job_id": job_id}).json()
+  groups = {g["locale"]: g for g in r["groups"]}
+  assert sum(g["contacted"] for g in groups.values()) == 25
+  assert groups["ar"]["scheduled"] >= 1 and groups["ar"]["showed"] == 1
+  assert r["totals"]["contacted"] == 25 and "replied" in r["totals"]["rates"]
+  assert client.get("/analytics/funnel", params={"group_by": "country"}).status_code == 400
+  assert client.get("/funnel", params={"job_id": job_id}).json()["showed"] == 1
+  sim = client.post("/simulate/hiring", params={"job_id": job_id, "reply_rate": 0.5}).json()
+  assert sim["rate_sources"] == {"reply_rate": "param", "qual_rate": "default", "show_rate": "observed"}
+  assert sim["rates"]["show_rate"] == 1.0
+
+def test_sla_heatmap_from_outreach_and_replies():
+  job_id = client.post("/jobs", json={"title":"t","location":"l","shift":"s","reqs":[]}).json()["job_id"]
+  for i in range(4):
+    client.post("/candidates", json={"name":f"S {i}","phone":f"+1777{i:07d}","locale":"ar","job_id":job_id})
+  r = client.post("/outreach/start", params={"job_id": job_id}).json()
+  for _ in range(200):
+    if client.get(f"/outreach/campaigns/{r['campaign_id']}").json()["state"] == "done":
+      break
+    time.sleep(0.02)
+  client.post("/channels/inbound", json={"From": "+17770000001", "Body": "hi", "MessageSid": f"sla-{job_id}"})
+  h = client.get("/metrics/sla-heatmap", params={"job_id": job_id, "locale": "ar", "percentiles": "50,95"}).json()
+  assert h["source"] == "audit" and h["totals"] == {"sent": 4, "replied": 1, "reply_rate": 0.25}
+  assert set(h["ttft_percentiles"]) == {"p50", "p95"} and len(h["reply_rate"]) == 7
+  assert client.get("/metrics/sla-heatmap", params={"percentiles": "120"}).status_code == 400
+
+def test_schedule_hold_confirm_release_and_capacity():
+  site = app_module.SCHEDULER.sites[0]
+  job_id = client.post("/jobs", json={"title":"t","location":site,"shift":"s","reqs":[]}).json()["job_id"]
+  cids = [client.post("/candidates", json={"name":f"K {i}","phone":f"+1888{i:07d}","locale":"en","job_id":job_id}).json()["candidate_id"] for i in range(3)]
+  before = client.get("/metrics/capacity").json()["next7"]
+  held = [client.post("/schedule/propose", params={"candidate_id": c}).json() for c in cids]
+  assert {h["site"] for h in held} == {site} and len({(h["slot"], h["interviewer"]) for h in held}) == 3
+  assert client.post("/schedule/propose", params={"candidate_id": cids[0]}).json()["slot"] == held[0]["slot"]
+  conf = client.post("/schedule/confirm", params={"candidate_id": cids[1]}).json()
+  assert conf["slot"] == held[1]["slot"] and conf["interviewer"] == held[1]["interviewer"]
+  assert client.post("/schedule/release", params={"candidate_id": cids[2]}).json()["ok"] is True
+  assert client.post("/schedule/release", params={"candidate_id": cids[2]}).status_code == 404
+  cap = client.get("/metrics/capacity").json()
+  assert sum(d["held"] for d in cap["next7"]) == sum(d["held"] for d in before) + 2
+  assert 0 <= cap["today"]["no_show_forecast"] <= 1 and site in cap["sites"]
+  packed = client.post("/actions/auto-pack-slots").json()
+  assert packed["ok"] is True and packed["interviewer_days_after"] <= packed["interviewer_days_before"]
+  assert client.post("/actions/auto-pack-slots", params={"site": "nowhere"}).status_code == 404
+
+def test_reconfirm_after_release_is_a_new_ats_write():
+  site = app_module.SCHEDULER.sites[0]
+  job_id = client.post("/jobs", json={"title":"t","location":site,"shift":"s","reqs":[]}).json()["job_id"]
+  cid = client.post("/candidates", json={"name":"R","phone":"+18890000001","locale":"en","job_id":job_id}).json()["candidate_id"]
+  first = client.post("/schedule/confirm", params={"candidate_id": cid}).json()["ats"]
+  assert client.post("/schedule/confirm", params={"candidate_id": cid}).json()["ats"]["key"] == first["key"]
+  assert client.post("/schedule/release", params={"candidate_id": cid}).json()["ok"] is True
+  again = client.post("/schedule/confirm", params={"candidate_id": cid}).json()["ats"]
+  assert again["key"] != first["key"] and again["status"] == "pending"
+
+def test_auto_pack_rewrites_moved_holds_to_the_ats():
+  sched = app_module.SCHEDULER
+  sched.add_site("PackSite", 10)
+  for i in range(2):
+    sched.add_interviewer(f"pack-{i}", "PackSite", range(7), (8, 18))
+  job_id = client.post("/jobs", json={"title":"t","location":"PackSite","shift":"s","reqs":[]}).json()["job_id"]
+  cids = [client.post("/candidates", json={"name":f"P {i}","phone":f"+1779{i:07d}","locale":"en","job_id":job_id}).json()["candidate_id"] for i in range(2)]
+  # both at 10:00 two days out, one per interviewer, then written to the ATS
+  day = (int(time.time()) // 86400 + 2) * 86400
+  held = [sched.hold(c, site="PackSite", not_before=day + 10 * 3600) for c in cids]
+  assert held[0].start == held[1].start and held[0].interviewer != held[1].interviewer
+  for c in cids:
+    assert client.post("/ops/force", json={"action": "ats_resync", "candidate_id": c}).json()["ok"] is True
+  enqueued = []
+  orig = app_module._enqueue_ats
+  app_module._enqueue_ats = lambda *a, **kw: enqueued.append((a, kw)) or orig(*a, **kw)
+  try:
+    packed = client.post("/actions/auto-pack-slots", params={"site": "PackSite"}).json()
+  finally:
+    app_module._enqueue_ats = orig
+  assert packed["moved"] == 1
+  m = packed["moves"][0]
+  assert m["to"] == sched.get(m["candidate_id"]).slot != m["from"]
+  assert m["ats"]["key"].startswith("move:")
+  assert [(a[0], a[2]) for a, _ in enqueued] == [(m["candidate_id"], m["to"])]
+
+def test_optimize_send_window_plans_and_campaign_follows():
+  job_id = client.post("/jobs", json={"title":"t","location":"l","shift":"s","reqs":[]}).json()["job_id"]
+  for i in range(3):
+    client.post("/candidates", json={"name":f"W {i}","phone":f"+1999{i:07d}","locale":"en","job_id":job_id})
+  r = client.post("/outreach/start", params={"job_id": job_id}).json()
+  for _ in range(200):
+    if client.get(f"/outreach/campaigns/{r['campaign_id']}").json()["state"] == "done":
+      break
+    time.sleep(0.02)
+  client.post("/channels/inbound", json={"From": "+19990000001", "Body": "hi", "MessageSid": f"sw-{job_id}"})
+  out = client.post("/actions/optimize-send-window", params={"job_id": job_id, "hourly_capacity": 100}).json()
+  assert out["ok"] is True and [(p["job_id"], p["locale"]) for p in out["plans"]] == [(job_id, "en")]
+  plan = out["plans"][0]
+  assert plan["volume"] == 3 and plan["planned"] == 3 and all(8 <= w["hour"] < 21 for w in plan["windows"])
+  assert client.post("/actions/optimize-send-window", params={"hourly_capacity": 0}).status_code == 400
+  c = client.post("/outreach/start", params={"job_id": job_id, "status": "contacted", "send_window": True}).json()
+  assert c["ok"] is True and c["count"] == 3 and "deferred" in c
+
+def test_hiring_sim_monte_carlo_and_sweep():
+  p = {"reply_rate": 0.35, "qual_rate": 0.25, "show_rate": 0.7, "target_openings": 200, "seed": 5, "trials": 20000}
+  mc = client.post("/simulate/hiring", params={**p, "mode": "monte_carlo", "target_weeks": 3}).json()
+  assert mc["mode"] == "monte_carlo" and mc["monte_carlo"]["trials"] == 20000
+  assert mc["monte_carlo"]["hires_per_week"]["p10"] <= mc["hires_per_week"] <= mc["monte_carlo"]["hires_per_week"]["p95"]
+  assert 0 <= mc["monte_carlo"]["p_fill_by_target"] <= 1
+  sw = client.post("/simulate/hiring", params={**p, "mode": "sweep", "vol_grid": "200,500", "capacity_grid": "20-40/20"}).json()
+  assert [(s["vol_per_day"], s["interviewer_capacity"]) for s in sw["sweep"]["scenarios"]] == [(200, 20), (200, 40), (500, 20), (500, 40)]
+  assert client.post("/simulate/hiring", params={"mode": "bogus"}).status_code == 400
+  assert client.post("/simulate/hiring", params={**p, "mode": "monte_carlo", "reply_rate": 2}).status_code == 400
+
+def test_import_survives_unreachable_database():
+  # the CREATE TABLE calls run at import time and must log, not crash, when the db is down
+  root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+  env = dict(os.environ, DATABASE_URL="sqlite:////nonexistent_dir/x.db", LOG_ASYNC="false")
+  p = subprocess.run([sys.executable, "-c", "import apps.orchestrator.main"], cwd=root, env=env,
+                     capture_output=True, text=True, timeout=120)
+  assert p.returncode == 0, p.stderr
+  assert '"type": "db_error"' in p.stderr
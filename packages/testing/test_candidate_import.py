@@ -0,0 +1,39 @@
+import importlib, threading, time
+from typing import Optional
+
+from pydantic import BaseModel
+
+imp = importlib.import_module("apps.orchestrator.candidate_import")
+
+
+class Row(BaseModel):
+    name: str
+    phone: str
+    locale: Optional[str] = None
+
+
+def _file(tmp_path, name, n):
+    path = tmp_path / name
+    path.write_text("name,phone\n" + "".join(f"R {i},+1{i:07d}\n" for i in range(n)))
+    return str(path)
+
+
+def test_running_imports_are_never_evicted(tmp_path):
+    gate, applied = threading.Event(), []
+
+    def apply(rows):
+        gate.wait(5.0)
+        applied.extend(rows)
+
+    im = imp.CandidateImporter(Row, apply, exists=lambda k: False, key=lambda p: p or "", keep_jobs=1)
+    jobs = [im.start(_file(tmp_path, f"{i}.csv", 3), f"{i}.csv", imp.CSV) for i in range(3)]
+    time.sleep(0.05)
+    assert jobs[0].status == "running"
+    assert [im.get(j.id) for j in jobs] == jobs  # over keep_jobs, but none has finished
+    gate.set()
+    deadline = time.monotonic() + 5.0
+    while any(j.finished_at is None for j in jobs) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    im.close()
+    assert all(j.status == "done" for j in jobs) and len(applied) == 9
+    assert list(im.jobs) == [jobs[2].id]  # finished ones are trimmed back to keep_jobs, oldest first
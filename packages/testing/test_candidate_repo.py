@@ -0,0 +1,66 @@
+import importlib
+
+repo_mod = importlib.import_module("apps.orchestrator.candidate_repo")
+
+
+def test_phone_index_normalizes_and_tracks_updates():
+    r = repo_mod.CandidateRepo()
+    r["a"] = {"name": "A", "phone": "+1 555-0100", "locale": "en", "status": "contacted", "job_id": "j1"}
+    r["b"] = {"name": "B", "phone": "+15550101", "locale": "ar", "status": "contacted", "job_id": "j1"}
+    assert r.by_phone("whatsapp:+15550100")[0] == "a"
+    r.update("a", phone="+15550199")
+    assert r.by_phone("+15550100") == (None, None)
+    assert r.by_phone("15550199")[0] == "a"
+
+
+def test_filtered_ids_follow_status_changes():
+    r = repo_mod.CandidateRepo()
+    for i in range(10):
+        r.add(f"c{i}", {"phone": f"+1{i}", "locale": "ar" if i % 2 else "en", "status": "contacted", "job_id": "j1" if i < 5 else "j2"})
+    r.update("c1", status="qualified")
+    r.update("c3", status="qualified")
+    r.update("c6", status="qualified")
+    assert r.ids_where(status="qualified", locale="ar", job_id="j1") == ["c1", "c3"]
+    assert r.count_where("status", "contacted") == 7
+    r.remove("c3")
+    assert r.ids_where(status="qualified") == ["c1", "c6"]
+    assert len(r) == 9
+
+
+def test_rows_round_trip_and_indexes_survive_churn():
+    r = repo_mod.CandidateRepo()
+    r["x"] = {"name": "X", "phone": "+1 555 0000", "status": "new", "notes": {"src": "csv"}}
+    assert r["x"] == {"name": "X", "phone": "+1 555 0000", "status": "new", "notes": {"src": "csv"}}
+    r.update("x", locale="ar")
+    assert r.ids_where(locale="ar") == ["x"] and r.ids_where(locale=None, status="new") == ["x"]
+    for i in range(200):  # bounce a status back and forth so buckets accumulate stale rows
+        r.update("x", status="contacted" if i % 2 == 0 else "new")
+    assert r.ids_where(status="new") == ["x"] and r.ids_where(status="contacted") == []
+    assert r.count_where("status", "new") == 1
+    assert r.ids_where(status="never-seen") == [] and r.count_where("job_id", "j9") == 0
+    r["y"] = {"phone": "0555 0000"}
+    assert r.by_phone("5550000")[0] is None and r.by_phone("05550000")[0] == "y"
+
+
+def test_replacing_a_record_without_phone_drops_it_from_the_phone_index():
+    r = repo_mod.CandidateRepo()
+    r["a"] = {"name": "A", "phone": "+15550001", "status": "new"}
+    r["a"] = {"name": "A2", "status": "new"}
+    assert r.by_phone("+15550001") == (None, None)
+    assert r["a"] == {"name": "A2", "status": "new"}
+    r["b"] = {"name": "B", "phone": "+15550001", "status": "new"}
+    assert r.by_phone("+15550001")[0] == "b"
+    r["a"] = {"name": "A3", "phone": "+15550002", "status": "new"}
+    assert r.by_phone("+15550002")[0] == "a" and r.by_phone("+15550001")[0] == "b"
+
+
+def test_reads_are_read_only():
+    r = repo_mod.CandidateRepo()
+    r["a"] = {"name": "A", "phone": "+15550100", "status": "new"}
+    for row in (r["a"], r.get("a"), r.by_phone("+15550100")[1], next(iter(r.values())), r.update("a", status="contacted")):
+        try:
+            row["status"] = "stale"
+            assert False, "expected TypeError"
+        except TypeError:
+            pass
+    assert r["a"]["status"] == "contacted" and r.get("zz", {}) == {}
@@ -0,0 +1,57 @@
+import asyncio, importlib
+import httpx
+
+connector = importlib.import_module("apps.channel-connector.main")
+channel_client = importlib.import_module("apps.orchestrator.channel_client")
+
+
+def test_batch_send_returns_results_and_provider_ids():
+    from fastapi.testclient import TestClient
+    c = TestClient(connector.app)
+    r = c.post("/send/batch", json={"messages": [
+        {"to": "+1", "body": "a", "ref": "c1"},
+        {"to": "+2", "body": "b", "channel": "whatsapp"},
+        {"body": "no recipient", "ref": "c3"},
+    ]})
+    assert r.status_code == 200
+    data = r.json()
+    assert [x["ok"] for x in data["results"]] == [True, True, False]
+    assert data["results"][2]["ref"] == "c3"
+    assert set(data["provider_ids"]) == {"c1", "1"} and data["sent"] == 2 and data["failed"] == 1
+    assert c.post("/send", json={"to": "+1", "body": "x"}).json()["ok"] is True
+
+
+def test_dispatcher_caps_per_channel_concurrency():
+    d = connector.ProviderDispatcher(None, {"sms": 3})
+    peak = {"now": 0, "max": 0}
+
+    async def slow(msg):
+        peak["now"] += 1
+        peak["max"] = max(peak["max"], peak["now"])
+        await asyncio.sleep(0.01)
+        peak["now"] -= 1
+        return "id"
+
+    d._mock_send = slow
+
+    async def run():
+        msgs = [connector.Outbound(to=str(i), body="x") for i in range(20)]
+        return await asyncio.gather(*(d.send(m) for m in msgs))
+
+    assert all(r["ok"] for r in asyncio.run(run()))
+    assert peak["max"] == 3
+
+
+def test_channel_client_batch_over_pool():
+    client = channel_client.ChannelClient("http://channels", transport=httpx.ASGITransport(app=connector.app))
+    seen = []
+    client.on_response = lambda url, status, s: seen.append((url, status))
+
+    async def run():
+        res = await client.send_batch([{"to": f"+{i}", "body": "hi", "ref": f"c{i}"} for i in range(25)])
+        await client.aclose()
+        return res
+
+    res = asyncio.run(run())
+    assert len(res["results"]) == 25 and len(res["provider_ids"]) == 25
+    assert seen == [("http://channels/send/batch", 200)]
@@ -0,0 +1,92 @@
+import asyncio, importlib
+
+store_mod = importlib.import_module("apps.orchestrator.audit_store")
+writer_mod = importlib.import_module("apps.orchestrator.audit_writer")
+hub_mod = importlib.import_module("apps.orchestrator.event_hub")
+
+
+def _setup(**kw):
+    store = store_mod.MemoryAuditStore()
+    writer = writer_mod.AuditWriter(store, "s")
+    hub = hub_mod.EventHub(store, **kw)
+    writer.add_listener(hub.publish)
+    return store, writer, hub
+
+
+def test_live_push_filter_and_resume():
+    store, writer, hub = _setup()
+
+    async def run():
+        sub, backlog = hub.subscribe(actions="ats.*", candidate_id="c1")
+        assert [x async for x in backlog] == []
+        writer.submit("agent", "outreach.sent", {"candidate_id": "c1"})
+        writer.submit("agent", "ats.write", {"candidate_id": "c2"})
+        writer.submit("agent", "ats.write", {"candidate_id": "c1"})
+        items, dropped = await asyncio.wait_for(sub.get(), 2.0)
+        assert [(i, e["action"]) for i, e, _ in items] == [(2, "ats.write")] and dropped == 0
+        sub.close()
+        # resume after event 0 replays the rest from the store, then goes live
+        sub2, backlog = hub.subscribe(last_event_id=0)
+        assert [i async for i, _, _ in backlog] == [1, 2]
+        writer.submit("agent", "ats.retry", {"candidate_id": "c1"})
+        items, _ = await asyncio.wait_for(sub2.get(), 2.0)
+        assert [i for i, _, _ in items] == [3]
+        assert hub.subscriber_count == 1
+        sub2.close()
+        assert hub.subscriber_count == 0
+
+    asyncio.run(run())
+    writer.close()
+
+
+def test_slow_consumer_drop_and_disconnect():
+    store, writer, hub = _setup(max_queue=2)
+
+    async def run():
+        sub, _ = hub.subscribe()
+        for n in range(5):
+            writer.submit("agent", "outreach.sent", {"n": n})
+        writer.drain()
+        await asyncio.sleep(0.05)
+        items, dropped = await sub.get()
+        assert [i for i, _, _ in items] == [3, 4] and dropped == 3
+        sub.close()
+
+        hub.policy = hub_mod.DISCONNECT
+        slow, _ = hub.subscribe()
+        for n in range(3):
+            writer.submit("agent", "outreach.sent", {"n": n})
+        writer.drain()
+        await asyncio.sleep(0.05)
+        try:
+            await slow.get()
+            assert False, "expected disconnect"
+        except hub_mod.SlowConsumer:
+            pass
+        assert hub.subscriber_count == 0
+
+    asyncio.run(run())
+    writer.close()
+
+
+def test_resume_is_capped_and_paged():
+    store, writer, hub = _setup(max_replay=3)
+    for n in range(5):
+        writer.submit("agent", "outreach.sent" if n % 2 else "ats.write", {"n": n})
+    writer.drain()
+
+    async def run():
+        sub, backlog = hub.subscribe(last_event_id=0)
+        assert sub.skipped == 1
+        assert [i async for i, _, _ in backlog] == [2, 3, 4]
+        sub.close()
+        hub_mod.REPLAY_PAGE, page = 1, hub_mod.REPLAY_PAGE
+        try:
+            sub, backlog = hub.subscribe(actions="ats.*", last_event_id=1)
+            assert sub.skipped == 0 and [i async for i, _, _ in backlog] == [2, 4]
+            sub.close()
+        finally:
+            hub_mod.REPLAY_PAGE = page
+
+    asyncio.run(run())
+    writer.close()
@@ -0,0 +1,73 @@
+import importlib
+
+counters_mod = importlib.import_module("apps.orchestrator.funnel_counters")
+repo_mod = importlib.import_module("apps.orchestrator.candidate_repo")
+
+
+def _live_run():
+    repo, counters, log = repo_mod.CandidateRepo(), counters_mod.FunnelCounters(), []
+    repo.add_listener(counters.on_candidate)
+
+    def audit(action, **payload):
+        e = {"action": action, "payload": payload}
+        log.append(e)
+        counters.on_audit([e])
+
+    for i in range(4):
+        repo[f"c{i}"] = {"phone": f"+1555000{i}", "status": "contacted", "job_id": "j1"}
+        audit("outreach.sent", job_id="j1", candidate_id=f"c{i}", cost_usd=0.01)
+    for cid, qualified in (("c0", True), ("c1", True), ("c2", False)):
+        repo.update(cid, consent=True)
+        audit("consent.captured", candidate_id=cid)
+        repo.update(cid, status="qualified" if qualified else "disqualified")
+        audit("qualification.done", candidate_id=cid, qualified=qualified)
+    for cid in ("c0", "c1"):
+        audit("ats.write", candidate_id=cid, job_id="j1")
+    return counters, log
+
+
+def test_rebuild_from_audit_log_alone_matches_live_counters():
+    live, log = _live_run()
+    restarted = counters_mod.FunnelCounters()
+    restarted.rebuild(repo_mod.CandidateRepo(), log)  # the repo is empty after a restart
+    for job in (None, "j1"):
+        snap = restarted.snapshot(job)
+        assert snap == live.snapshot(job)
+        assert snap["scheduled"] <= snap["qualified"] <= snap["consented"] <= snap["contacted"] == 4
+    assert restarted.jobs() == ["j1"]
+
+
+def test_reloaded_candidate_replaces_its_derived_state():
+    live, log = _live_run()
+    restarted, repo = counters_mod.FunnelCounters(), repo_mod.CandidateRepo()
+    restarted.rebuild(repo, log)
+    repo.add_listener(restarted.on_candidate)
+    repo["c3"] = {"phone": "+15550003", "status": "qualified", "consent": True, "job_id": "j1"}
+    snap = restarted.snapshot("j1")
+    assert (snap["candidates"], snap["contacted"], snap["consented"], snap["qualified"]) == (4, 4, 4, 3)
+    repo["c9"] = {"phone": "+15550009", "status": "new", "job_id": "j1"}
+    assert restarted.snapshot("j1")["candidates"] == 5
+
+
+def test_rebuild_covers_created_status_and_confirmed_schedules():
+    repo, live, log = repo_mod.CandidateRepo(), counters_mod.FunnelCounters(), []
+    repo.add_listener(live.on_candidate)
+
+    def audit(action, **payload):
+        e = {"action": action, "payload": payload}
+        log.append(e)
+        live.on_audit([e])
+
+    # created straight into a later stage, no outreach event
+    repo["d0"] = {"phone": "+15551000", "status": "qualified", "consent": True, "job_id": "j2"}
+    audit("candidate.created", candidate_id="d0", **repo["d0"])
+    repo["d1"] = {"phone": "+15551001", "status": "new", "consent": False, "job_id": "j2"}
+    audit("candidate.created", candidate_id="d1", **repo["d1"])
+    # confirmed without a prior outreach.sent
+    repo.update("d1", status="scheduled")
+    audit("schedule.confirmed", candidate_id="d1", slot="2026-01-01T09:00", site="s", interviewer="i")
+    before = {job: live.snapshot(job) for job in (None, "j2")}
+    restarted = counters_mod.FunnelCounters()
+    restarted.rebuild(repo_mod.CandidateRepo(), log)
+    assert {job: restarted.snapshot(job) for job in (None, "j2")} == before
+    assert before["j2"]["contacted"] == 2 and before["j2"]["qualified"] == 1
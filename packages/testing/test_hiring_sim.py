@@ -0,0 +1,54 @@
+import importlib
+
+import numpy as np
+import pytest
+
+sim = importlib.import_module("apps.orchestrator.hiring_sim")
+
+BASE = dict(reply_rate=0.35, qual_rate=0.25, show_rate=0.7)
+
+
+def test_daily_distribution_matches_direct_binomial_draws():
+    day = sim.daily_distribution(500, 0.35 * 0.25, 0.7 * sim.OFFER_ACCEPT_RATE, 40)
+    pmf, off = day["hires"]
+    assert abs(pmf.sum() - 1.0) < 1e-9
+    rng = np.random.default_rng(7)
+    direct = rng.binomial(np.minimum(rng.binomial(500, 0.35 * 0.25, 400_000), 40), 0.7 * sim.OFFER_ACCEPT_RATE)
+    assert abs((pmf * (off + np.arange(len(pmf)))).sum() - direct.mean()) < 0.05
+    sched, s0 = day["interviews"]
+    assert s0 + len(sched) - 1 == 40  # interviews never exceed capacity
+
+
+def test_monte_carlo_percentiles_and_time_to_fill():
+    r = sim.simulate(500, interviewer_capacity=50, target_openings=400, trials=100_000, seed=1, target_weeks=4, **BASE)
+    hw = r["hires_per_week"]
+    assert abs(hw["mean"] - 5 * 500 * 0.35 * 0.25 * 0.7 * 0.6) < 2  # capacity rarely binds at 50
+    assert hw["p5"] < hw["p50"] < hw["p95"]
+    ttf = r["time_to_fill_weeks"]
+    assert ttf["p5"] <= ttf["p50"] <= ttf["p95"] and ttf["p50"] in (4, 5)
+    assert 0 < r["p_fill_by_target"] < 1 and r["p_unfilled_within_horizon"] == 0.0
+    assert sim.simulate(500, interviewer_capacity=50, target_openings=400, trials=100_000, seed=1,
+                        target_weeks=4, **BASE)["time_to_fill_weeks"] == ttf  # seeded: reproducible
+    never = sim.simulate(10, interviewer_capacity=50, target_openings=10_000, trials=1000, seed=1, horizon_weeks=8,
+                         **BASE)
+    assert never["time_to_fill_weeks"]["p50"] is None and never["p_unfilled_within_horizon"] == 1.0
+
+
+def test_sweep_grid_is_deterministic_across_a_pool():
+    kw = dict(trials=20_000, seed=3, target_openings=200, **BASE)
+    local = sim.sweep([200, 400], [20, 50], workers=1, **kw)
+    pooled = sim.sweep([200, 400], [20, 50], workers=2, parallel_min_draws=0, **kw)
+    sim.shutdown_pool()
+    strip = lambda out: [{k: v for k, v in s.items() if k != "elapsed_ms"} for s in out["scenarios"]]
+    assert pooled["workers"] == 2 and strip(pooled) == strip(local)
+    assert [(s["vol_per_day"], s["interviewer_capacity"]) for s in local["scenarios"]] == \
+        [(200, 20), (200, 50), (400, 20), (400, 50)]
+    by = {(s["vol_per_day"], s["interviewer_capacity"]): s["hires_per_week"]["mean"] for s in local["scenarios"]}
+    assert by[(400, 20)] < by[(400, 50)]  # capacity-bound
+
+
+def test_parse_grid():
+    assert sim.parse_grid("100-300/100, 50,100") == [50, 100, 200, 300]
+    assert sim.parse_grid(None) == []
+    with pytest.raises(ValueError):
+        sim.parse_grid("a,b")
@@ -0,0 +1,89 @@
+import importlib, json, threading, time
+import httpx
+
+inbound = importlib.import_module("apps.orchestrator.inbound")
+connector = importlib.import_module("apps.channel-connector.main")
+
+
+def test_ttl_cache_is_bounded_and_expires():
+    c = inbound.TTLCache(max_items=3, ttl_s=0.05)
+    assert c.add("a") and not c.add("a")
+    for k in "bcd":
+        c.add(k)
+    assert len(c) == 3 and c.add("a")  # "a" was evicted by size
+    time.sleep(0.06)
+    assert c.add("b") and len(c) == 1
+
+
+def test_pipeline_dedupes_retries_and_rejects_when_full():
+    seen, gate = [], threading.Event()
+
+    def handle(batch):
+        gate.wait(2.0)
+        seen.extend(m["id"] for m in batch)
+
+    p = inbound.InboundPipeline(handle, workers=2, max_queue=4)
+    msgs = [{"id": f"m{i}", "from": "+1", "body": "hi"} for i in range(3)]
+    assert p.submit(msgs + [msgs[0]]) == {"accepted": 3, "duplicates": 1}
+    assert p.submit(msgs) == {"accepted": 0, "duplicates": 3}
+    try:
+        p.submit([{"id": "x1"}, {"id": "x2"}])
+        assert False, "expected QueueFull"
+    except inbound.QueueFull:
+        pass
+    gate.set()
+    assert p.drain(2.0) and sorted(seen) == ["m0", "m1", "m2"]
+    # the rejected batch was forgotten, so the provider's retry goes through
+    assert p.submit([{"id": "x1"}, {"id": "x2"}])["accepted"] == 2
+    p.close()
+
+
+def test_connector_forwards_in_batches_with_retry():
+    posts, fail = [], {"n": 1}
+
+    def respond(request):
+        if fail["n"]:
+            fail["n"] -= 1
+            return httpx.Response(503)
+        posts.append(len(json.loads(request.content)["messages"]))
+        return httpx.Response(202, json={"ok": True})
+
+    fw = connector.InboundForwarder("http://orch", batch_max=10, flush_s=0.02, transport=httpx.MockTransport(respond))
+    for i in range(25):
+        assert fw.offer({"id": f"m{i}", "from": "+1", "body": "YES"})
+    deadline = time.monotonic() + 3.0
+    while fw.forwarded < 25 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    fw.close()
+    assert fw.forwarded == 25 and sum(posts) == 25 and max(posts) <= 10
+
+
+def test_failed_batch_is_forgotten_so_the_retry_is_processed():
+    seen, fail = [], {"n": 1}
+
+    def handle(batch):
+        if fail["n"]:
+            fail["n"] -= 1
+            raise RuntimeError("db down")
+        seen.extend(m["id"] for m in batch)
+
+    p = inbound.InboundPipeline(handle, workers=1)
+    msgs = [{"id": "m1"}, {"id": "m2"}]
+    assert p.submit(msgs)["accepted"] == 2
+    assert p.drain(2.0) and seen == []
+    assert p.submit(msgs) == {"accepted": 2, "duplicates": 0}
+    assert p.drain(2.0) and seen == ["m1", "m2"]
+    p.close()
+
+
+def test_workers_handle_batches_concurrently():
+    both_in = threading.Barrier(2, timeout=2.0)
+
+    def handle(batch):
+        both_in.wait()  # passes only while two batches are being handled at once
+
+    p = inbound.InboundPipeline(handle, workers=2)
+    p.submit([{"id": "a"}])
+    p.submit([{"id": "b"}])
+    assert p.drain(3.0) and p.processed == 2 and not both_in.broken
+    p.close()
@@ -0,0 +1,53 @@
+import importlib
+import json
+import logging
+import threading
+import time
+
+json_log = importlib.import_module("apps.orchestrator.json_log")
+
+
+class SlowStream:
+    def __init__(self, delay=0.0):
+        self.delay, self.lines, self.gate = delay, [], threading.Event()
+
+    def write(self, s):
+        self.gate.wait(5)
+        time.sleep(self.delay)
+        self.lines.append(s)
+
+    def flush(self):
+        pass
+
+
+def test_sampling_keeps_errors_and_counts_drops():
+    out = SlowStream()
+    out.gate.set()
+    drops = []
+    log = json_log.JsonLog("test.sampling", sample_rates={"request_log": 0.0, "other": 0.5}, stream=out,
+                           on_drop=lambda reason, t: drops.append((reason, t)))
+    log.event("request_log", status=200)
+    log.event("request_log", keep=True, status=503)
+    log.event("request_log", logging.ERROR, status=500)
+    log.event("audit", action="x")
+    lines = [json.loads(s) for s in "".join(out.lines).splitlines()]
+    assert [(r["type"], r.get("status")) for r in lines] == [("request_log", 503), ("request_log", 500), ("audit", None)]
+    assert lines[1]["level"] == "ERROR" and "ts" in lines[0]
+    assert drops == [("sampled", "request_log")] and log.dropped == {"sampled:request_log": 1}
+
+
+def test_slow_writer_never_blocks_callers_and_overflow_is_dropped():
+    out = SlowStream()
+    log = json_log.JsonLog("test.queue", max_queue=10, stream=out)
+    log.start()
+    t0 = time.perf_counter()
+    for i in range(50):  # the writer is stuck on the first line
+        log.event("request_log", i=i)
+    assert time.perf_counter() - t0 < 0.5
+    assert log.dropped["queue_full:request_log"] >= 39
+    out.gate.set()
+    log.stop()  # drains the queue
+    written = len("".join(out.lines).splitlines())
+    assert written + log.dropped["queue_full:request_log"] == 50
+    log.event("request_log", i=50)  # synchronous again after stop()
+    assert json.loads(out.lines[-1])["i"] == 50
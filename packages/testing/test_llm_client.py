@@ -0,0 +1,81 @@
+import asyncio
+import importlib
+import json
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+llm_client = importlib.import_module("apps.orchestrator.llm_client")
+
+
+def _provider(state, tokens=5, delay=0.05):
+    async def completions(request):
+        body = await request.json()
+        state["open"] += 1
+        state["peak"] = max(state["peak"], state["open"])
+        state["auth"] = request.headers.get("Authorization")
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        try:
+            await asyncio.sleep(delay)
+            for i in range(min(tokens, body["max_tokens"])):
+                chunk = {"choices": [{"delta": {"content": f"t{i} "}}]}
+                await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await resp.write(b"data: [DONE]\n\n")
+        finally:
+            state["open"] -= 1
+        return resp
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    return app
+
+
+def test_stream_records_stats_and_caps_concurrency():
+    state = {"open": 0, "peak": 0}
+    done, waits = [], []
+
+    async def run():
+        async with TestServer(_provider(state)) as srv:
+            llm = llm_client.LlmClient(str(srv.make_url("/v1")), "key", "m", max_tokens=4, max_concurrency=3,
+                                       on_admit=waits.append, on_done=done.append)
+
+            async def one():
+                st = {}
+                return "".join([d async for d in llm.stream([{"role": "user", "content": "hi"}], st)]), st
+            res = await asyncio.gather(*(one() for _ in range(10)))
+            await llm.aclose()
+            return res
+
+    res = asyncio.run(run())
+    assert all(text == "t0 t1 t2 t3 " for text, _ in res)
+    assert state["peak"] == 3 and state["auth"] == "Bearer key"
+    st = res[0][1]
+    assert st["outcome"] == "ok" and st["tokens"] == 4 and st["ttft_s"] >= 0.05 and st["tokens_per_s"] > 0
+    assert len(done) == len(waits) == 10 and max(waits) >= 0.05  # later chats queued for a slot
+
+
+def test_queue_full_and_queue_timeout_raise_busy():
+    state = {"open": 0, "peak": 0}
+    done = []
+
+    async def run():
+        async with TestServer(_provider(state, delay=0.3)) as srv:
+            llm = llm_client.LlmClient(str(srv.make_url("/v1")), None, "m", max_concurrency=1, max_queue=1,
+                                       queue_timeout_s=0.1, on_done=done.append)
+
+            async def one():
+                try:
+                    async for _ in llm.stream([]):
+                        pass
+                    return "ok"
+                except llm_client.LlmBusy as e:
+                    return str(e)
+            res = await asyncio.gather(*(one() for _ in range(3)))
+            assert llm.in_flight == 0 and llm.waiting == 0
+            await llm.aclose()
+            return res
+
+    assert asyncio.run(run()) == ["ok", "LLM queue wait timed out", "LLM queue full"]
+    assert sorted(d["outcome"] for d in done) == ["busy", "busy", "ok"]
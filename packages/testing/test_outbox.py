@@ -0,0 +1,117 @@
+import asyncio, importlib, threading, time
+
+outbox_mod = importlib.import_module("apps.orchestrator.outbox")
+
+
+def test_retries_with_per_partition_order():
+    seen, fails = [], {"a": 2}
+    lock = threading.Lock()
+
+    async def send(item):
+        p = item["payload"]
+        await asyncio.sleep(0)
+        with lock:
+            if fails.get(p["cid"], 0) > 0:
+                fails[p["cid"]] -= 1
+                raise RuntimeError("ats down")
+            seen.append((p["cid"], p["n"]))
+        return {"ok": True}
+
+    ob = outbox_mod.Outbox(send, workers=4, base_backoff_s=0.01, max_backoff_s=0.02)
+    dead, outcomes = [], {"ok": 0, "retry": 0}
+    ob.on_dead = lambda item, err: dead.append(item)
+    ob.on_success = lambda item, result: outcomes.update(ok=outcomes["ok"] + 1)
+    ob.on_retry = lambda item, err, delay: outcomes.update(retry=outcomes["retry"] + 1)
+    for n in range(3):
+        for cid in ("a", "b"):
+            ob.enqueue("ats.application", cid, {"cid": cid, "n": n})
+    assert ob.enqueue("ats.application", "a", {"cid": "a", "n": 0})["duplicate"] is True
+    assert ob.drain(5.0)
+    assert [n for cid, n in seen if cid == "a"] == [0, 1, 2]
+    assert [n for cid, n in seen if cid == "b"] == [0, 1, 2]
+    assert outcomes == {"ok": 6, "retry": 2} and not dead
+    assert ob.depth == 0 and ob.lag_seconds == 0.0
+    ob.close()
+
+
+def test_pending_items_survive_restart(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    gate = threading.Event()
+
+    async def blocked(item):
+        await asyncio.get_running_loop().run_in_executor(None, gate.wait, 5.0)
+        raise RuntimeError("shutting down")
+
+    ob = outbox_mod.Outbox(blocked, path=path, workers=1, base_backoff_s=60)
+    ob.enqueue("ats.application", "c1", {"cid": "c1"})
+    ob.enqueue("ats.application", "c2", {"cid": "c2"})
+    gate.set()
+    ob.close()
+
+    delivered = []
+
+    async def ok(item):
+        delivered.append(item["payload"]["cid"])
+        return {}
+
+    ob2 = outbox_mod.Outbox(ok, path=path, workers=2)
+    assert ob2.depth == 2
+    ob2.start()
+    assert ob2.drain(5.0)
+    assert sorted(delivered) == ["c1", "c2"]
+    ob2.close()
+
+
+def test_dead_write_is_delivered_again_when_enqueued_again():
+    up = {"ok": False}
+
+    async def send(item):
+        if not up["ok"]:
+            raise RuntimeError("ats down")
+        return {"ok": True}
+
+    ob = outbox_mod.Outbox(send, workers=1, max_attempts=2, base_backoff_s=0.01, max_backoff_s=0.01)
+    dead, delivered = [], []
+    ob.on_dead = lambda item, err: dead.append(item["key"])
+    ob.on_success = lambda item, result: delivered.append((item["key"], item["attempts"]))
+    first = ob.enqueue("ats.application", "c1", {"cid": "c1", "slot": "s1"})
+    assert ob.drain(5.0) and dead == [first["key"]]
+    up["ok"] = True
+    again = ob.enqueue("ats.application", "c1", {"cid": "c1", "slot": "s1"})
+    assert again == {"seq": first["seq"], "key": first["key"], "status": "pending", "duplicate": False}
+    assert ob.drain(5.0) and delivered == [(first["key"], 1)]
+    assert ob.enqueue("ats.application", "c1", {"cid": "c1", "slot": "s1"})["status"] == "done"
+    ob.close()
+
+
+def test_close_closes_clients_opened_on_the_outbox_loop():
+    import httpx
+    ats_client = importlib.import_module("apps.orchestrator.ats_client")
+    client = ats_client.AtsClient("http://ats", transport=httpx.MockTransport(lambda r: httpx.Response(200, json={})))
+
+    async def send(item):
+        return await client.create_application(item["payload"]["cid"], "j", "s", prefer_connector=False)
+
+    ob = outbox_mod.Outbox(send, workers=1)
+    ob.on_close = client.aclose
+    ob.enqueue("ats.application", "c1", {"cid": "c1"})
+    assert ob.drain(5.0)
+    (http,) = [st[0] for st in client._loops.values()]
+    ob.close()
+    assert http.is_closed and len(client._loops) == 0
+
+
+def test_finished_rows_are_pruned_after_retention():
+    async def send(item):
+        return {"ok": True}
+
+    ob = outbox_mod.Outbox(send, workers=1, retention_s=60.0)
+    first = ob.enqueue("ats.application", "c1", {"cid": "c1", "slot": "s1"})
+    assert ob.drain(5.0)
+    assert ob.prune() == 0  # still inside the retention window
+    assert ob.enqueue("ats.application", "c1", {"cid": "c1", "slot": "s1"})["duplicate"] is True
+    assert ob.prune(now=time.time() + 61.0) == 1
+    again = ob.enqueue("ats.application", "c1", {"cid": "c1", "slot": "s1"})
+    assert again["duplicate"] is False and again["key"] == first["key"]
+    assert ob.drain(5.0)
+    ob.close()
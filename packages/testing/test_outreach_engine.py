@@ -0,0 +1,89 @@
+import asyncio, importlib, time
+
+engine_mod = importlib.import_module("apps.orchestrator.outreach_engine")
+
+
+def test_channel_rate_limit_and_pause_resume():
+    sent = []
+
+    async def send(campaign, cids):
+        await asyncio.sleep(0)
+        return [None if cid == "skip" else {"id": cid} for cid in cids]
+
+    eng = engine_mod.OutreachEngine(send, channel_rates={"sms": 100}, provider_rates={"twilio": 1000},
+                                    concurrency=8, batch_size=4)
+    eng.on_sent = lambda c, delivered: sent.extend(cid for cid, _ in delivered)
+    # bucket starts full (100 tokens), so 150 messages need ~0.5s of refill
+    targets = [f"c{i}" for i in range(150)] + ["skip"]
+    t0 = time.monotonic()
+    c = eng.start("job", "sms", "twilio", targets, "hi")
+    assert eng.wait(c.id, 5.0)
+    assert time.monotonic() - t0 >= 0.45
+    d = c.to_dict()
+    assert (d["state"], d["sent"], d["skipped"], d["progress"]) == ("done", 150, 1, 1.0)
+    assert sorted(sent) == sorted(targets[:-1])
+
+    # the channel bucket is shared: a second campaign starts with an empty bucket
+    c2 = eng.start("job", "sms", "twilio", [f"d{i}" for i in range(60)], "hi")
+    time.sleep(0.1)
+    eng.pause(c2.id)
+    time.sleep(0.05)
+    paused_at = c2.done
+    time.sleep(0.2)
+    assert c2.state == "paused" and c2.done <= paused_at + 32  # only in-flight sends complete
+    eng.resume(c2.id)
+    assert eng.wait(c2.id, 5.0) and c2.sent == 60
+    eng.close()
+
+
+def test_window_hook_defers_targets():
+    order = []
+
+    async def send(campaign, cids):
+        order.extend(cids)
+        return [{"id": cid} for cid in cids]
+
+    eng = engine_mod.OutreachEngine(send, concurrency=2, batch_size=3)
+    later = time.time() + 0.3
+    eng.window = lambda c, cid: later if cid.startswith("late") else 0.0
+    c = eng.start("job", "sms", "twilio", ["late0", "a", "late1", "b", "c"], "hi")
+    time.sleep(0.1)
+    assert c.sent == 3 and c.to_dict()["deferred"] == 2 and c.state == "running"
+    assert eng.wait(c.id, 5.0) and time.time() >= later
+    assert c.sent == 5 and sorted(order[3:]) == ["late0", "late1"] and c.to_dict()["deferred"] == 0
+    eng.close()
+
+
+def test_skipped_targets_take_no_tokens():
+    async def send(campaign, cids):
+        return [None if cid.startswith("late") else {"id": cid} for cid in cids]
+
+    eng = engine_mod.OutreachEngine(send, channel_rates={"sms": 10}, concurrency=1, batch_size=5)
+    eng.eligible = lambda c, cid: not cid.startswith("gone")
+    # 10 tokens to start with: 100 ineligible and 5 raced-out targets must not eat into them
+    targets = [f"gone{i}" for i in range(100)] + [f"late{i}" for i in range(5)] + [f"c{i}" for i in range(10)]
+    t0 = time.monotonic()
+    c = eng.start("job", "sms", "twilio", targets, "hi")
+    assert eng.wait(c.id, 5.0)
+    assert time.monotonic() - t0 < 0.3
+    assert (c.sent, c.skipped) == (10, 105)
+    eng.close()
+
+
+def test_only_finished_campaigns_are_evicted():
+    gate = asyncio.Event()
+
+    async def send(campaign, cids):
+        if campaign.meta.get("hold"):
+            await gate.wait()
+        return [{"id": cid} for cid in cids]
+
+    eng = engine_mod.OutreachEngine(send, keep_campaigns=2)
+    held = eng.start("job", "sms", "twilio", ["h"], "hi", meta={"hold": True})
+    done = [eng.start("job", "sms", "twilio", [f"c{i}"], "hi") for i in range(3)]
+    for c in done:
+        assert eng.wait(c.id, 5.0)
+    assert [c.id for c in eng.list_campaigns()] == [held.id, done[-1].id]
+    eng._loop.call_soon_threadsafe(gate.set)
+    assert eng.wait(held.id, 5.0)
+    eng.close()
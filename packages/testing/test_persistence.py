@@ -0,0 +1,59 @@
+import importlib
+
+from sqlalchemy import create_engine, text
+
+persistence = importlib.import_module("apps.orchestrator.persistence")
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE candidates(id TEXT PRIMARY KEY, name TEXT, phone TEXT)"))
+    return engine
+
+
+def test_rows_are_flushed_in_batches(tmp_path):
+    engine = _engine(tmp_path)
+    flushes = []
+    wb = persistence.WriteBehind(engine, max_batch=250, flush_interval_s=0.5,
+                                 on_flush=lambda n, s: flushes.append(n))
+    for i in range(1000):
+        wb.insert("candidates", {"id": f"c{i}", "name": f"C {i}", "phone": f"+1{i:09d}"})
+    assert wb.flush(5.0)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM candidates")).scalar() == 1000
+    assert sum(flushes) == 1000 and len(flushes) <= 8
+    assert wb.depth == 0
+    wb.close()
+
+
+def test_bad_row_does_not_sink_the_batch(tmp_path):
+    engine = _engine(tmp_path)
+    wb = persistence.WriteBehind(engine, max_batch=100, flush_interval_s=0.5)
+    wb.insert("candidates", {"id": "dup", "name": "A", "phone": "1"})
+    wb.insert("candidates", {"id": "dup", "name": "B", "phone": "2"})
+    wb.insert("candidates", {"id": "ok", "name": "C", "phone": "3"})
+    wb.close()  # drains
+    with engine.connect() as conn:
+        ids = sorted(r[0] for r in conn.execute(text("SELECT id FROM candidates")))
+    assert ids == ["dup", "ok"] and wb.failed_rows == 1
+
+
+def test_flusher_survives_unexpected_errors(tmp_path):
+    engine = _engine(tmp_path)
+    calls = []
+
+    def on_flush(n, s):
+        calls.append(n)
+        if len(calls) == 1:
+            raise TypeError("bad hook")
+
+    wb = persistence.WriteBehind(engine, max_batch=100, flush_interval_s=0.01, on_flush=on_flush)
+    wb.insert("candidates", {"id": "a", "name": "A", "phone": "1"})
+    assert wb.flush(5.0)
+    wb.insert("candidates", {"id": "b", "name": "B", "phone": "2"})
+    assert wb.flush(5.0) and wb.depth == 0
+    wb.close()
+    with engine.connect() as conn:
+        assert sorted(r[0] for r in conn.execute(text("SELECT id FROM candidates"))) == ["a", "b"]
+    assert calls == [1, 1]
@@ -0,0 +1,57 @@
+import importlib
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+rm = importlib.import_module("apps.orchestrator.request_metrics")
+
+
+def _app():
+    seen = []
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def item(item_id: str):
+        return {"id": item_id}
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    @app.get("/stream")
+    def stream():
+        def gen():
+            yield "data: 1\n\n"
+            time.sleep(0.2)
+            yield "data: 2\n\n"
+        return StreamingResponse(gen(), media_type="text/event-stream")
+
+    app.add_middleware(rm.RequestMetricsMiddleware, routes=app.routes, on_request=seen.append)
+    return app, seen
+
+
+def test_labels_by_route_template_and_sets_headers():
+    app, seen = _app()
+    c = TestClient(app)
+    for i in range(3):
+        r = c.get(f"/items/{i}", headers={"x-request-id": f"req-{i}"})
+        assert r.headers["x-request-id"] == f"req-{i}" and r.headers["x-frame-options"] == "DENY"
+    assert c.get("/nope").status_code == 404
+    assert c.get("/openapi.json").status_code == 200
+    assert [(s["route"], s["status"]) for s in seen] == [("/items/{item_id}", 200)] * 3 + [
+        (rm.UNMATCHED, 404), ("/openapi.json", 200)]
+    assert seen[0]["path"] == "/items/0" and seen[0]["request_id"] == "req-0"
+    assert len(c.get("/items/x").headers["x-request-id"]) == 36  # generated when absent
+
+
+def test_errors_count_as_500_and_streams_are_timed_to_first_byte():
+    app, seen = _app()
+    c = TestClient(app, raise_server_exceptions=False)
+    assert c.get("/boom").status_code == 500
+    assert (seen[-1]["route"], seen[-1]["status"]) == ("/boom", 500)
+    with c.stream("GET", "/stream") as r:
+        assert r.headers["x-content-type-options"] == "nosniff"
+        assert [line for line in r.iter_lines() if line] == ["data: 1", "data: 2"]
+    assert seen[-1]["streaming"] and seen[-1]["duration_s"] < 0.2
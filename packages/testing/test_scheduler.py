@@ -0,0 +1,85 @@
+import datetime as dt
+import importlib
+import threading
+from collections import Counter
+
+import pytest
+
+sched = importlib.import_module("apps.orchestrator.scheduler")
+
+MON_9 = dt.datetime(2026, 10, 19, 9, 0, tzinfo=dt.timezone.utc).timestamp()  # a Monday
+
+
+def _allocator(clock, rooms=2, interviewers=3, **kw):
+    a = sched.SlotAllocator(slot_min=60, horizon_days=1, lead_min=0, clock=lambda: clock[0], **kw)
+    a.add_site("R", rooms)
+    for i in range(interviewers):
+        a.add_interviewer(f"iv{i}", "R", hours=(9, 13))  # 4 one-hour starts
+    return a
+
+
+def test_concurrent_holds_never_share_a_seat_and_respect_rooms():
+    clock = [MON_9]
+    a = _allocator(clock, rooms=2, interviewers=3)
+    assert a.capacity(days=1)["today"]["available"] == 8  # 4 starts x min(2 rooms, 3 interviewers)
+    got = []
+
+    def worker(k):
+        for j in range(k, 40, 8):
+            got.append(a.hold(f"c{j}"))
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(8)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    booked = [b for b in got if b]
+    assert len(booked) == 8 and got.count(None) == 32
+    assert len({(b.start, b.interviewer) for b in booked}) == 8
+    assert max(Counter(b.start for b in booked).values()) == 2
+    assert a.hold("c0") is a.get("c0")  # idempotent per candidate
+    today = a.capacity(days=1)["today"]
+    assert (today["held"], today["confirmed"], today["free"]) == (8, 0, 0)
+
+
+def test_expiry_and_release_requeue_the_seat():
+    clock = [MON_9]
+    a = _allocator(clock, rooms=1, interviewers=1, hold_ttl_s=600)
+    expired = []
+    a.on_expire = expired.append
+    first = a.hold("a")
+    assert first.slot == "2026-10-19T09:00:00Z"
+    assert a.hold("b").slot == "2026-10-19T10:00:00Z"
+    a.confirm("b")
+    clock[0] += 601
+    c = a.hold("c")  # a's hold expired, but 09:00 has started: next free seat is 11:00
+    assert [b.candidate_id for b in expired] == ["a"] and a.get("a") is None
+    assert c.slot == "2026-10-19T11:00:00Z" and a.get("b").status == sched.CONFIRMED
+    assert a.release("b").status == sched.RELEASED and a.release("b") is None
+    assert a.hold("d").slot == "2026-10-19T10:00:00Z"
+
+
+def test_pack_consolidates_interviewer_days_deterministically():
+    def run():
+        clock = [MON_9 - 3600]
+        a = _allocator(clock, rooms=10, interviewers=4)
+        for j in range(8):  # earliest starts first: 09:00 and 10:00 on all four interviewers
+            a.hold(f"c{j}")
+        a.confirm("c0")
+        pinned = (a.get("c0").start, a.get("c0").interviewer)
+        out = a.pack()
+        seats = {(b.start, b.interviewer) for b in a._bookings.values()}
+        return a, out, pinned, seats
+
+    a, out, pinned, seats = run()
+    assert out["interviewer_days_before"] == 4 and out["interviewer_days_after"] == 2
+    assert out["moved"] == len(out["moves"]) > 0
+    assert (a.get("c0").start, a.get("c0").interviewer) == pinned  # confirmed bookings never move
+    assert len(seats) == 8
+    assert run()[1] == out
+    assert a.pack()["moved"] == 0
+
+
+def test_parse_days_and_hours():
+    assert sched.parse_days("Sun, mon,Thursday") == (0, 1, 4)
+    assert sched.parse_hours("08:30-16") == (8.5, 16.0)
+    with pytest.raises(ValueError):
+        sched.parse_days("Sun,Funday")
@@ -0,0 +1,74 @@
+import datetime as dt
+import importlib
+
+import numpy as np
+
+sla_mod = importlib.import_module("apps.orchestrator.sla_heatmap")
+sw = importlib.import_module("apps.orchestrator.send_window")
+
+MON_0 = dt.datetime(2026, 10, 19, 0, 0, tzinfo=dt.timezone.utc).timestamp()  # a Monday
+HOUR = 3600
+
+
+def _heatmap():
+    # job j1: 40 sends at every hour 8..20 on Monday; en replies mostly to 10:00 and 18:00, ar to 14:00
+    h = sla_mod.SlaHeatmap()
+    events, n = [], 0
+    for hour in range(8, 21):
+        for i in range(40):
+            for locale, good in (("en", (10, 18)), ("ar", (14,))):
+                cid = f"{locale}{n}"
+                n += 1
+                ts = MON_0 + hour * HOUR
+                events.append({"ts": ts, "action": "outreach.sent",
+                               "payload": {"candidate_id": cid, "job_id": "j1", "locale": locale}})
+                if i < (30 if hour in good else 4):
+                    events.append({"ts": ts + 300, "action": "channel.inbound", "payload": {"candidate_id": cid}})
+    h.on_audit(events)
+    return h
+
+
+def test_plan_prefers_high_yield_hours_within_capacity():
+    p = sw.SendWindowPlanner(_heatmap(), hourly_capacity=100, hours=(8, 21), max_cell_share=0.3)
+    out = p.optimize()
+    plans = {x["locale"]: x for x in out["plans"]}
+    assert set(plans) == {"en", "ar"}
+    en = plans["en"]
+    assert en["volume"] == 520 and en["unplaced"] == 0
+    assert {(w["day"], w["hour"]) for w in en["windows"][:2]} == {("Mon", 10), ("Mon", 18)}
+    assert plans["ar"]["windows"][0]["hour"] == 14
+    assert en["expected_reply_rate"] > en["baseline_reply_rate"]
+    assert all(8 <= w["hour"] < 21 for x in out["plans"] for w in x["windows"])
+    t = out["totals"]
+    assert t["planned"] == 1040 and t["peak_hourly_sends"]["planned"] <= 100
+    assert t["messages_per_reply"]["planned"] < t["messages_per_reply"]["baseline"]
+    # the shared cap binds: fewer sends fit than requested
+    tight = p.optimize(weekly_volume=2000, hourly_capacity=5)
+    assert tight["totals"]["planned"] <= 5 * 13 * 7 and tight["totals"]["unplaced"] > 0
+
+
+def test_fill_respects_room_and_limits():
+    score = np.array([[0.9, 0.5, 0.1], [0.8, 0.7, 0.1]])
+    alloc, left = sw._fill(score, np.array([10.0, 10.0]), np.array([8.0, 100.0, 100.0]), np.full((2, 3), 6.0))
+    assert np.allclose(alloc.sum(axis=0)[0], 8.0) and (alloc <= 6.0 + 1e-9).all()
+    assert np.allclose(alloc.sum(axis=1), 10.0) and np.allclose(left, 0.0)
+
+
+def test_next_send_defers_to_the_next_planned_hour():
+    p = sw.SendWindowPlanner(_heatmap(), hours=(8, 21), max_cell_share=1.0)
+    p.optimize(weekly_volume=20)  # small volume: each key fits in its single best hour
+    assert p.has_plan("j1") and not p.has_plan("j2")
+    at_10 = MON_0 + 10 * HOUR
+    assert p.next_send("j1", "en", at_10 + 120) == at_10 + 120  # inside the window: now
+    assert p.next_send("j1", "ar", at_10 + 120) == MON_0 + 14 * HOUR
+    assert p.next_send("j1", "ar", MON_0 + 15 * HOUR) == MON_0 + 7 * 24 * HOUR + 14 * HOUR  # next week
+    assert p.next_send("j2", "en", at_10) == at_10  # no plan: send now
+
+
+def test_optimize_publishes_a_new_snapshot():
+    p = sw.SendWindowPlanner(_heatmap(), hours=(8, 21), max_cell_share=1.0)
+    p.optimize(weekly_volume=20)
+    seen = p._plans  # what a concurrent reader holds
+    p.optimize("j1", weekly_volume=2000)
+    assert p._plans is not seen and set(p._plans) == set(seen)
+    assert all(not mask.flags.writeable for mask in p._plans.values())
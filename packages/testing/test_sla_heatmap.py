@@ -0,0 +1,57 @@
+import datetime as dt
+import importlib
+
+sla_mod = importlib.import_module("apps.orchestrator.sla_heatmap")
+
+MON_10 = dt.datetime(2026, 10, 19, 10, 15, tzinfo=dt.timezone.utc).timestamp()  # a Monday
+DAY, HOUR = 1, 10  # "Mon" row, 10:00 column
+
+
+def _ev(ts, action, cid, **payload):
+    return {"ts": ts, "action": action, "payload": {"candidate_id": cid, **payload}}
+
+
+def test_pairs_first_send_with_first_reply_per_job_and_locale():
+    h = sla_mod.SlaHeatmap(lookup={"c": {"job_id": "j2", "locale": "ar"}}.get)
+    h.on_audit([
+        _ev(MON_10, "outreach.sent", "a", job_id="j1", locale="en"),
+        _ev(MON_10, "outreach.sent", "b", job_id="j1", locale="ar"),
+        _ev(MON_10, "outreach.sent", "c"),  # job/locale from the candidate
+        _ev(MON_10 + 600, "outreach.sent", "a", job_id="j1", locale="en"),  # resend: same pair
+        _ev(MON_10 - 60, "channel.inbound", "zz"),  # never contacted
+    ])
+    h.on_audit([
+        _ev(MON_10 + 3 * 60, "channel.inbound", "a"),
+        _ev(MON_10 + 40 * 60, "channel.inbound", "a"),  # later replies do not move TTFT
+        _ev(MON_10 + 100 * 60, "channel.inbound", "c"),
+    ])
+    assert h.pending == 1  # b never replied
+    g = h.grid()
+    assert g["sent"][DAY][HOUR] == 3 and g["replied"][DAY][HOUR] == 2
+    assert g["reply_rate"][DAY][HOUR] == round(2 / 3, 4) and g["reply_rate"][0][0] is None
+    assert 2 <= g["ttft_percentiles"]["p50"][DAY][HOUR] <= 5  # 3 min falls in the 2-5 bucket
+    assert 90 <= g["ttft_percentiles"]["p90"][DAY][HOUR] <= 120
+    assert g["ttft_minutes"] == g["ttft_percentiles"]["p50"]
+
+    assert h.grid(job_id="j1")["totals"] == {"sent": 2, "replied": 1, "reply_rate": 0.5}
+    assert h.grid(locale="ar")["totals"] == {"sent": 2, "replied": 1, "reply_rate": 0.5}
+    assert h.grid(job_id="j2", locale="ar")["replied"][DAY][HOUR] == 1
+    assert h.grid(job_id="nope")["totals"] == {"sent": 0, "replied": 0, "reply_rate": None}
+
+
+def test_utc_offset_moves_the_cell():
+    h = sla_mod.SlaHeatmap(utc_offset_min=180)  # UTC+3
+    h.on_audit([_ev(MON_10, "outreach.sent", "a")])
+    assert h.grid()["sent"][DAY][HOUR + 3] == 1
+
+
+def test_pair_state_expires_after_the_horizon():
+    h = sla_mod.SlaHeatmap(horizon_s=3600)
+    h.on_audit([_ev(MON_10, "outreach.sent", "a"), _ev(MON_10, "outreach.sent", "b"),
+                _ev(MON_10 + 60, "channel.inbound", "a")])
+    assert h.pending == 1 and len(h._closed) == 1
+    h.on_audit([_ev(MON_10 + 2 * 3600, "outreach.sent", "c")])
+    assert h.pending == 1 and not h._closed  # b stopped waiting, a's closed pair aged out
+    h.on_audit([_ev(MON_10 + 2 * 3600 + 60, "channel.inbound", "b")])
+    g = h.grid()
+    assert g["sent"][DAY][HOUR] == 2 and g["replied"][DAY][HOUR] == 1
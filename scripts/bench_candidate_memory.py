@@ -0,0 +1,56 @@
+"""Memory per candidate: plain dict-of-dicts vs the compact CandidateRepo.
+
+    python scripts/bench_candidate_memory.py [--rows 200000]
+
+Both stores get identical rows (uuid ids, unique names and phones, a handful
+of locales/statuses/jobs); bytes are measured with tracemalloc, so the id and
+string objects are counted on both sides.
+"""
+import argparse
+import importlib
+import os
+import sys
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+LOCALES = ("en", "ar", "ur", "hi")
+STATUSES = ("new", "contacted", "qualified", "disqualified", "scheduled")
+
+
+def rows(n: int, jobs):
+    for i in range(n):
+        yield str(uuid.uuid4()), {
+            "name": f"Candidate {i}", "phone": f"+9665{i:08d}", "locale": LOCALES[i % len(LOCALES)],
+            "consent": i % 3 != 0, "status": STATUSES[i % len(STATUSES)], "job_id": jobs[i % len(jobs)],
+        }
+
+
+def measure(make, n: int, jobs) -> float:
+    tracemalloc.start()
+    store = make()
+    for cid, row in rows(n, jobs):
+        store[cid] = row
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del store
+    return used / n
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    args = ap.parse_args()
+    repo_mod = importlib.import_module("apps.orchestrator.candidate_repo")
+    jobs = [str(uuid.uuid4()) for _ in range(20)]
+    before = measure(dict, args.rows, jobs)
+    after = measure(repo_mod.CandidateRepo, args.rows, jobs)
+    print(f"rows:             {args.rows}")
+    print(f"dict of dicts:    {before:7.1f} B/candidate")
+    print(f"CandidateRepo:    {after:7.1f} B/candidate (incl. phone/status/locale/job indexes)")
+    print(f"saved:            {100 * (1 - after / before):5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
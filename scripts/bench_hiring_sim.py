@@ -0,0 +1,43 @@
+"""Monte Carlo hiring simulator: single-scenario latency and sweep throughput.
+
+    python scripts/bench_hiring_sim.py [--trials 100000] [--workers N]
+
+Times /simulate/hiring's monte_carlo mode for a quick fill, a 6-month fill and
+a target that is never reached within the 52-week horizon, then a 6 x 5
+vol_per_day x interviewer_capacity sweep in-process and on the process pool
+(results are identical: each scenario has its own seed).
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+RATES = dict(reply_rate=0.35, qual_rate=0.25, show_rate=0.7)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trials", type=int, default=100_000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = ap.parse_args()
+    sim = importlib.import_module("apps.orchestrator.hiring_sim")
+    for label, target in (("fills in week 1", 50), ("fills in ~22 weeks", 2000), ("never fills", 10**7)):
+        r = sim.simulate(500, interviewer_capacity=50, target_openings=target, trials=args.trials, seed=1, **RATES)
+        print(f"{label:20s} {r['elapsed_ms']:8.1f} ms  hires/week p50 {r['hires_per_week']['p50']:.0f}  "
+              f"time-to-fill p50 {r['time_to_fill_weeks']['p50']}")
+    vols, caps = [100, 200, 300, 400, 500, 600], [20, 30, 40, 50, 60]
+    kw = dict(trials=args.trials, seed=3, target_openings=300, **RATES)
+    local = sim.sweep(vols, caps, workers=1, **kw)
+    print(f"sweep 30 scenarios  {local['elapsed_ms']:8.1f} ms in-process")
+    sim.sweep(vols[:2], caps[:1], workers=args.workers, parallel_min_draws=0, **kw)  # start the pool
+    t0 = time.perf_counter()
+    pooled = sim.sweep(vols, caps, workers=args.workers, parallel_min_draws=0, **kw)
+    print(f"sweep 30 scenarios  {(time.perf_counter() - t0) * 1000:8.1f} ms on {pooled['workers']} workers")
+    sim.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Orchestrator hot paths timed in isolation as AUDIT and CANDIDATES grow.
+
+    python scripts/bench_hot_paths.py [--scales 10k,100k,1M] [--out results.json]
+    python scripts/bench_hot_paths.py --scales 10k,100k --baseline scripts/bench_hot_paths_baseline.json
+    python scripts/bench_hot_paths.py --scales 10k,100k --save-baseline scripts/bench_hot_paths_baseline.json
+
+Each scale runs in a fresh process that imports apps.orchestrator.main (memory
+audit store unless --audit-store segmented), adds N candidates and N audit
+events through the normal write paths (so counters, analytics, SLA grids and
+checkpoints are all maintained), then calls each path directly, without HTTP:
+
+    audit.submit        audit() as seen by a request thread (enqueue only), per event
+    audit.commit        submit + drain through the writer thread (chain, append, listeners), per event
+    verify.incremental  verify_audit() from the newest checkpoint
+    verify.full         verify_audit(mode="full")
+    phone.hit/miss      _find_candidate_by_phone for a known / unknown number
+    kpi, funnel, funnel.by_job
+    audit.page.latest/middle   get_audit(limit=250), newest page and a page from the middle
+
+Memory per record is the RSS growth while seeding divided by the record
+count. It includes indexes and the listener structures fed by each record.
+10M needs several GB of RAM per store.
+
+With --baseline, any path whose median is more than --max-slowdown slower than
+the baseline at the same scale (and by at least --min-delta-us), or whose
+memory per record grew more than --max-memory-growth, is reported and the
+script exits with status 1. Baselines are machine-specific; refresh them with
+--save-baseline when the hardware changes.
+"""
+import argparse
+import gc
+import importlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+LOCALES = ("en", "ar", "ur", "hi")
+STATUSES = ("new", "contacted", "qualified", "disqualified", "scheduled")
+# one candidate's trip through the funnel, in audit order
+FLOW = ("outreach.sent", "channel.inbound", "consent.captured", "qualification.done", "schedule.confirmed",
+        "ats.write")
+JOBS = 50
+
+
+def parse_scales(spec: str):
+    # "10k,100k,1M" -> [10000, 100000, 1000000]
+    mult = {"k": 1_000, "m": 1_000_000}
+    out = []
+    for part in spec.split(","):
+        part = part.strip().lower()
+        if part:
+            out.append(int(float(part[:-1]) * mult[part[-1]]) if part[-1] in mult else int(part))
+    return out
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # peak, KiB on Linux
+
+
+def timed(fn, min_time: float = 0.3, max_reps: int = 2000, min_reps: int = 3) -> dict:
+    # per-call wall times until min_time has passed (at least min_reps, at most max_reps calls)
+    fn()  # warm caches
+    times = []
+    t_end = time.perf_counter() + min_time
+    while len(times) < max_reps and (len(times) < min_reps or time.perf_counter() < t_end):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return {"median_us": round(times[len(times) // 2] * 1e6, 2),
+            "p95_us": round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1e6, 2), "reps": len(times)}
+
+
+def seed(m, n: int) -> dict:
+    jobs = [str(uuid.uuid4()) for _ in range(JOBS)]
+    gc.collect()
+    r0, t0 = rss_bytes(), time.perf_counter()
+    cids, phones = [], []
+    for i in range(n):
+        cid, phone = str(uuid.uuid4()), f"+9665{i:08d}"
+        m.CANDIDATES[cid] = {"name": f"Candidate {i}", "phone": phone, "locale": LOCALES[i % len(LOCALES)],
+                             "consent": i % 3 != 0, "status": STATUSES[i % len(STATUSES)],
+                             "job_id": jobs[i % JOBS]}
+        cids.append(cid)
+        if i % 97 == 0:
+            phones.append(phone)
+    gc.collect()
+    r1, t1 = rss_bytes(), time.perf_counter()
+    chunk = []
+    for i in range(n):
+        c = i // len(FLOW) % n
+        action = FLOW[i % len(FLOW)]
+        payload = {"candidate_id": cids[c], "job_id": jobs[c % JOBS]}
+        if action == "outreach.sent":
+            payload.update(locale=LOCALES[c % len(LOCALES)], cost_usd=0.012)
+        elif action == "qualification.done":
+            payload["qualified"] = c % 4 != 0
+        chunk.append(("agent", action, payload))
+        if len(chunk) == 10_000:
+            m.AUDIT_WRITER.submit_events(chunk)
+            chunk = []
+            m.AUDIT_WRITER.drain()  # bounded queue while seeding
+    if chunk:
+        m.AUDIT_WRITER.submit_events(chunk)
+    m.AUDIT_WRITER.drain()
+    gc.collect()
+    r2, t2 = rss_bytes(), time.perf_counter()
+    return {
+        "phones": phones,
+        "seed_s": {"candidates": round(t1 - t0, 2), "audit": round(t2 - t1, 2)},
+        "memory": {"candidate_bytes": round((r1 - r0) / n, 1), "audit_event_bytes": round((r2 - r1) / n, 1),
+                   "rss_mb": round(r2 / 2**20, 1)},
+    }
+
+
+def run_scale(n: int, args) -> dict:
+    # child process: one scale against a freshly imported orchestrator
+    m = importlib.import_module("apps.orchestrator.main")
+    out = seed(m, n)
+    phones = out.pop("phones")
+    rng = random.Random(7)
+    paths = {}
+
+    k = 10_000
+    t0 = time.perf_counter()
+    for i in range(k):
+        m.audit("agent", "bench.event", {"candidate_id": "bench", "i": i})
+    t1 = time.perf_counter()
+    m.AUDIT_WRITER.drain()
+    t2 = time.perf_counter()
+    paths["audit.submit"] = {"median_us": round((t1 - t0) / k * 1e6, 2), "reps": k}
+    paths["audit.commit"] = {"median_us": round((t2 - t0) / k * 1e6, 2), "reps": k}
+
+    paths["verify.incremental"] = timed(lambda: m.verify_audit("incremental"), args.min_time)
+    paths["verify.full"] = timed(lambda: m.verify_audit("full"), args.min_time, max_reps=20, min_reps=1)
+    paths["phone.hit"] = timed(lambda: m._find_candidate_by_phone(rng.choice(phones)), args.min_time)
+    paths["phone.miss"] = timed(lambda: m._find_candidate_by_phone("+15550000000"), args.min_time)
+    paths["kpi"] = timed(lambda: m.kpi(None), args.min_time)
+    paths["funnel"] = timed(lambda: m.funnel(None, False), args.min_time)
+    paths["funnel.by_job"] = timed(lambda: m.funnel(None, True), args.min_time)
+    total = len(m.AUDIT)
+    paths["audit.page.latest"] = timed(lambda: m.get_audit(250, None), args.min_time)
+    paths["audit.page.middle"] = timed(lambda: m.get_audit(250, total // 2), args.min_time)
+    out["paths"] = paths
+    return out
+
+
+def spawn_scale(n: int, args) -> dict:
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    env.update(MODE="demo", AUDIT_STORE=args.audit_store)
+    tmp = None
+    if args.audit_store == "segmented":
+        tmp = tempfile.mkdtemp(prefix="bench-audit-")
+        env["AUDIT_DIR"] = tmp
+    try:
+        proc = subprocess.run([sys.executable, __file__, "--child", str(n), "--min-time", str(args.min_time)],
+                              env=env, capture_output=True, text=True)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"scale {n} failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def gate(results: dict, baseline: dict, max_slowdown: float, min_delta_us: float, max_memory_growth: float):
+    # (scale, metric, baseline value, new value) for each regression; scales or paths missing on either side are skipped
+    bad = []
+    for scale, res in results["scales"].items():
+        base = baseline.get("scales", {}).get(scale)
+        if not base:
+            continue
+        for path, r in res["paths"].items():
+            b = base["paths"].get(path)
+            if b and r["median_us"] > b["median_us"] * (1 + max_slowdown) \
+                    and r["median_us"] - b["median_us"] >= min_delta_us:
+                bad.append((scale, path, b["median_us"], r["median_us"]))
+        for key, v in res["memory"].items():
+            b = base["memory"].get(key)
+            if key.endswith("_bytes") and b and v > b * (1 + max_memory_growth):
+                bad.append((scale, key, b, v))
+    return bad
+
+
+def _fmt_us(us: float) -> str:
+    return f"{us:9.2f} us" if us < 1000 else f"{us / 1000:9.2f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", default="10k,100k,1M")
+    ap.add_argument("--audit-store", default="memory", choices=("memory", "segmented"))
+    ap.add_argument("--min-time", type=float, default=0.3, help="seconds spent timing each path")
+    ap.add_argument("--out", default=None, help="write results as JSON")
+    ap.add_argument("--baseline", default=None, help="fail on regressions against this results file")
+    ap.add_argument("--save-baseline", default=None, help="write results as the new baseline")
+    ap.add_argument("--max-slowdown", type=float, default=0.5, help="allowed median slowdown, 0.5 = +50%%")
+    ap.add_argument("--min-delta-us", type=float, default=5.0, help="ignore slowdowns smaller than this")
+    ap.add_argument("--max-memory-growth", type=float, default=0.2)
+    ap.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child is not None:
+        print(json.dumps(run_scale(args.child, args)))
+        return
+
+    results = {"meta": {"started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                        "python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+                        "audit_store": args.audit_store},
+               "scales": {}}
+    for n in parse_scales(args.scales):
+        res = spawn_scale(n, args)
+        results["scales"][str(n)] = res
+        mem, seed_s = res["memory"], res["seed_s"]
+        print(f"scale {n:,}: seeded in {seed_s['candidates']}s + {seed_s['audit']}s, "
+              f"{mem['candidate_bytes']:.0f} B/candidate, {mem['audit_event_bytes']:.0f} B/audit event, "
+              f"RSS {mem['rss_mb']:.0f} MB")
+        for path, r in res["paths"].items():
+            p95 = f"  p95 {_fmt_us(r['p95_us'])}" if "p95_us" in r else ""
+            print(f"  {path:<20}{_fmt_us(r['median_us'])}{p95}")
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"saved {path}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        bad = gate(results, baseline, args.max_slowdown, args.min_delta_us, args.max_memory_growth)
+        for scale, metric, b, v in bad:
+            print(f"REGRESSION scale {int(scale):,} {metric}: {b} -> {v} ({100.0 * (v - b) / b:+.0f}%)")
+        if bad:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Burst of concurrent chats against scripts/mock_llm.py: per-request sessions vs the shared LlmClient.
+
+    python scripts/bench_llm_client.py [--chats 200] [--cap 32] [--ttft-ms 300] [--tokens 32] [--tps 60] [--max-streams 0]
+
+Starts the mock provider, then opens --chats streams at once. The first run
+opens a new aiohttp session per chat, as /chat/stream used to. The second
+goes through one LlmClient capped at --cap concurrent upstream streams. Each
+run reports time to first token (including queue wait), queue wait,
+tokens/s, failures and the provider's peak open streams. --max-streams makes
+the mock answer 429 above that many open streams, like a provider rate limit.
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+MESSAGES = [{"role": "user", "content": "When do candidates reply?"}]
+
+
+def pct(vals, q):
+    vals = sorted(v for v in vals if v is not None)
+    return vals[min(len(vals) - 1, int(len(vals) * q / 100))] * 1000 if vals else float("nan")
+
+
+async def per_request_session(url, n):
+    # a session (and connection) per chat, no cap
+    async def one():
+        t0, ttft, tokens = time.perf_counter(), None, 0
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120)) as sess:
+                async with sess.post(url + "/chat/completions", json={"stream": True, "messages": MESSAGES}) as resp:
+                    resp.raise_for_status()
+                    async for line in resp.content:
+                        if line.startswith(b"data:") and b"[DONE]" not in line:
+                            tokens += 1
+                            if ttft is None:
+                                ttft = time.perf_counter() - t0
+            gen = time.perf_counter() - t0 - ttft
+            return {"ttft_s": ttft, "queue_wait_s": 0.0, "tokens_per_s": (tokens - 1) / gen if gen > 0 else None,
+                    "outcome": "ok"}
+        except aiohttp.ClientError:
+            return {"ttft_s": None, "queue_wait_s": None, "tokens_per_s": None, "outcome": "error"}
+    return await asyncio.gather(*(one() for _ in range(n)))
+
+
+async def shared_client(mod, url, n, cap):
+    llm = mod.LlmClient(url, None, "mock", max_concurrency=cap, max_queue=n, queue_timeout_s=120, timeout_s=120)
+
+    async def one():
+        st = {}
+        try:
+            async for _ in llm.stream(MESSAGES, st):
+                pass
+        except (mod.LlmBusy, aiohttp.ClientError):
+            pass
+        if st["ttft_s"] is not None:
+            st["ttft_s"] += st["queue_wait_s"]  # what the recruiter waits for
+        return st
+    try:
+        return await asyncio.gather(*(one() for _ in range(n)))
+    finally:
+        await llm.aclose()
+
+
+async def run(label, coro, base):
+    async with aiohttp.ClientSession() as s:
+        await s.post(base + "/stats/reset")
+        t0 = time.perf_counter()
+        res = await coro
+        elapsed = time.perf_counter() - t0
+        mock = await (await s.get(base + "/stats")).json()
+    ok = sum(r["outcome"] == "ok" for r in res)
+    ttft = [r["ttft_s"] for r in res]
+    print(f"{label:<22}{ok:>5}/{len(res):<5}{pct(ttft, 50):>10.0f}{pct(ttft, 95):>10.0f}"
+          f"{pct([r['queue_wait_s'] for r in res], 95):>12.0f}"
+          f"{pct([r['tokens_per_s'] for r in res], 50) / 1000:>10.1f}{mock['peak']:>8}{elapsed:>9.1f}s")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chats", type=int, default=200)
+    ap.add_argument("--cap", type=int, default=32)
+    ap.add_argument("--port", type=int, default=18500)
+    ap.add_argument("--ttft-ms", type=float, default=300.0)
+    ap.add_argument("--tokens", type=int, default=32)
+    ap.add_argument("--tps", type=float, default=60.0)
+    ap.add_argument("--max-streams", type=int, default=0)
+    args = ap.parse_args()
+    mod = importlib.import_module("apps.orchestrator.llm_client")
+    base = f"http://127.0.0.1:{args.port}"
+    mock = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), "mock_llm.py"),
+                             "--port", str(args.port), "--ttft-ms", str(args.ttft_ms), "--tokens", str(args.tokens),
+                             "--tps", str(args.tps), "--max-streams", str(args.max_streams)])
+    try:
+        _wait_ready(base, mock)
+        print(f"{args.chats} chats at once; provider: first token after {args.ttft_ms:.0f} ms, {args.tokens} tokens "
+              f"at {args.tps:.0f}/s" + (f", 429 above {args.max_streams} streams" if args.max_streams else ""))
+        print(f"{'':<22}{'ok':>11}{'ttft p50':>10}{'ttft p95':>10}{'wait p95':>12}{'tok/s p50':>10}{'peak':>8}{'total':>10}")
+
+        async def both():
+            await run("session per request", per_request_session(base + "/v1", args.chats), base)
+            await run(f"shared, cap {args.cap}", shared_client(mod, base + "/v1", args.chats, args.cap), base)
+        asyncio.run(both())
+    finally:
+        mock.terminate()
+        mock.wait(10)
+
+
+def _wait_ready(base, proc):
+    import urllib.request
+    for _ in range(200):
+        if proc.poll() is not None:
+            raise SystemExit("mock provider exited")
+        try:
+            urllib.request.urlopen(base + "/stats", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit("mock provider not ready")
+
+
+if __name__ == "__main__":
+    main()
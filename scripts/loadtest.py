@@ -0,0 +1,418 @@
+"""End-to-end load test: concurrent async clients against the orchestrator.
+
+    python scripts/loadtest.py --spawn --duration 30 --clients 64 --sse 20 --out loadtest.json
+    python scripts/loadtest.py --api http://localhost:8000 --rps 400 --mix kpi=50,send=50
+    python scripts/loadtest.py --compare base.json loadtest.json
+
+--spawn starts the orchestrator, ats-mock and channel-connector (in-process
+mock provider) on local ports, wired to each other, and stops them at the end.
+Without it, --api (and optionally --connector) point at running services.
+
+Traffic is a weighted mix of operations (--mix, names below), each picked at
+random per request:
+
+    inbound            POST /channels/inbound (provider webhook, 5% retried message ids)
+    connector_inbound  POST <connector>/inbound (buffered and forwarded in batches)
+    send               POST /send (forwarded to the channel connector)
+    confirm            POST /schedule/confirm (allocator + ATS write through the outbox)
+    kpi                GET /kpi (dashboard polling)
+    funnel             GET /funnel
+
+By default --clients workers run closed-loop (each sends its next request as
+soon as the last one returns). With --rps, requests are started on a fixed
+schedule instead. Latency is then measured from the scheduled start, so a
+stalled server shows up in the percentiles rather than as lower load.
+--sse subscribers stay connected to /events/stream for the whole run and
+measure fan-out lag (receive time - audit event ts).
+
+The JSON report has per-route count, status codes, errors, throughput and
+p50/p95/p99/max latency, the SSE lag percentiles, and run metadata (git rev,
+config), so two releases can be compared with --compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_MIX = "inbound=25,connector_inbound=10,send=20,confirm=10,kpi=30,funnel=5"
+INBOUND_BODIES = ("YES", "yes", "What time is the interview?", "Can I bring a friend?", "ok")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            if k.strip() not in OPS:
+                raise SystemExit(f"unknown operation in --mix: {k.strip()} (known: {', '.join(OPS)})")
+            mix[k.strip()] = float(v)
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+def pct(sorted_vals: List[float], q: float) -> Optional[float]:
+    # nearest-rank percentile of an ascending list
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, int(round(q / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+
+def _ms(v: Optional[float]) -> Optional[float]:
+    return None if v is None else round(v * 1000, 2)
+
+
+# ---- operations: each returns (route label, HTTP status; 0 for a transport error) ----
+class Ctx:
+    def __init__(self, api: str, connector: Optional[str], job_id: str, cids: List[str], phones: List[str]):
+        self.api, self.connector, self.job_id, self.cids, self.phones = api, connector, job_id, cids, phones
+        self.sids: List[str] = []
+
+
+def _sid(ctx: Ctx) -> str:
+    if ctx.sids and random.random() < 0.05:
+        return random.choice(ctx.sids)  # provider retry
+    sid = f"LT{uuid.uuid4().hex}"
+    if len(ctx.sids) < 10_000:
+        ctx.sids.append(sid)
+    return sid
+
+
+async def op_inbound(c: httpx.AsyncClient, ctx: Ctx):
+    body = {"From": random.choice(ctx.phones), "Body": random.choice(INBOUND_BODIES), "MessageSid": _sid(ctx)}
+    return "POST /channels/inbound", (await c.post(f"{ctx.api}/channels/inbound", json=body)).status_code
+
+
+async def op_connector_inbound(c: httpx.AsyncClient, ctx: Ctx):
+    body = {"From": random.choice(ctx.phones), "Body": random.choice(INBOUND_BODIES), "MessageSid": _sid(ctx)}
+    return "POST connector /inbound", (await c.post(f"{ctx.connector}/inbound", json=body)).status_code
+
+
+async def op_send(c: httpx.AsyncClient, ctx: Ctx):
+    body = {"to": random.choice(ctx.phones), "body": "Your interview is confirmed.", "locale": "en", "channel": "sms"}
+    return "POST /send", (await c.post(f"{ctx.api}/send", json=body)).status_code
+
+
+async def op_confirm(c: httpx.AsyncClient, ctx: Ctx):
+    r = await c.post(f"{ctx.api}/schedule/confirm", params={"candidate_id": random.choice(ctx.cids)})
+    return "POST /schedule/confirm", r.status_code
+
+
+async def op_kpi(c: httpx.AsyncClient, ctx: Ctx):
+    return "GET /kpi", (await c.get(f"{ctx.api}/kpi")).status_code
+
+
+async def op_funnel(c: httpx.AsyncClient, ctx: Ctx):
+    return "GET /funnel", (await c.get(f"{ctx.api}/funnel")).status_code
+
+
+OPS = {"inbound": op_inbound, "connector_inbound": op_connector_inbound, "send": op_send, "confirm": op_confirm,
+       "kpi": op_kpi, "funnel": op_funnel}
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.status: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.recording = False
+
+    def add(self, route: str, status: int, latency: float, error: Optional[str] = None) -> None:
+        if not self.recording:
+            return
+        self.samples.setdefault(route, []).append(latency)
+        st = self.status.setdefault(route, {})
+        st[str(status)] = st.get(str(status), 0) + 1
+        if error:
+            er = self.errors.setdefault(route, {})
+            er[error] = er.get(error, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(self.samples):
+            lat = sorted(self.samples[route])
+            codes = self.status[route]
+            failed = sum(n for code, n in codes.items() if code == "0" or code.startswith("5"))
+            routes[route] = {
+                "count": len(lat), "rps": round(len(lat) / elapsed, 1), "status": codes, "errors": failed,
+                "error_types": self.errors.get(route, {}),
+                "mean_ms": _ms(sum(lat) / len(lat)), "p50_ms": _ms(pct(lat, 50)), "p95_ms": _ms(pct(lat, 95)),
+                "p99_ms": _ms(pct(lat, 99)), "max_ms": _ms(lat[-1]),
+            }
+        total = sum(r["count"] for r in routes.values())
+        return {"routes": routes, "totals": {"requests": total, "rps": round(total / elapsed, 1),
+                                             "errors": sum(r["errors"] for r in routes.values())}}
+
+
+async def _timed(c: httpx.AsyncClient, ctx: Ctx, name: str, rec: Recorder, started: Optional[float] = None):
+    t0 = time.perf_counter() if started is None else started
+    try:
+        route, status = await OPS[name](c, ctx)
+        rec.add(route, status, time.perf_counter() - t0)
+    except httpx.HTTPError as e:
+        rec.add(name, 0, time.perf_counter() - t0, e.__class__.__name__)
+
+
+async def closed_loop(c, ctx, names, weights, rec, stop_at):
+    while time.perf_counter() < stop_at:
+        await _timed(c, ctx, random.choices(names, weights)[0], rec)
+
+
+async def open_loop(c, ctx, names, weights, rec, stop_at, rps, max_in_flight):
+    # fixed-schedule arrivals; latency counts from the scheduled start, so queueing is not hidden
+    sem = asyncio.Semaphore(max_in_flight)
+    tasks, start, k = set(), time.perf_counter(), 0
+
+    async def one(name, scheduled):
+        async with sem:
+            await _timed(c, ctx, name, rec, started=scheduled)
+
+    while True:
+        scheduled = start + k / rps
+        if scheduled >= stop_at:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        t = asyncio.create_task(one(random.choices(names, weights)[0], scheduled))
+        tasks.add(t)
+        t.add_done_callback(tasks.discard)
+        k += 1
+    if tasks:
+        await asyncio.wait(tasks, timeout=30)
+
+
+class SseStats:
+    def __init__(self):
+        self.lags: List[float] = []
+        self.events = 0
+        self.gaps = 0
+        self.disconnects = 0
+        self.recording = False
+
+
+async def sse_subscriber(api: str, stats: SseStats, stop_at: float):
+    # one long-lived /events/stream connection; only events created after it connected count
+    connected = time.time()
+    try:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(None, connect=10.0)) as c:
+            async with c.stream("GET", f"{api}/events/stream") as r:
+                event = None
+                async for line in r.aiter_lines():
+                    if time.perf_counter() >= stop_at:
+                        return
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:") and stats.recording:
+                        if event == "gap":
+                            stats.gaps += 1
+                            continue
+                        try:
+                            ts = float(json.loads(line[5:].strip()).get("ts") or 0)
+                        except (ValueError, AttributeError):
+                            continue
+                        if ts >= connected:
+                            stats.events += 1
+                            stats.lags.append(max(0.0, time.time() - ts))
+    except httpx.HTTPError:
+        stats.disconnects += 1  # the server closed or refused the stream mid-run
+
+
+async def setup(c: httpx.AsyncClient, api: str, n: int) -> Ctx:
+    job = (await c.post(f"{api}/jobs", json={"title": "Load test", "location": "Riyadh", "shift": "Day",
+                                             "reqs": []})).json()
+    run = random.randint(100, 999)
+    phones = [f"+1{run}{i:07d}" for i in range(n)]
+    sem = asyncio.Semaphore(32)
+
+    async def create(i):
+        async with sem:
+            r = await c.post(f"{api}/candidates", json={"name": f"LT {i}", "phone": phones[i], "locale": "en",
+                                                        "job_id": job["job_id"]})
+            return r.json()["candidate_id"]
+
+    cids = await asyncio.gather(*(create(i) for i in range(n)))
+    return Ctx(api, None, job["job_id"], list(cids), phones)
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    if not args.connector:
+        mix.pop("connector_inbound", None)
+    names, weights = list(mix), list(mix.values())
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as c:
+        ctx = await setup(c, args.api, args.candidates)
+        ctx.connector = args.connector
+        rec, sse = Recorder(), SseStats()
+        t_start = time.perf_counter()
+        stop_at = t_start + args.warmup + args.duration
+        subs = [asyncio.create_task(sse_subscriber(args.api, sse, stop_at)) for _ in range(args.sse)]
+        if args.rps:
+            load = asyncio.create_task(open_loop(c, ctx, names, weights, rec, stop_at, args.rps, args.clients))
+        else:
+            load = asyncio.gather(*(closed_loop(c, ctx, names, weights, rec, stop_at) for _ in range(args.clients)))
+        await asyncio.sleep(args.warmup)
+        rec.recording = sse.recording = True
+        t0 = time.perf_counter()
+        await load
+        elapsed = time.perf_counter() - t0
+        rec.recording = sse.recording = False
+        for s in subs:
+            s.cancel()
+        await asyncio.gather(*subs, return_exceptions=True)
+    out = rec.report(elapsed)
+    lags = sorted(sse.lags)
+    out["sse"] = {"subscribers": args.sse, "events": sse.events, "gaps": sse.gaps,
+                  "disconnects": sse.disconnects,
+                  "lag_p50_ms": _ms(pct(lags, 50)), "lag_p95_ms": _ms(pct(lags, 95)), "lag_p99_ms": _ms(pct(lags, 99)),
+                  "lag_max_ms": _ms(lags[-1] if lags else None)}
+    out["elapsed_s"] = round(elapsed, 2)
+    return out
+
+
+# ---- local stand-ins ----
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server for {url} exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"{url}/openapi.json", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} not ready after {timeout:.0f}s")
+
+
+def spawn(base_port: int, verbose: bool) -> (List[subprocess.Popen], str, str):
+    orch, ats, conn = (f"http://127.0.0.1:{base_port + i}" for i in range(3))
+    env = {**os.environ, "MODE": "demo", "PYTHONPATH": ROOT}
+    apps = [
+        ("apps.ats-mock.main:app", ats, {}),
+        ("apps.channel-connector.main:app", conn, {"ORCHESTRATOR_BASE": orch}),
+        # enough interview seats that /schedule/confirm measures the allocator, not 409s
+        ("apps.orchestrator.main:app", orch, {"ATS_BASE": ats, "CHANNEL_CONNECTOR_BASE": conn,
+                                              "SCHED_SITES": os.getenv("SCHED_SITES", "Riyadh=200"),
+                                              "SCHED_INTERVIEWERS_PER_SITE": os.getenv("SCHED_INTERVIEWERS_PER_SITE", "200")}),
+    ]
+    procs = []
+    out = None if verbose else subprocess.DEVNULL
+    for target, url, extra in apps:
+        port = url.rsplit(":", 1)[1]
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1", "--port", port, "--log-level", "warning"],
+            cwd=ROOT, env={**env, **extra}, stdout=out, stderr=out))
+    try:
+        for p, (_, url, _) in zip(procs, apps):
+            _wait_ready(url, p)
+    except BaseException:
+        stop(procs)
+        raise
+    return procs, orch, conn
+
+
+def stop(procs: List[subprocess.Popen]) -> None:
+    for p in reversed(procs):
+        if p.poll() is None:
+            p.terminate()
+    for p in procs:
+        try:
+            p.wait(10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_report(res: dict) -> None:
+    print(f"{'route':28s} {'count':>8s} {'rps':>8s} {'err':>6s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}")
+    for route, r in res["routes"].items():
+        print(f"{route:28s} {r['count']:8d} {r['rps']:8.1f} {r['errors']:6d} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} "
+              f"{r['p99_ms']:9.2f} {r['max_ms']:9.2f}")
+    t, s = res["totals"], res["sse"]
+    print(f"{'total':28s} {t['requests']:8d} {t['rps']:8.1f} {t['errors']:6d}")
+    if s["subscribers"]:
+        print(f"sse: {s['subscribers']} subscribers, {s['events']} events, lag p50/p95/p99 "
+              f"{s['lag_p50_ms']}/{s['lag_p95_ms']}/{s['lag_p99_ms']} ms, gaps {s['gaps']}, "
+              f"disconnects {s['disconnects']}")
+
+
+def compare(base_path: str, new_path: str) -> None:
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def delta(a, b):
+        return "" if not a or b is None else f"{100.0 * (b - a) / a:+6.1f}%"
+
+    print(f"{base_path} ({base['meta'].get('git_rev')}) -> {new_path} ({new['meta'].get('git_rev')})")
+    print(f"{'route':28s} {'rps':>18s} {'p95 ms':>22s} {'p99 ms':>22s}")
+    for route in sorted(set(base["routes"]) | set(new["routes"])):
+        a, b = base["routes"].get(route, {}), new["routes"].get(route, {})
+        cols = []
+        for key in ("rps", "p95_ms", "p99_ms"):
+            cols.append(f"{a.get(key, '-')!s:>7} -> {b.get(key, '-')!s:>7} {delta(a.get(key), b.get(key)):>7}")
+        print(f"{route:28s} {cols[0]:>18s} {cols[1]:>22s} {cols[2]:>22s}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--api", default=os.getenv("API", "http://localhost:8000"))
+    ap.add_argument("--connector", default=os.getenv("CHANNEL_CONNECTOR_BASE"), help="channel connector base URL")
+    ap.add_argument("--spawn", action="store_true", help="start orchestrator, ats-mock and channel-connector locally")
+    ap.add_argument("--base-port", type=int, default=18000)
+    ap.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    ap.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before the measurement")
+    ap.add_argument("--clients", type=int, default=64, help="concurrent clients (max in flight with --rps)")
+    ap.add_argument("--rps", type=float, default=0.0, help="open-loop arrival rate; 0 = closed loop")
+    ap.add_argument("--sse", type=int, default=10, help="/events/stream subscribers")
+    ap.add_argument("--candidates", type=int, default=500)
+    ap.add_argument("--mix", default=DEFAULT_MIX)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--out", default=None, help="JSON report path")
+    ap.add_argument("--verbose", action="store_true", help="show spawned servers' output")
+    ap.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two saved reports and exit")
+    args = ap.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+    random.seed(args.seed)
+    procs = []
+    if args.spawn:
+        procs, args.api, args.connector = spawn(args.base_port, args.verbose)
+    try:
+        started = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        res = asyncio.run(run(args))
+    finally:
+        stop(procs)
+    res = {"meta": {"started_at": started, "git_rev": _git_rev(), "host": platform.node(),
+                    "python": platform.python_version(), "cpus": os.cpu_count(),
+                    "config": {k: v for k, v in vars(args).items() if k not in ("compare", "verbose")}}, **res}
+    print_report(res)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+        print(f"saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
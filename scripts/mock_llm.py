@@ -0,0 +1,79 @@
+"""Local stand-in for an OpenAI-compatible streaming Chat Completions API.
+
+    python scripts/mock_llm.py [--port 18500] [--ttft-ms 300] [--tokens 64] [--tps 60] [--max-streams 0]
+
+Serves POST /v1/chat/completions with `stream: true` as server-sent `data:`
+chunks, one token each, then `data: [DONE]`. The first token arrives after
+--ttft-ms and the rest at --tps tokens per second. --max-streams > 0 answers
+429 once that many streams are open, like a provider rate limit. Point the
+orchestrator at it with PROVIDER=openai PROVIDER_API_KEY=x
+PROVIDER_BASE_URL=http://127.0.0.1:18500/v1.
+"""
+import argparse
+import asyncio
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = ("Candidates", " in", " Riyadh", " reply", " fastest", " between", " 10", " and", " 12,", " so", " schedule",
+         " outreach", " then.")
+
+
+def make_app(ttft_ms: float = 300.0, tokens: int = 64, tps: float = 60.0, max_streams: int = 0) -> FastAPI:
+    app = FastAPI(title="Mock LLM")
+    state = {"open": 0, "peak": 0, "served": 0, "rejected": 0}
+
+    @app.get("/stats")
+    def stats() -> dict:
+        return state
+
+    @app.post("/stats/reset")
+    def reset() -> dict:
+        state.update(peak=state["open"], served=0, rejected=0)
+        return state
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        n = min(tokens, int(body.get("max_tokens") or tokens))
+        if max_streams and state["open"] >= max_streams:
+            state["rejected"] += 1
+            return JSONResponse({"error": {"message": "rate limited"}}, status_code=429)
+        state["open"] += 1
+        state["peak"] = max(state["peak"], state["open"])
+
+        async def gen():
+            try:
+                await asyncio.sleep(ttft_ms / 1000.0)
+                for i in range(n):
+                    if i:
+                        await asyncio.sleep(1.0 / tps)
+                    chunk = {"choices": [{"index": 0, "delta": {"content": WORDS[i % len(WORDS)]}}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+                state["served"] += 1
+            finally:
+                state["open"] -= 1
+
+        return StreamingResponse(gen(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    import uvicorn
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=18500)
+    ap.add_argument("--ttft-ms", type=float, default=300.0)
+    ap.add_argument("--tokens", type=int, default=64)
+    ap.add_argument("--tps", type=float, default=60.0)
+    ap.add_argument("--max-streams", type=int, default=0)
+    args = ap.parse_args()
+    uvicorn.run(make_app(args.ttft_ms, args.tokens, args.tps, args.max_streams), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()